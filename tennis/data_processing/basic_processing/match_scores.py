@@ -1,8 +1,18 @@
 """Functions to parse and process match scores."""
 
 from typing import Any, Optional, Union
+
+import numpy as np
 import pandas as pd
 
+SPECIAL_MARKERS = ("RET", "DEF", "W/O")
+NUM_SETS = 5
+SET_SCORE_PATTERN = r"^(\d+)-(\d+)(?:\((\d+)\)?)?$"
+SET_STATUS_DTYPE = pd.CategoricalDtype(
+    ["complete", "incomplete", "NA", *SPECIAL_MARKERS]
+)
+WINNER_DTYPE = pd.CategoricalDtype(["p1", "p2"])
+
 
 def parse_set_score(set_score: str) -> dict[str, Union[int, str, None]]:
     """
@@ -154,6 +164,138 @@ def parse_scores(score: str) -> Optional[dict[str, Any]]:
     return parsed_sets
 
 
+def _is_complete_set(p1: np.ndarray, p2: np.ndarray) -> np.ndarray:
+    """Vectorized version of the set completion rule in parse_set_score."""
+    return (
+        ((p1 >= 6) & ((p1 - p2) >= 2))
+        | (p1 >= 7)
+        | ((p2 >= 6) & ((p2 - p1) >= 2))
+        | (p2 >= 7)
+    )
+
+
+def parse_scores_vectorized(scores: pd.Series) -> tuple[pd.DataFrame, pd.Series]:
+    """
+    Parse match score strings into the same columns as parse_scores, for a whole Series
+    at once.
+
+    Parameters:
+    - scores (pd.Series): The score strings to parse.
+
+    Returns:
+    - tuple[pd.DataFrame, pd.Series]: The parsed match details, indexed like scores, and
+      a boolean mask of the scores parse_scores fails on. Rows in the mask hold no
+      meaningful details and should be dropped.
+
+    Notes:
+    - The details are stored compactly: games as nullable Int8, tiebreak points as
+      nullable Int16, statuses as SET_STATUS_DTYPE and winners as WINNER_DTYPE
+      categoricals. They also hold the totals p1_games_won, p2_games_won,
+      tiebreaks_played and sets_played.
+    - Unlike parse_scores, sets with more than 127 games or 32767 tiebreak points are
+      errors, as they do not fit the compact columns.
+    """
+    # Scores repeat a lot, so each distinct score is parsed once and mapped back.
+    codes, unique_scores = pd.factorize(scores)
+    tokens = pd.Series(unique_scores, dtype=object).str.split(expand=True)
+    num_tokens = max(NUM_SETS, tokens.shape[1])
+    tokens = tokens.reindex(columns=range(num_tokens)).to_numpy()
+    num_scores = len(unique_scores)
+
+    # Everything after the first special marker is ignored.
+    is_marker = np.isin(tokens, SPECIAL_MARKERS)
+    match_ended = is_marker.any(axis=1)
+    first_marker = np.where(match_ended, is_marker.argmax(axis=1), num_tokens)
+
+    to_parse = pd.notna(tokens) & (np.arange(num_tokens) < first_marker[:, np.newaxis])
+    token_codes, unique_tokens = pd.factorize(tokens[to_parse])
+    extracted = (
+        pd.Series(unique_tokens, dtype=object)
+        .str.extract(SET_SCORE_PATTERN)
+        .to_numpy(dtype=float)[token_codes]
+    )
+    p1_games = np.full((num_scores, num_tokens), np.nan)
+    p2_games = np.full((num_scores, num_tokens), np.nan)
+    tiebreakers = np.full((num_scores, num_tokens), np.nan)
+    p1_games[to_parse] = extracted[:, 0]
+    p2_games[to_parse] = extracted[:, 1]
+    tiebreakers[to_parse] = extracted[:, 2]
+    # Games past Int8 and tiebreak points past Int16 only come from corrupt scores, they
+    # are dropped before the casts below so the sets they are in count as errors.
+    out_of_range = (np.fmax(p1_games, p2_games) > np.iinfo(np.int8).max) | (
+        tiebreakers > np.iinfo(np.int16).max
+    )
+    p1_games[out_of_range] = np.nan
+    p2_games[out_of_range] = np.nan
+    tiebreakers[out_of_range] = np.nan
+    played = ~np.isnan(p1_games)
+    errors = (to_parse & ~played).any(axis=1)
+
+    complete = played & _is_complete_set(p1_games, p2_games)
+    winners = np.where(complete, np.where(p1_games > p2_games, "p1", "p2"), None)
+    statuses = np.where(
+        played,
+        np.where(complete, "complete", "incomplete"),
+        np.where(match_ended[:, np.newaxis], "NA", "incomplete"),
+    ).astype(object)
+
+    # A marker ends an incomplete set, or takes the place of the next set.
+    rows = np.flatnonzero(match_ended)
+    marker_set = first_marker[rows]
+    ends_previous = (marker_set > 0) & (
+        statuses[rows, np.maximum(marker_set - 1, 0)] == "incomplete"
+    )
+    marker_status_set = np.where(ends_previous, marker_set - 1, marker_set)
+    statuses[rows, marker_status_set] = tokens[rows, marker_set]
+    # Sets past NUM_SETS only exist where they were reached.
+    reached = played.copy()
+    reached[rows, marker_status_set] = True
+    statuses[:, NUM_SETS:][~reached[:, NUM_SETS:]] = np.nan
+
+    p1_set_wins = (winners == "p1").sum(axis=1)
+    p2_set_wins = (winners == "p2").sum(axis=1)
+    match_winners = np.where(
+        match_ended,
+        None,
+        np.where(
+            p1_set_wins > p2_set_wins,
+            "p1",
+            np.where(p2_set_wins > p1_set_wins, "p2", None),
+        ),
+    )
+
+    # A set went to a tiebreak if its tiebreak points were recorded or it ended 7-6.
+    tiebreaks = ~np.isnan(tiebreakers) | (
+        (np.fmax(p1_games, p2_games) == 7) & (np.fmin(p1_games, p2_games) == 6)
+    )
+
+    columns = {}
+    for i in range(num_tokens):
+        if i >= NUM_SETS and not reached[:, i].any():
+            break
+        columns[f"set_{i + 1}_p1"] = pd.array(p1_games[:, i], dtype="Int8")
+        columns[f"set_{i + 1}_p2"] = pd.array(p2_games[:, i], dtype="Int8")
+        columns[f"set_{i + 1}_tiebreaker"] = pd.array(tiebreakers[:, i], dtype="Int16")
+        columns[f"set_{i + 1}_status"] = pd.Categorical(
+            statuses[:, i], dtype=SET_STATUS_DTYPE
+        )
+        columns[f"set_{i + 1}_winner"] = pd.Categorical(
+            winners[:, i], dtype=WINNER_DTYPE
+        )
+    columns["match_completed"] = ~match_ended
+    columns["match_winner"] = pd.Categorical(match_winners, dtype=WINNER_DTYPE)
+    columns["p1_games_won"] = np.nansum(p1_games, axis=1).astype(np.int16)
+    columns["p2_games_won"] = np.nansum(p2_games, axis=1).astype(np.int16)
+    columns["tiebreaks_played"] = tiebreaks.sum(axis=1).astype(np.int8)
+    columns["sets_played"] = played.sum(axis=1).astype(np.int8)
+    # Missing scores have code -1, they are errors so any row can stand in for their
+    # details and the error mask gets an extra last entry for them.
+    parsed = pd.DataFrame(columns).reindex(range(max(num_scores, 1)))
+    parsed_scores_df = parsed.take(np.maximum(codes, 0)).set_axis(scores.index)
+    errors = np.append(errors, True)[codes]
+    return parsed_scores_df, pd.Series(errors, index=scores.index)
+
+
 def process_match_scores(df: pd.DataFrame) -> pd.DataFrame:
     """
     Process the match scores in the DataFrame and add structured match details.
@@ -162,10 +304,10 @@ def process_match_scores(df: pd.DataFrame) -> pd.DataFrame:
     - df (pd.DataFrame): The DataFrame containing match scores.
 
     Returns:
-    - pd.DataFrame: The DataFrame with structured match details added.
+    - pd.DataFrame: The DataFrame with structured match details added, rows whose score
+      can not be parsed are dropped.
     """
-    parsed_scores = df["score"].apply(parse_scores).dropna()
-    parsed_scores_df = pd.DataFrame(parsed_scores.tolist())
-    df = df.loc[parsed_scores.index].join(parsed_scores_df)
+    parsed_scores_df, errors = parse_scores_vectorized(df["score"])
+    df = df.join(parsed_scores_df).loc[~errors]
     df.drop(columns=["score"], inplace=True)
     return df
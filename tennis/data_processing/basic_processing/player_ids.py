@@ -0,0 +1,160 @@
+"""
+Persistent registry of integer player ids.
+
+The registry is a CSV of player_id,player_name rows that is only ever appended to: a name
+keeps the id it was first given, new names get the next ids in order of first
+appearance, so ids stay stable as new data arrives. Ids are int32 so that merges and
+groupbys on them are cheaper than on the name strings.
+
+Given a canonical name mapping, e.g. from PlayerNameIndex.get_canonical_mapping, only
+canonical spellings are registered and every spelling of a player gets the id of their
+canonical one.
+"""
+
+from collections.abc import Iterable, Mapping
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+PLAYER_IDS_PATH = "./data/player_ids.csv"
+PLAYER_ID_DTYPE = np.int32
+
+
+def _is_missing_or_empty(path: str | Path) -> bool:
+    """Check if a registry CSV does not exist yet or has no content."""
+    return not Path(path).exists() or Path(path).stat().st_size == 0
+
+
+def _canonicalize(
+    names: pd.Series, canonical_names: Mapping[str, str] | None
+) -> pd.Series:
+    """Map names to their canonical spelling, names missing from it are unchanged."""
+    if canonical_names is None:
+        return names
+    return names.map(canonical_names).fillna(names)
+
+
+def load_player_ids(path: str | Path = PLAYER_IDS_PATH) -> pd.DataFrame:
+    """
+    Load the player id registry.
+
+    Parameters:
+        - path (str | Path): Path of the registry CSV.
+
+    Returns:
+        - pd.DataFrame: The player_id and player_name of every registered player, ordered
+          by id. Empty if the registry does not exist yet or is an empty file.
+    """
+    if _is_missing_or_empty(path):
+        return pd.DataFrame(
+            {
+                "player_id": pd.Series(dtype=PLAYER_ID_DTYPE),
+                "player_name": pd.Series(dtype=object),
+            }
+        )
+    player_ids = pd.read_csv(
+        path,
+        dtype={"player_id": PLAYER_ID_DTYPE, "player_name": object},
+        keep_default_na=False,
+    )
+    if not np.array_equal(player_ids["player_id"], np.arange(len(player_ids))):
+        msg = f"Player ids in {path} must be 0, 1, 2, ... in file order"
+        raise ValueError(msg)
+    if player_ids["player_name"].duplicated().any():
+        duplicates = player_ids.loc[
+            player_ids["player_name"].duplicated(), "player_name"
+        ].tolist()
+        msg = f"Player names in {path} must be unique, found duplicates {duplicates}"
+        raise ValueError(msg)
+    return player_ids
+
+
+def register_player_names(
+    names: Iterable[str],
+    path: str | Path = PLAYER_IDS_PATH,
+    canonical_names: Mapping[str, str] | None = None,
+) -> pd.DataFrame:
+    """
+    Give ids to the names not in the registry yet and append them to it.
+
+    Parameters:
+        - names (Iterable[str]): Player names, missing values are ignored.
+        - path (str | Path): Path of the registry CSV.
+        - canonical_names (Mapping[str, str] | None): Canonical spelling of the names,
+          only these are registered.
+
+    Returns:
+        - pd.DataFrame: The updated registry, as returned by load_player_ids.
+    """
+    player_ids = load_player_ids(path)
+    names = _canonicalize(
+        pd.Series(list(names), dtype=object).dropna(), canonical_names
+    )
+    names = pd.Series(pd.unique(names))
+    new_names = names[~names.isin(player_ids["player_name"])]
+    if new_names.empty:
+        return player_ids
+
+    new_player_ids = pd.DataFrame(
+        {
+            "player_id": np.arange(
+                len(player_ids), len(player_ids) + len(new_names)
+            ).astype(PLAYER_ID_DTYPE),
+            "player_name": new_names.to_numpy(),
+        }
+    )
+    new_player_ids.to_csv(
+        path, mode="a", header=_is_missing_or_empty(path), index=False
+    )
+    return pd.concat([player_ids, new_player_ids], ignore_index=True)
+
+
+def names_to_player_ids(
+    names: pd.Series,
+    player_ids: pd.DataFrame,
+    canonical_names: Mapping[str, str] | None = None,
+) -> pd.Series:
+    """
+    Look up the registered ids of player names.
+
+    Parameters:
+        - names (pd.Series): Player names, all of them (or their canonical spelling)
+          must be registered.
+        - player_ids (pd.DataFrame): The registry, as returned by load_player_ids.
+        - canonical_names (Mapping[str, str] | None): Canonical spelling of the names,
+          the ids of these are looked up.
+
+    Returns:
+        - pd.Series: The int32 player ids, indexed like names.
+    """
+    names = _canonicalize(names, canonical_names)
+    ids = pd.Index(player_ids["player_name"]).get_indexer(names)
+    if (ids < 0).any():
+        unregistered = pd.unique(names[ids < 0])[:5].tolist()
+        msg = f"Player names are not registered, e.g. {unregistered}"
+        raise ValueError(msg)
+    return pd.Series(
+        player_ids["player_id"].to_numpy()[ids], index=names.index, name=names.name
+    )
+
+
+def player_ids_to_names(ids: pd.Series, player_ids: pd.DataFrame) -> pd.Series:
+    """
+    Look up the names of registered player ids.
+
+    Parameters:
+        - ids (pd.Series): Player ids, all of them must be registered.
+        - player_ids (pd.DataFrame): The registry, as returned by load_player_ids.
+
+    Returns:
+        - pd.Series: The player names, indexed like ids.
+    """
+    if ((ids < 0) | (ids >= len(player_ids))).any():
+        msg = "Player ids are not registered"
+        raise ValueError(msg)
+    return pd.Series(
+        player_ids["player_name"].to_numpy()[ids.to_numpy()],
+        index=ids.index,
+        name=ids.name,
+    )
@@ -1,85 +1,61 @@
+import numpy as np
 import pandas as pd
 
+PLAYER_ATTRIBUTES = ("id", "name", "age", "rank", "rank_points", "seed", "ioc", "hand")
+CATEGORICAL_ATTRIBUTES = ("name", "ioc", "hand")
 
-def player_info_wide_to_long(df: pd.DataFrame) -> pd.DataFrame:
-    """
-    Convert the player info DataFrame from wide to long format.
-
-    Parameters:
-        - df (pd.DataFrame): The player info DataFrame.
-
-    Returns:
-        - pd.DataFrame: The long-format DataFrame.
-    """
-    transformed_data = []
-
-    for _, row in df.iterrows():
-        match_id = row["match_id"]
 
-        winner_data = {
-            "match_id": match_id,
-            "player_name": row["winner_name"],
-            "opponent_name": row["loser_name"],
-            "player_age": row["winner_age"],
-            "opponent_age": row["loser_age"],
-            "player_rank": row["winner_rank"],
-            "opponent_rank": row["loser_rank"],
-            "player_rank_points": row["winner_rank_points"],
-            "opponent_rank_points": row["loser_rank_points"],
-            "player_seed": row["winner_seed"],
-            "opponent_seed": row["loser_seed"],
-            "player_ioc": row["winner_ioc"],
-            "opponent_ioc": row["loser_ioc"],
-            "player_hand": row["winner_hand"],
-            "opponent_hand": row["loser_hand"],
-            "outcome": "win",
-            "win": 1,
-        }
+def _side_columns(player: str, opponent: str, attributes: list[str]) -> list[str]:
+    """Columns of the attributes for the player then the opponent, after match_id."""
+    return ["match_id"] + [
+        f"{side}_{attribute}" for attribute in attributes for side in (player, opponent)
+    ]
 
-        loser_data = {
-            "match_id": match_id,
-            "player_name": row["loser_name"],
-            "opponent_name": row["winner_name"],
-            "player_age": row["loser_age"],
-            "opponent_age": row["winner_age"],
-            "player_rank": row["loser_rank"],
-            "opponent_rank": row["winner_rank"],
-            "player_rank_points": row["loser_rank_points"],
-            "opponent_rank_points": row["winner_rank_points"],
-            "player_seed": row["loser_seed"],
-            "opponent_seed": row["winner_seed"],
-            "player_ioc": row["loser_ioc"],
-            "opponent_ioc": row["winner_ioc"],
-            "player_hand": row["loser_hand"],
-            "opponent_hand": row["winner_hand"],
-            "outcome": "lose",
-            "win": 0,
-        }
 
-        transformed_data.append(winner_data)
-        transformed_data.append(loser_data)
-
-    return pd.DataFrame(transformed_data)
-
-
-def create_player_ids_from_dataframe(df: pd.DataFrame) -> pd.DataFrame:
+def player_info_wide_to_long(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Create a DataFrame of unique player IDs from a DataFrame of player info.
+    Convert the player info DataFrame from wide to long format.
 
     Parameters:
-    - df (pd.DataFrame): The player info DataFrame.
+        - df (pd.DataFrame): The player info DataFrame, with winner_ and loser_ columns
+          for the PLAYER_ATTRIBUTES it has.
 
     Returns:
-    - pd.DataFrame: The DataFrame of unique player IDs.
-
-    Note:
-        Intended to only run on player_info dataframe due to hardcoded column names.
+        - pd.DataFrame: The long-format DataFrame, with the winner's row followed by the
+          loser's row for each match. Name, ioc and hand columns are categorical, with
+          the same categories for the player and opponent columns.
     """
-    player_ids = (
-        pd.concat([df["winner_name"], df["loser_name"]])
-        .drop_duplicates()
+    attributes = [
+        attribute for attribute in PLAYER_ATTRIBUTES if f"winner_{attribute}" in df
+    ]
+    long_columns = _side_columns("player", "opponent", attributes)
+
+    # Name, ioc and hand codes are shared by both sides, categories in order of first
+    # appearance in the long format.
+    categorical_columns = {}
+    for attribute in set(CATEGORICAL_ATTRIBUTES).intersection(attributes):
+        sides = [f"winner_{attribute}", f"loser_{attribute}"]
+        codes, categories = pd.factorize(df[sides].to_numpy().ravel())
+        for side, side_codes in zip(sides, codes.reshape(-1, 2).T):
+            categorical_columns[side] = pd.Categorical.from_codes(
+                side_codes, categories=categories
+            )
+    df = df.assign(**categorical_columns)
+
+    winners = (
+        df[_side_columns("winner", "loser", attributes)]
+        .set_axis(long_columns, axis=1)
+        .assign(outcome="win", win=1)
+    )
+    losers = (
+        df[_side_columns("loser", "winner", attributes)]
+        .set_axis(long_columns, axis=1)
+        .assign(outcome="lose", win=0)
+    )
+    # Interleave the halves so each winner row is followed by the loser row.
+    order = np.arange(2 * len(df)).reshape(2, len(df)).T.ravel()
+    return (
+        pd.concat([winners, losers], ignore_index=True)
+        .take(order)
         .reset_index(drop=True)
-        .reset_index()
     )
-    player_ids.columns = ["player_id", "player_name"]
-    return player_ids
@@ -0,0 +1,278 @@
+"""
+Fuzzy resolution of different spellings of the same player's name.
+
+Names are normalised (lower case, accents and punctuation removed) and put in blocks keyed
+by their first initial and each of their later tokens, e.g. "mikhail elgin" is in the
+block "m elgin". Only names sharing a block are compared, and all the candidate pairs
+are scored in one batched rapidfuzz.process.cpdist call spread over threads, so the work
+grows with the size of the blocks rather than quadratically with the number of names.
+Names scoring at least the cutoff are linked, and every name maps to the earliest added
+name it is linked to, unless its group has a pinned name.
+
+Notes:
+    The index keeps its blocks and links, so adding names only compares the new names
+    with the members of their blocks. update_player_name_index keeps it cached on disk
+    between runs.
+
+    Names with a registered player id are pinned, so they stay the canonical spelling of
+    their group and their ids stay stable. A new name linking two groups that both have
+    a pinned name does not merge them, as one of the players would change id.
+"""
+
+import pickle
+import unicodedata
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from rapidfuzz import fuzz, process
+
+NAME_INDEX_PATH = "./data/player_name_index.pkl"
+DEFAULT_SCORE_CUTOFF = 90.0
+
+
+def normalize_name(name: str) -> str:
+    """
+    Normalise a player name for comparison.
+
+    Parameters:
+        - name (str): The player name.
+
+    Returns:
+        - str: The name in lower case ascii, with hyphens as spaces, other punctuation
+          removed and single spaces between tokens.
+    """
+    name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode()
+    name = name.lower().replace("-", " ")
+    name = "".join(char for char in name if char.isalnum() or char.isspace())
+    return " ".join(name.split())
+
+
+def get_blocking_keys(normalized_name: str) -> list[str]:
+    """
+    Get the blocks a normalised name is put in.
+
+    Parameters:
+        - normalized_name (str): The name, as returned by normalize_name.
+
+    Returns:
+        - list[str]: The first initial joined with each later token, or the name itself
+          if it has a single token.
+    """
+    tokens = normalized_name.split()
+    if len(tokens) < 2:
+        return [normalized_name]
+    return [f"{tokens[0][0]} {token}" for token in tokens[1:]]
+
+
+@dataclass
+class PlayerNameIndex:
+    """
+    Dataclass to hold a blocked index of player names and the links between them.
+
+    Attributes:
+        - score_cutoff (float): Minimum rapidfuzz token sort ratio to link two names.
+        - names (list[str]): Names in the order they were added.
+        - normalized_names (list[str]): The normalised names.
+        - positions (dict[str, int]): Position of each name in names.
+        - blocks (dict[str, list[int]]): Positions of the names in each block.
+        - parents (list[int]): Union-find parent of each name, roots are the pinned
+          name of their group, or else its earliest added name.
+        - pinned (set[str]): Names that stay the root of their group, they may be pinned
+          before they are added.
+    """
+
+    score_cutoff: float = DEFAULT_SCORE_CUTOFF
+    names: list[str] = field(default_factory=list)
+    normalized_names: list[str] = field(default_factory=list)
+    positions: dict[str, int] = field(default_factory=dict)
+    blocks: dict[str, list[int]] = field(default_factory=dict)
+    parents: list[int] = field(default_factory=list)
+    pinned: set[str] = field(default_factory=set)
+
+    def __setstate__(self, state: dict) -> None:
+        """Restore a pickled index, indexes cached before pinning have no pinned names."""
+        self.__dict__.update({"pinned": set()} | state)
+
+    def _root(self, position: int) -> int:
+        """Find the root of a name's group, compressing the path to it."""
+        root = position
+        while self.parents[root] != root:
+            root = self.parents[root]
+        while self.parents[position] != root:
+            self.parents[position], position = root, self.parents[position]
+        return root
+
+    def _is_pinned(self, position: int) -> bool:
+        """Check if the name at a position is pinned."""
+        return self.names[position] in self.pinned
+
+    def _link(self, first: int, second: int) -> None:
+        """Merge the groups of two names, keeping the pinned root or the earliest one."""
+        first, second = self._root(first), self._root(second)
+        if first == second:
+            return
+        if self._is_pinned(first) and self._is_pinned(second):
+            print(
+                f"Not linking {self.names[first]!r} and {self.names[second]!r}, "
+                "both are pinned"
+            )
+            return
+        if self._is_pinned(second) or (not self._is_pinned(first) and second < first):
+            first, second = second, first
+        self.parents[second] = first
+
+    def pin_names(self, names: Iterable[str]) -> None:
+        """
+        Pin names, so they stay the canonical spelling of their group.
+
+        Parameters:
+            - names (Iterable[str]): The names, e.g. those with a registered player id.
+              Names added later are pinned when they are added.
+        """
+        for name in pd.Series(list(names), dtype=object).dropna():
+            if name in self.pinned:
+                continue
+            position = self.positions.get(name)
+            if position is not None:
+                root = self._root(position)
+                if self._is_pinned(root):
+                    print(f"Not pinning {name!r}, it is linked to {self.names[root]!r}")
+                    continue
+                self.parents[root] = position
+                self.parents[position] = position
+            self.pinned.add(name)
+
+    def add_names(self, names: Iterable[str], workers: int = -1) -> None:
+        """
+        Add names to the index, linking them to any matching names in their blocks.
+
+        Parameters:
+            - names (Iterable[str]): The names, missing values and names already in the
+              index are skipped.
+            - workers (int): Threads used by rapidfuzz, -1 for all cores.
+        """
+        new_blocks: dict[str, list[int]] = {}
+        for name in pd.unique(pd.Series(list(names), dtype=object).dropna()):
+            if name in self.positions:
+                continue
+            position = len(self.names)
+            normalized_name = normalize_name(name)
+            self.names.append(name)
+            self.normalized_names.append(normalized_name)
+            self.positions[name] = position
+            self.parents.append(position)
+            for key in get_blocking_keys(normalized_name):
+                self.blocks.setdefault(key, []).append(position)
+                new_blocks.setdefault(key, []).append(position)
+
+        # Each new name is a candidate against the earlier names in its blocks, and all
+        # the candidate pairs are scored in one batched call.
+        first_positions = []
+        second_positions = []
+        for key, new_positions in new_blocks.items():
+            members = self.blocks[key]
+            for position in new_positions:
+                candidates = [member for member in members if member < position]
+                first_positions.extend([position] * len(candidates))
+                second_positions.extend(candidates)
+        if not first_positions:
+            return
+        pairs = np.unique(np.column_stack([first_positions, second_positions]), axis=0)
+        normalized_names = np.array(self.normalized_names, dtype=object)
+        scores = process.cpdist(
+            normalized_names[pairs[:, 0]],
+            normalized_names[pairs[:, 1]],
+            scorer=fuzz.token_sort_ratio,
+            score_cutoff=self.score_cutoff,
+            workers=workers,
+        )
+        for first, second in pairs[scores > 0]:
+            self._link(first, second)
+
+    def get_canonical_mapping(self) -> dict[str, str]:
+        """
+        Get the canonical spelling of every name in the index.
+
+        Returns:
+            - dict[str, str]: Each name mapped to the pinned or else the earliest added
+              name linked to it, which maps to itself.
+        """
+        return {
+            name: self.names[self._root(position)]
+            for name, position in self.positions.items()
+        }
+
+
+def load_player_name_index(
+    path: str | Path = NAME_INDEX_PATH, score_cutoff: float = DEFAULT_SCORE_CUTOFF
+) -> PlayerNameIndex:
+    """
+    Load a cached player name index, or start an empty one if there is none.
+
+    Parameters:
+        - path (str | Path): Path of the cached index.
+        - score_cutoff (float): Score cutoff of a new index, a cached index must have
+          been built with the same cutoff.
+
+    Returns:
+        - PlayerNameIndex: The index.
+    """
+    if not Path(path).exists():
+        return PlayerNameIndex(score_cutoff=score_cutoff)
+    with open(path, "rb") as file:
+        index = pickle.load(file)
+    if index.score_cutoff != score_cutoff:
+        msg = (
+            f"Cached index {path} uses score cutoff {index.score_cutoff}, "
+            f"not {score_cutoff}"
+        )
+        raise ValueError(msg)
+    return index
+
+
+def save_player_name_index(
+    index: PlayerNameIndex, path: str | Path = NAME_INDEX_PATH
+) -> None:
+    """
+    Cache a player name index on disk.
+
+    Parameters:
+        - index (PlayerNameIndex): The index.
+        - path (str | Path): Path of the cached index.
+    """
+    with open(path, "wb") as file:
+        pickle.dump(index, file)
+
+
+def update_player_name_index(
+    names: Iterable[str],
+    path: str | Path = NAME_INDEX_PATH,
+    score_cutoff: float = DEFAULT_SCORE_CUTOFF,
+    registered_names: Iterable[str] = (),
+) -> PlayerNameIndex:
+    """
+    Add names to the cached player name index, creating it if needed.
+
+    Parameters:
+        - names (Iterable[str]): Player names, only the new ones are compared.
+        - path (str | Path): Path of the cached index.
+        - score_cutoff (float): Minimum rapidfuzz token sort ratio to link two names.
+        - registered_names (Iterable[str]): Names with a registered player id, they are
+          pinned before the names are added.
+
+    Returns:
+        - PlayerNameIndex: The updated index, get_canonical_mapping gives the mapping to
+          apply to the names.
+    """
+    index = load_player_name_index(path, score_cutoff)
+    num_names = len(index.names)
+    num_pinned = len(index.pinned)
+    index.pin_names(registered_names)
+    index.add_names(names)
+    changed = len(index.names) > num_names or len(index.pinned) > num_pinned
+    if changed or not Path(path).exists():
+        save_player_name_index(index, path)
+    return index
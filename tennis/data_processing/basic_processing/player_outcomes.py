@@ -1,5 +1,8 @@
-import pandas as pd
+from collections.abc import Iterable
+from dataclasses import dataclass
+
 import numpy as np
+import pandas as pd
 
 
 def pivot_player_outcome_stats(df: pd.DataFrame) -> pd.DataFrame:
@@ -13,77 +16,188 @@ def pivot_player_outcome_stats(df: pd.DataFrame) -> pd.DataFrame:
     - pd.DataFrame: The pivoted DataFrame.
     """
     pivoted_df = df.pivot(
-        index=["match_id", "player_name"], columns="stat", values="stat_value"
+        index=["match_id", "player_id"], columns="stat", values="stat_value"
     ).reset_index()
 
     # Rename columns to add player_ prefix
     pivoted_df = pivoted_df.rename(
-        columns=lambda x: "player_" + x if x not in ["match_id", "player_name"] else x
+        columns=lambda x: "player_" + x if x not in ["match_id", "player_id"] else x
     )
 
     return pivoted_df
 
 
-def safe_divide(numerator, denominator):
-    """Safely divide two arrays, handling division by zero."""
-    return np.where(denominator == 0, 0, numerator / denominator)
+@dataclass(frozen=True)
+class DerivedFeature:
+    """
+    Dataclass to hold how a derived feature is computed from two input features.
 
+    Attributes:
+        - operation (str): "sum", "difference" or "ratio", a ratio is 0 where the
+          denominator is 0.
+        - inputs (tuple[str, str]): Names of the inputs without the prefix, either raw
+          stats or other derived features.
+    """
 
-def add_transformed_variables(df: pd.DataFrame) -> pd.DataFrame:
-    """Add transformed variables to the player stats DataFrame."""
-    df["player_second_serves"] = df["player_svpt"] - df["player_firstin"]
-    df["player_total_serve_points_won"] = df["player_firstwon"] + df["player_secondwon"]
-    df["player_total_serve_points_lost"] = (
-        df["player_svpt"] - df["player_total_serve_points_won"]
-    )
-    df["player_first_serve_pct"] = safe_divide(df["player_firstin"], df["player_svpt"])
-    df["player_first_serve_win_pct"] = safe_divide(
-        df["player_firstwon"], df["player_firstin"]
-    )
-    df["player_second_serve_win_pct"] = safe_divide(
-        df["player_secondwon"], df["player_second_serves"]
-    )
-    df["player_total_serve_win_pct"] = safe_divide(
-        df["player_total_serve_points_won"], df["player_svpt"]
-    )
-    df["player_df_pct"] = safe_divide(df["player_df"], df["player_svpt"])
-    df["player_bpsaved_pct"] = safe_divide(df["player_bpsaved"], df["player_bpfaced"])
-    df["player_aces_per_game"] = safe_divide(df["player_ace"], df["player_svgms"])
-    df["player_ace_pct"] = safe_divide(df["player_ace"], df["player_svpt"])
-    df["player_df_per_game"] = safe_divide(df["player_df"], df["player_svgms"])
-    df["player_serve_points_won_per_game"] = safe_divide(
-        df["player_total_serve_points_won"], df["player_svgms"]
-    )
-    df["player_serve_points_lost_per_game"] = safe_divide(
-        df["player_total_serve_points_lost"], df["player_svgms"]
+    operation: str
+    inputs: tuple[str, str]
+
+
+DERIVED_FEATURES = {
+    "second_serves": DerivedFeature("difference", ("svpt", "firstin")),
+    "total_serve_points_won": DerivedFeature("sum", ("firstwon", "secondwon")),
+    "total_serve_points_lost": DerivedFeature(
+        "difference", ("svpt", "total_serve_points_won")
+    ),
+    "first_serve_pct": DerivedFeature("ratio", ("firstin", "svpt")),
+    "first_serve_win_pct": DerivedFeature("ratio", ("firstwon", "firstin")),
+    "second_serve_win_pct": DerivedFeature("ratio", ("secondwon", "second_serves")),
+    "total_serve_win_pct": DerivedFeature("ratio", ("total_serve_points_won", "svpt")),
+    "df_pct": DerivedFeature("ratio", ("df", "svpt")),
+    "bpsaved_pct": DerivedFeature("ratio", ("bpsaved", "bpfaced")),
+    "aces_per_game": DerivedFeature("ratio", ("ace", "svgms")),
+    "ace_pct": DerivedFeature("ratio", ("ace", "svpt")),
+    "df_per_game": DerivedFeature("ratio", ("df", "svgms")),
+    "serve_points_won_per_game": DerivedFeature(
+        "ratio", ("total_serve_points_won", "svgms")
+    ),
+    "serve_points_lost_per_game": DerivedFeature(
+        "ratio", ("total_serve_points_lost", "svgms")
+    ),
+}
+
+
+def safe_divide(numerator, denominator, dtype=np.float64):
+    """Safely divide two arrays, giving 0 where the denominator is 0."""
+    numerator = np.asarray(numerator)
+    denominator = np.asarray(denominator)
+    out = np.zeros(np.broadcast_shapes(numerator.shape, denominator.shape), dtype=dtype)
+    return np.divide(numerator, denominator, out=out, where=denominator != 0)
+
+
+def _compute_derived_feature(
+    df: pd.DataFrame,
+    name: str,
+    prefix: str,
+    dtype: np.dtype | None,
+    computed: dict[str, np.ndarray],
+) -> np.ndarray:
+    """Compute a feature and any derived features it needs, caching them in computed."""
+    if name in computed:
+        return computed[name]
+    if name not in DERIVED_FEATURES:
+        return df[prefix + name].to_numpy()
+
+    feature = DERIVED_FEATURES[name]
+    first, second = (
+        _compute_derived_feature(df, input_name, prefix, dtype, computed)
+        for input_name in feature.inputs
     )
+    if feature.operation == "ratio":
+        values = safe_divide(first, second, np.float64 if dtype is None else dtype)
+    elif feature.operation == "sum":
+        values = first + second
+    elif feature.operation == "difference":
+        values = first - second
+    else:
+        msg = f"Unknown operation {feature.operation} for derived feature {name}"
+        raise ValueError(msg)
+    if dtype is not None:
+        values = values.astype(dtype, copy=False)
+    computed[name] = values
+    return values
+
+
+def add_derived_features(
+    df: pd.DataFrame,
+    features: Iterable[str] | None = None,
+    prefix: str = "player_",
+    dtype: np.dtype | None = None,
+) -> pd.DataFrame:
+    """
+    Add derived features to the player stats DataFrame, computing only what they need.
+
+    Parameters:
+    - df (pd.DataFrame): The player stats DataFrame.
+    - features (Iterable[str] | None): Names of the features from DERIVED_FEATURES to
+      add, with or without the prefix. Defaults to all of them.
+    - prefix (str): Prefix of the stat columns, which is also given to the new columns.
+    - dtype (np.dtype | None): Data type of the new columns, e.g. np.float32 to halve
+      their memory. Defaults to the dtype of sums and differences of the inputs and
+      float64 for ratios.
+
+    Returns:
+    - pd.DataFrame: The DataFrame with the requested features added. Derived features
+      only needed as inputs are not added.
+    """
+    if features is None:
+        features = DERIVED_FEATURES
+    names = [feature.removeprefix(prefix) for feature in features]
+    unknown = [name for name in names if name not in DERIVED_FEATURES]
+    if unknown:
+        msg = f"Unknown derived features {unknown}"
+        raise ValueError(msg)
+
+    computed: dict[str, np.ndarray] = {}
+    for name in names:
+        df[prefix + name] = _compute_derived_feature(df, name, prefix, dtype, computed)
+        # The frame holds its own copy, later features should read that one.
+        computed[name] = df[prefix + name].to_numpy()
     return df
 
 
+def add_transformed_variables(df: pd.DataFrame) -> pd.DataFrame:
+    """Add all the derived features to the player stats DataFrame."""
+    return add_derived_features(df)
+
+
 def merge_with_opponent_stats(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Merge the player stats DataFrame with itself to include opponent stats.
+    Add the opponent's stats to each row of the player stats DataFrame.
 
     Parameters:
-    - df (pd.DataFrame): The player stats DataFrame.
+    - df (pd.DataFrame): The player stats DataFrame, one row per player per match.
 
     Returns:
-    - pd.DataFrame: The DataFrame with both player and opponent stats.
-    """
-    merged_df = pd.merge(
-        df,
-        df,
-        how="inner",
-        left_on=["match_id", "player_name"],
-        right_on=["match_id", "player_name"],
-        suffixes=("", "_opponent"),
-    )
+    - pd.DataFrame: The DataFrame with both player and opponent stats, sorted by
+      match_id and player_id. Each player_ column has an opponent_ column holding the
+      other player's value, NaN for matches without exactly two rows.
 
-    # Rename opponent columns
-    merged_df = merged_df.rename(
-        columns=lambda x: x.replace("_opponent", "").replace("player_", "opponent_")
-        if "_opponent" in x
-        else x
+    Note:
+        With the rows sorted, the two players of a match are neighbours, so the opponent
+        columns are the player columns with each pair of rows swapped, no join needed.
+    """
+    order = np.lexsort((df["player_id"].to_numpy(), df["match_id"].to_numpy()))
+    match_ids = df["match_id"].to_numpy()[order]
+    starts = np.flatnonzero(np.r_[True, match_ids[1:] != match_ids[:-1]])
+    rows_per_match = np.diff(np.r_[starts, len(df)])
+
+    # The first row of a pair takes its opponent from the next row and the second from
+    # the previous one, rows of matches without exactly two players have no opponent.
+    offsets = np.zeros(len(df), dtype=np.intp)
+    pair_starts = starts[rows_per_match == 2]
+    offsets[pair_starts] = 1
+    offsets[pair_starts + 1] = -1
+    opponent_order = order[np.arange(len(df)) + offsets]
+
+    stat_columns = [
+        column for column in df.columns if column not in ("match_id", "player_id")
+    ]
+    opponent_df = (
+        df[stat_columns]
+        .take(opponent_order)
+        .set_axis(
+            [column.replace("player_", "opponent_") for column in stat_columns], axis=1
+        )
+        .reset_index(drop=True)
     )
-
-    return merged_df
+    if (offsets == 0).any():
+        no_opponent = np.broadcast_to((offsets == 0)[:, np.newaxis], opponent_df.shape)
+        opponent_df = opponent_df.mask(no_opponent)
+    # The output of pivot_player_outcome_stats is already sorted, so no copy is needed.
+    if np.array_equal(order, np.arange(len(df))):
+        df = df.reset_index(drop=True)
+    else:
+        df = df.take(order).reset_index(drop=True)
+
+    return pd.concat([df, opponent_df], axis=1)
@@ -0,0 +1,562 @@
+"""
+Benchmarks for the data processing pipeline.
+
+Run with `python -m tennis.data_processing.benchmarks`, timings are printed in seconds.
+The benchmarks run on synthetic player info scaled to a multiple of the number of matches
+in ./data/match_info.csv, so they do not need the raw player files.
+"""
+
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from tennis.data_processing.basic_processing.player_info import (
+    player_info_wide_to_long,
+)
+from tennis.data_processing.basic_processing.player_outcomes import (
+    merge_with_opponent_stats,
+)
+from tennis.data_processing.historical_features.as_of import build_player_history
+from tennis.data_processing.historical_features.feature_store import (
+    HistoricFeatureStore,
+)
+from tennis.data_processing.historical_features.historic_featureset import (
+    FORM_HALF_LIFE_DAYS,
+    FORM_LAST_DAYS,
+    FORM_LAST_MATCHES,
+    HISTORIC_FEATURES,
+    calculate_form_features,
+    calculate_historic_features,
+    calculate_prior_ewm_means,
+    calculate_prior_means,
+    calculate_prior_window_means,
+)
+
+DEFAULT_SCALE = 10
+DEFAULT_NUM_PLAYERS = 1400
+DEFAULT_MATCH_INFO_PATH = "./data/match_info.csv"
+MATCHES_PER_TOURNAMENT = 31
+SURFACES = ("Hard", "Clay", "Grass")
+OUTCOME_STATS = (
+    "ace",
+    "bpfaced",
+    "bpsaved",
+    "df",
+    "firstin",
+    "firstwon",
+    "secondwon",
+    "svgms",
+    "svpt",
+)
+
+
+def make_synthetic_player_info(
+    num_matches: int, num_players: int = DEFAULT_NUM_PLAYERS, seed: int = 0
+) -> pd.DataFrame:
+    """
+    Make a player info DataFrame with the columns and dtypes of player_info.csv.
+
+    Parameters:
+        - num_matches (int): Number of matches (rows).
+        - num_players (int): Number of distinct players.
+        - seed (int): Seed for the random values.
+
+    Returns:
+        - pd.DataFrame: The synthetic player info.
+    """
+    rng = np.random.default_rng(seed)
+    names = np.array([f"Player {i}" for i in range(num_players)], dtype=object)
+    iocs = np.array(["FRA", "AUS", "ESP", "USA", "ARG", "SUI"], dtype=object)
+    hands = np.array(["R", "L"], dtype=object)
+    winners = rng.integers(num_players, size=num_matches)
+    losers = (winners + rng.integers(1, num_players, size=num_matches)) % num_players
+
+    df = pd.DataFrame({"match_id": np.arange(num_matches)})
+    for side, players in (("winner", winners), ("loser", losers)):
+        df[f"{side}_name"] = names[players]
+    for side, players in (("winner", winners), ("loser", losers)):
+        df[f"{side}_age"] = rng.uniform(17, 38, size=num_matches)
+    for side in ("winner", "loser"):
+        rank = rng.integers(1, 1500, size=num_matches).astype(float)
+        rank[rng.random(num_matches) < 0.02] = np.nan
+        df[f"{side}_rank"] = rank
+    for side in ("winner", "loser"):
+        df[f"{side}_rank_points"] = rng.integers(1, 12000, size=num_matches) * 1.0
+    for side in ("winner", "loser"):
+        seed_values = rng.integers(1, 33, size=num_matches).astype(float)
+        seed_values[rng.random(num_matches) < 0.7] = np.nan
+        df[f"{side}_seed"] = seed_values
+    for side, players in (("winner", winners), ("loser", losers)):
+        df[f"{side}_ioc"] = iocs[players % iocs.size]
+    for side, players in (("winner", winners), ("loser", losers)):
+        df[f"{side}_hand"] = hands[(players % 7 == 0).astype(int)]
+    return df
+
+
+def _player_info_wide_to_long_iterrows(df: pd.DataFrame) -> pd.DataFrame:
+    """The original row by row player_info_wide_to_long, kept as the baseline."""
+    transformed_data = []
+    for _, row in df.iterrows():
+        for player, opponent, outcome, win in (
+            ("winner", "loser", "win", 1),
+            ("loser", "winner", "lose", 0),
+        ):
+            data = {"match_id": row["match_id"]}
+            for attribute in ("name", "age", "rank", "rank_points", "seed", "ioc"):
+                data[f"player_{attribute}"] = row[f"{player}_{attribute}"]
+                data[f"opponent_{attribute}"] = row[f"{opponent}_{attribute}"]
+            data["player_hand"] = row[f"{player}_hand"]
+            data["opponent_hand"] = row[f"{opponent}_hand"]
+            data["outcome"] = outcome
+            data["win"] = win
+            transformed_data.append(data)
+    return pd.DataFrame(transformed_data)
+
+
+def benchmark_player_info_wide_to_long(num_matches: int) -> dict[str, float]:
+    """
+    Compare the row by row and vectorised wide to long reshapes of player info.
+
+    The reshapes are tested against each other in tests/test_player_info.py.
+
+    Parameters:
+        - num_matches (int): Number of matches in the synthetic player info.
+
+    Returns:
+        - dict[str, float]: Seconds taken by each implementation.
+    """
+    df = make_synthetic_player_info(num_matches)
+    timings = {}
+    start = time.perf_counter()
+    _player_info_wide_to_long_iterrows(df)
+    timings["iterrows"] = time.perf_counter() - start
+    start = time.perf_counter()
+    player_info_wide_to_long(df)
+    timings["vectorised"] = time.perf_counter() - start
+    return timings
+
+
+def make_synthetic_player_stats(num_matches: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Make a player stats DataFrame like the output of pivot_player_outcome_stats, two
+    rows per match sorted by match_id and player_id.
+
+    Parameters:
+        - num_matches (int): Number of matches.
+        - seed (int): Seed for the random values.
+
+    Returns:
+        - pd.DataFrame: match_id, player_id and a player_ column per OUTCOME_STATS.
+    """
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(
+        {
+            "match_id": np.repeat(np.arange(num_matches), 2),
+            "player_id": rng.integers(
+                0, DEFAULT_NUM_PLAYERS, size=2 * num_matches, dtype=np.int32
+            ),
+        }
+    )
+    for stat in OUTCOME_STATS:
+        df[f"player_{stat}"] = rng.integers(0, 100, size=2 * num_matches)
+    return df.sort_values(["match_id", "player_id"], ignore_index=True)
+
+
+def _merge_with_opponent_stats_self_merge(df: pd.DataFrame) -> pd.DataFrame:
+    """The original self merge merge_with_opponent_stats, kept as the reference."""
+    merged_df = pd.merge(
+        df,
+        df,
+        how="inner",
+        left_on=["match_id", "player_id"],
+        right_on=["match_id", "player_id"],
+        suffixes=("", "_opponent"),
+    )
+    return merged_df.rename(
+        columns=lambda x: (
+            x.replace("_opponent", "").replace("player_", "opponent_")
+            if "_opponent" in x
+            else x
+        )
+    )
+
+
+def _time_and_peak_memory(function, *args) -> tuple[float, float, pd.DataFrame]:
+    """Seconds taken and peak traced MB allocated by a call, and its result."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function(*args)
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+    return seconds, peak, result
+
+
+def benchmark_merge_with_opponent_stats(num_matches: int) -> dict[str, tuple]:
+    """
+    Compare the self merge and the row pair swap in merge_with_opponent_stats.
+
+    Parameters:
+        - num_matches (int): Number of matches in the synthetic player stats.
+
+    Returns:
+        - dict[str, tuple]: Seconds taken and peak MB allocated by each implementation.
+
+    Note:
+        The self merge joins each row with itself rather than its opponent, the row pair
+        swap is tested against the other player's stats in tests/test_player_outcomes.py.
+    """
+    df = make_synthetic_player_stats(num_matches)
+    timings = {}
+    *timings["self merge"], _ = _time_and_peak_memory(
+        _merge_with_opponent_stats_self_merge, df
+    )
+    *timings["row pair swap"], _ = _time_and_peak_memory(merge_with_opponent_stats, df)
+    return timings
+
+
+def make_synthetic_final_data(num_matches: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Make a DataFrame with the columns calculate_historic_features reads.
+
+    Parameters:
+        - num_matches (int): Number of matches, each gives a row for both players.
+        - seed (int): Seed for the random values.
+
+    Returns:
+        - pd.DataFrame: One row per player per match, matches grouped in weekly
+          tournaments of MATCHES_PER_TOURNAMENT matches cycling through SURFACES, with
+          about 1% of the features missing.
+    """
+    rng = np.random.default_rng(seed)
+    match_ids = np.arange(num_matches)
+    players = rng.integers(DEFAULT_NUM_PLAYERS, size=num_matches, dtype=np.int32)
+    opponents = (
+        players + rng.integers(1, DEFAULT_NUM_PLAYERS, size=num_matches)
+    ) % DEFAULT_NUM_PLAYERS
+    tourney_dates = pd.Timestamp("2000-01-03") + pd.to_timedelta(
+        7 * (match_ids // MATCHES_PER_TOURNAMENT), unit="D"
+    )
+    df = pd.DataFrame(
+        {
+            "match_id": np.r_[match_ids, match_ids],
+            "tourney_date": np.r_[tourney_dates, tourney_dates],
+            "match_num": np.r_[match_ids, match_ids] % MATCHES_PER_TOURNAMENT + 1,
+            "player_id": np.r_[players, opponents],
+            "opponent_id": np.r_[opponents, players],
+        }
+    )
+    tournaments = df["match_id"] // MATCHES_PER_TOURNAMENT
+    df["surface"] = np.array(SURFACES)[tournaments % len(SURFACES)]
+    for side in ("player", "opponent"):
+        for feature in HISTORIC_FEATURES:
+            values = rng.random(2 * num_matches)
+            values[rng.random(2 * num_matches) < 0.01] = np.nan
+            df[f"{side}_{feature}"] = values
+    return df
+
+
+def _calculate_historic_features_groupby(
+    final_dataframe: pd.DataFrame,
+) -> pd.DataFrame:
+    """
+    calculate_historic_features from the sums and counts of each player and date, as
+    the reference.
+    """
+    final_dataframe = final_dataframe.sort_values(by=["tourney_date", "match_num"])
+    historic_features_df = final_dataframe[["match_id", "player_id", "opponent_id"]]
+    historic_features_df = historic_features_df.copy()
+    for side in ("player", "opponent"):
+        keys = [final_dataframe[f"{side}_id"], final_dataframe["tourney_date"]]
+        historic_features_df[f"games_played_by_{side}"] = (
+            final_dataframe.groupby(f"{side}_id").cumcount().groupby(keys)
+        ).transform("min")
+    for feature in HISTORIC_FEATURES:
+        for side in ("player", "opponent"):
+            keys = [final_dataframe[f"{side}_id"], final_dataframe["tourney_date"]]
+            per_date = final_dataframe.groupby(keys)[f"{side}_{feature}"].agg(
+                ["sum", "count"]
+            )
+            # Sums and counts over the player's dates before each date.
+            prior = per_date.groupby(level=0).cumsum() - per_date
+            means = (prior["sum"] / prior["count"]).reindex(
+                pd.MultiIndex.from_arrays(keys)
+            )
+            historic_features_df[f"historic_{side}_{feature}"] = means.to_numpy()
+    return historic_features_df.fillna(0)
+
+
+def benchmark_calculate_historic_features(num_matches: int) -> dict[str, float]:
+    """
+    Compare the groupby apply and cumulative sum calculate_historic_features.
+
+    Parameters:
+        - num_matches (int): Number of matches in the synthetic final data.
+
+    Returns:
+        - dict[str, float]: Seconds taken by each implementation.
+    """
+    df = make_synthetic_final_data(num_matches)
+    timings = {}
+    start = time.perf_counter()
+    reference = _calculate_historic_features_groupby(df)
+    timings["groupby"] = time.perf_counter() - start
+    start = time.perf_counter()
+    result = calculate_historic_features(df)
+    timings["cumsum"] = time.perf_counter() - start
+    pd.testing.assert_frame_equal(result, reference, rtol=1e-12)
+    return timings
+
+
+def benchmark_historic_feature_store(num_matches: int) -> dict[str, float]:
+    """
+    Compare rebuilding the historic features with appending matches to the store.
+
+    The synthetic matches are appended in two batches per tournament, the first and
+    later rounds, so batches both start new tourney dates and continue stored ones.
+
+    Parameters:
+        - num_matches (int): Number of matches in the synthetic final data.
+
+    Returns:
+        - dict[str, float]: Seconds taken by the full rebuild, by appending all the
+          batches, and by appending the last batch.
+    """
+    df = make_synthetic_final_data(num_matches)
+    batches = df.groupby(
+        [df["tourney_date"], df["match_num"] > MATCHES_PER_TOURNAMENT // 2],
+        sort=True,
+    )
+    timings = {}
+    start = time.perf_counter()
+    reference = calculate_historic_features(df)
+    timings["rebuild"] = time.perf_counter() - start
+
+    store = HistoricFeatureStore()
+    results = []
+    start = time.perf_counter()
+    for _, batch in batches:
+        batch_start = time.perf_counter()
+        results.append(store.update(batch))
+    timings["all batches"] = time.perf_counter() - start
+    timings["last batch"] = time.perf_counter() - batch_start
+
+    def sort_rows(features_df: pd.DataFrame) -> pd.DataFrame:
+        return features_df.sort_values(["match_id", "player_id"], ignore_index=True)
+
+    pd.testing.assert_frame_equal(
+        sort_rows(pd.concat(results)), sort_rows(reference), check_exact=True
+    )
+    return timings
+
+
+def _calculate_form_features_loop(final_dataframe: pd.DataFrame) -> pd.DataFrame:
+    """calculate_form_features with a Python loop over the rows, as the reference."""
+    final_dataframe = final_dataframe.sort_values(by=["tourney_date", "match_num"])
+    form_features_df = final_dataframe[["match_id", "player_id", "opponent_id"]]
+    days = (final_dataframe["tourney_date"] - pd.Timestamp(0)).dt.days.to_numpy()
+    kinds = (
+        "ewm",
+        f"last_{FORM_LAST_MATCHES}_matches",
+        f"last_{FORM_LAST_DAYS}_days",
+        "surface",
+    )
+    form_columns = {}
+    for side in ("player", "opponent"):
+        ids = final_dataframe[f"{side}_id"].to_numpy()
+        surfaces = final_dataframe["surface"].to_numpy()
+        values = final_dataframe[
+            [f"{side}_{feature}" for feature in HISTORIC_FEATURES]
+        ].to_numpy()
+        means = {kind: np.full(values.shape, np.nan) for kind in kinds}
+        for row in range(len(ids)):
+            earlier = np.flatnonzero((ids == ids[row]) & (days < days[row]))
+            windows = {
+                "ewm": earlier,
+                kinds[1]: earlier[-FORM_LAST_MATCHES:],
+                kinds[2]: earlier[days[row] - days[earlier] < FORM_LAST_DAYS],
+                "surface": earlier[surfaces[earlier] == surfaces[row]],
+            }
+            weights = np.exp2(-(days[row] - days[earlier]) / FORM_HALF_LIFE_DAYS)
+            for kind, window in windows.items():
+                window_values = values[window]
+                window_weights = (
+                    weights[:, None] if kind == "ewm" else np.ones((len(window), 1))
+                ) * ~np.isnan(window_values)
+                with np.errstate(invalid="ignore"):
+                    means[kind][row] = np.nansum(
+                        window_values * window_weights, axis=0
+                    ) / window_weights.sum(axis=0)
+        for kind in kinds:
+            for position, feature in enumerate(HISTORIC_FEATURES):
+                form_columns[kind, feature, side] = means[kind][:, position]
+    form_columns = {
+        f"{kind}_{side}_{feature}": form_columns[kind, feature, side]
+        for kind in kinds
+        for feature in HISTORIC_FEATURES
+        for side in ("player", "opponent")
+    }
+    form_features_df = pd.concat(
+        [
+            form_features_df,
+            pd.DataFrame(form_columns, index=form_features_df.index),
+        ],
+        axis=1,
+    )
+    return form_features_df.fillna(0)
+
+
+def benchmark_calculate_form_features(
+    num_matches: int, num_reference_matches: int = 2000
+) -> dict[str, float]:
+    """
+    Time the form feature means against the plain prior means they extend.
+
+    The form features of the first num_reference_matches matches are also checked
+    against a Python loop over the rows.
+
+    Parameters:
+        - num_matches (int): Number of matches in the synthetic final data.
+        - num_reference_matches (int): Number of matches checked against the loop.
+
+    Returns:
+        - dict[str, float]: Seconds taken by each mean of the player features.
+    """
+    df = make_synthetic_final_data(num_reference_matches)
+    pd.testing.assert_frame_equal(
+        calculate_form_features(df), _calculate_form_features_loop(df), rtol=1e-9
+    )
+
+    df = make_synthetic_final_data(num_matches)
+    df = df.sort_values(by=["tourney_date", "match_num"])
+    features = [f"player_{feature}" for feature in HISTORIC_FEATURES]
+    means = {
+        "prior": lambda: calculate_prior_means(
+            df, ["player_id"], features, exclude_ties_on="tourney_date"
+        ),
+        "ewm": lambda: calculate_prior_ewm_means(
+            df, ["player_id"], features, FORM_HALF_LIFE_DAYS
+        ),
+        "last matches": lambda: calculate_prior_window_means(
+            df, ["player_id"], features, last_matches=FORM_LAST_MATCHES
+        ),
+        "last days": lambda: calculate_prior_window_means(
+            df, ["player_id"], features, last_days=FORM_LAST_DAYS
+        ),
+        "surface": lambda: calculate_prior_means(
+            df, ["player_id", "surface"], features, exclude_ties_on="tourney_date"
+        ),
+    }
+    timings = {}
+    for name, mean in means.items():
+        start = time.perf_counter()
+        mean()
+        timings[name] = time.perf_counter() - start
+    return timings
+
+
+def benchmark_player_history(
+    num_matches: int, num_queries: int = 10_000
+) -> dict[str, float]:
+    """
+    Check as-of queries against the form features and time them.
+
+    Querying every row's player as of its tourney date must give the games played
+    and historic features of calculate_historic_features, and the ewm and last days
+    form features.
+
+    Parameters:
+        - num_matches (int): Number of matches in the synthetic final data.
+        - num_queries (int): Number of single queries timed.
+
+    Returns:
+        - dict[str, float]: Seconds taken to build the history, and microseconds per
+          single and per batched query.
+    """
+    df = make_synthetic_final_data(num_matches)
+    df = df.sort_values(by=["tourney_date", "match_num"], ignore_index=True)
+    timings = {}
+    start = time.perf_counter()
+    history = build_player_history(df)
+    timings["build"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = history.features_as_of_batch(df["player_id"], df["tourney_date"])
+    timings["batched query"] = 1e6 * (time.perf_counter() - start) / len(df)
+
+    features = [f"player_{feature}" for feature in HISTORIC_FEATURES]
+    historic_features_df = calculate_historic_features(df)
+    form_features_df = calculate_form_features(df)
+    expected = {
+        "historic": historic_features_df[
+            [f"historic_{feature}" for feature in features]
+        ],
+        "ewm": form_features_df[[f"ewm_{feature}" for feature in features]],
+        f"last_{FORM_LAST_DAYS}_days": form_features_df[
+            [f"last_{FORM_LAST_DAYS}_days_{feature}" for feature in features]
+        ],
+    }
+    np.testing.assert_array_equal(
+        result["games_played"], historic_features_df["games_played_by_player"]
+    )
+    for kind, rtol in (
+        ("historic", 0),
+        ("ewm", 0),
+        (f"last_{FORM_LAST_DAYS}_days", 1e-9),
+    ):
+        np.testing.assert_allclose(
+            result[[f"{kind}_{feature}" for feature in HISTORIC_FEATURES]],
+            expected[kind],
+            rtol=rtol,
+            atol=0 if rtol == 0 else 1e-10,
+        )
+
+    rng = np.random.default_rng(0)
+    player_ids = rng.integers(DEFAULT_NUM_PLAYERS, size=num_queries)
+    dates = rng.choice(df["tourney_date"].to_numpy(), size=num_queries)
+    start = time.perf_counter()
+    for player_id, date in zip(player_ids, dates):
+        history.features_as_of(player_id, date)
+    timings["single query"] = 1e6 * (time.perf_counter() - start) / num_queries
+    return timings
+
+
+if __name__ == "__main__":
+    num_matches = DEFAULT_SCALE * len(pd.read_csv(DEFAULT_MATCH_INFO_PATH))
+    timings = benchmark_player_info_wide_to_long(num_matches)
+    print(f"player_info_wide_to_long on {num_matches} matches")
+    for name, seconds in timings.items():
+        print(f"    {name:>10}: {seconds:8.3f}s")
+    print(f"    {'speed up':>10}: {timings['iterrows'] / timings['vectorised']:8.1f}x")
+
+    timings = benchmark_merge_with_opponent_stats(num_matches)
+    print(f"merge_with_opponent_stats on {num_matches} matches")
+    for name, (seconds, peak) in timings.items():
+        print(f"    {name:>13}: {seconds:8.3f}s {peak:8.1f}MB peak")
+
+    num_matches = len(pd.read_csv(DEFAULT_MATCH_INFO_PATH))
+    timings = benchmark_calculate_historic_features(num_matches)
+    print(f"calculate_historic_features on {num_matches} matches")
+    for name, seconds in timings.items():
+        print(f"    {name:>10}: {seconds:8.3f}s")
+    print(f"    {'speed up':>10}: {timings['groupby'] / timings['cumsum']:8.1f}x")
+
+    timings = benchmark_historic_feature_store(num_matches)
+    print(f"historic feature store on {num_matches} matches")
+    for name, seconds in timings.items():
+        print(f"    {name:>11}: {seconds:8.3f}s")
+
+    timings = benchmark_calculate_form_features(num_matches)
+    print(f"form feature means on {num_matches} matches")
+    for name, seconds in timings.items():
+        print(
+            f"    {name:>12}: {seconds:8.3f}s {seconds / timings['prior']:5.1f}x prior"
+        )
+
+    timings = benchmark_player_history(num_matches)
+    print(f"player history on {num_matches} matches")
+    print(f"    {'build':>13}: {timings.pop('build'):8.3f}s")
+    for name, microseconds in timings.items():
+        print(f"    {name:>13}: {microseconds:8.1f}us per query")
@@ -0,0 +1,278 @@
+"""
+Point-in-time queries of player features.
+
+A PlayerHistory holds every player's matches sorted by player and date, with the
+cumulative sums of the features before each match, so the features of a player as of a
+date are read off with one binary search instead of loading and filtering
+final_data.csv. Queries only use matches at earlier dates, like
+calculate_historic_features and calculate_form_features, and answer for one
+(player_id, date) pair or for arrays of them at once.
+
+Notes:
+    The matches are in one array sorted by a key combining the player_id and the day,
+    so a query is a single searchsorted in O(log n) over all the matches. The
+    cumulative sums are padded with each player's totals after their last match, so the
+    sums before any date are a single lookup.
+"""
+
+import pickle
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from tennis.data_processing.historical_features.historic_featureset import (
+    FORM_HALF_LIFE_DAYS,
+    FORM_LAST_DAYS,
+    HISTORIC_FEATURES,
+    calculate_log_ewm_means,
+    calculate_log_ewm_terms,
+    calculate_prior_sums,
+)
+
+PLAYER_HISTORY_PATH = "./data/player_history.pkl"
+
+
+@dataclass
+class PlayerHistory:
+    """
+    Dataclass to hold the match history of every player for as-of queries.
+
+    Attributes:
+        - features (tuple[str, ...]): The features, as in HISTORIC_FEATURES.
+        - half_life_days (float): Half life of the exponentially weighted means.
+        - last_days (int): Number of days in the last days means.
+        - offsets (np.ndarray): Start of each player's matches in keys, with the number
+          of matches at the end, indexed by player_id.
+        - keys (np.ndarray): Sorted key of each match, player_id * key_spacing + days
+          since first_day.
+        - first_day (int): Day number of the earliest match.
+        - key_spacing (int): Spacing of the players' keys, more than any day offset.
+        - cumulative (np.ndarray): For each match and then once more after each
+          player's last match, the sums before it of each feature, the counts of its
+          non-missing values, and its exponentially weighted means, 0 if none.
+    """
+
+    features: tuple[str, ...]
+    half_life_days: float
+    last_days: int
+    offsets: np.ndarray
+    keys: np.ndarray
+    first_day: int
+    key_spacing: int
+    cumulative: np.ndarray
+
+    @property
+    def num_players(self) -> int:
+        """Number of player ids covered, from 0."""
+        return len(self.offsets) - 1
+
+    @property
+    def feature_names(self) -> list[str]:
+        """Names of the values returned by the queries, in order."""
+        return [
+            "games_played",
+            *[f"historic_{feature}" for feature in self.features],
+            *[f"ewm_{feature}" for feature in self.features],
+            *[f"last_{self.last_days}_days_{feature}" for feature in self.features],
+        ]
+
+    def _search(self, player_ids: np.ndarray, days: np.ndarray) -> np.ndarray:
+        """Position in keys of each player's first match on or after each day."""
+        offsets = np.clip(days - self.first_day, -1, self.key_spacing - 1)
+        return np.searchsorted(self.keys, player_ids * self.key_spacing + offsets)
+
+    def _search_one(self, player_id: int, day: int) -> int:
+        """_search for a single player and day, without the array overheads."""
+        offset = min(max(day - self.first_day, -1), self.key_spacing - 1)
+        return int(self.keys.searchsorted(player_id * self.key_spacing + offset))
+
+    def _means(self, prior: np.ndarray, window_start: np.ndarray) -> np.ndarray:
+        """
+        Divide the sums before a date by their counts, 0 where there are none.
+
+        Parameters:
+            - prior (np.ndarray): Rows of cumulative before the dates.
+            - window_start (np.ndarray): Rows of cumulative before the window starts.
+
+        Returns:
+            - np.ndarray: The historic, ewm and last days means.
+        """
+        num_features = len(self.features)
+        num_sums = 2 * num_features
+        window = prior[..., :num_sums] - window_start[..., :num_sums]
+        blocks = np.concatenate([prior[..., :num_sums], window], axis=-1)
+        # Sums and counts of the historic and last days means.
+        blocks = blocks.reshape(*blocks.shape[:-1], 2, 2, num_features)
+        sums, counts = blocks[..., 0, :], blocks[..., 1, :]
+        means = np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)
+        means = means.reshape(*means.shape[:-2], -1)
+        return np.concatenate(
+            [
+                means[..., :num_features],
+                prior[..., num_sums:],
+                means[..., num_features:],
+            ],
+            axis=-1,
+        )
+
+    def features_as_of(self, player_id: int, date) -> np.ndarray:
+        """
+        Get the features of a player as of a date.
+
+        Parameters:
+            - player_id (int): The player id, unknown ids have no matches.
+            - date: The date, anything np.datetime64 accepts, e.g. "2024-01-15". Matches
+              on the date itself are not used.
+
+        Returns:
+            - np.ndarray: The values of feature_names, 0 where a mean has no matches.
+        """
+        values = np.zeros(1 + 3 * len(self.features))
+        if not 0 <= player_id < self.num_players:
+            return values
+        day = int(np.datetime64(date, "D").astype(np.int64))
+        upper = self._search_one(player_id, day)
+        lower = self._search_one(player_id, day - self.last_days + 1)
+        # Padded positions, shifted by one for each earlier player's totals row.
+        values[0] = upper - self.offsets[player_id]
+        values[1:] = self._means(
+            self.cumulative[upper + player_id], self.cumulative[lower + player_id]
+        )
+        return values
+
+    def features_as_of_batch(self, player_ids, dates) -> pd.DataFrame:
+        """
+        Get the features of players as of dates.
+
+        Parameters:
+            - player_ids (array-like): The player ids, unknown ids have no matches.
+            - dates (array-like): The date of each query, anything pd.to_datetime
+              accepts. Matches on the date itself are not used.
+
+        Returns:
+            - pd.DataFrame: One row per query with the feature_names columns, 0 where a
+              mean has no matches.
+        """
+        player_ids = np.asarray(player_ids, dtype=np.int64)
+        days = pd.to_datetime(dates).to_numpy("datetime64[D]").astype(np.int64)
+        known = (player_ids >= 0) & (player_ids < self.num_players)
+        player_ids = np.where(known, player_ids, 0)
+        upper = self._search(player_ids, days)
+        lower = self._search(player_ids, days - self.last_days + 1)
+        values = np.hstack(
+            [
+                (upper - self.offsets[player_ids])[:, None],
+                self._means(
+                    self.cumulative[upper + player_ids],
+                    self.cumulative[lower + player_ids],
+                ),
+            ]
+        )
+        values[~known] = 0.0
+        return pd.DataFrame(values, columns=self.feature_names)
+
+
+def build_player_history(
+    final_dataframe: pd.DataFrame,
+    features: tuple[str, ...] = HISTORIC_FEATURES,
+    half_life_days: float = FORM_HALF_LIFE_DAYS,
+    last_days: int = FORM_LAST_DAYS,
+) -> PlayerHistory:
+    """
+    Build the match history of every player from the final DataFrame.
+
+    Parameters:
+        - final_dataframe (pd.DataFrame): The final DataFrame, one row per player per
+          match with the player_{feature} columns.
+        - features (tuple[str, ...]): The features to query.
+        - half_life_days (float): Half life of the exponentially weighted means.
+        - last_days (int): Number of days in the last days means.
+
+    Returns:
+        - PlayerHistory: The history. Querying a player as of a match's tourney date
+          gives the games_played_by_player and historic_player_* values of
+          calculate_historic_features, and the ewm and last days means of
+          calculate_form_features.
+    """
+    final_dataframe = final_dataframe.sort_values(by=["tourney_date", "match_num"])
+    player_ids = final_dataframe["player_id"].to_numpy(dtype=np.int64)
+    days = (
+        pd.to_datetime(final_dataframe["tourney_date"])
+        .to_numpy("datetime64[D]")
+        .astype(np.int64)
+    )
+    order = np.lexsort((days, player_ids))
+    player_ids, days = player_ids[order], days[order]
+
+    num_players = int(player_ids.max(initial=-1)) + 1
+    offsets = np.r_[0, np.cumsum(np.bincount(player_ids, minlength=num_players))]
+    first_day = int(days.min(initial=0))
+    key_spacing = int(days.max(initial=0)) - first_day + 2
+    keys = player_ids * key_spacing + (days - first_day)
+
+    values = final_dataframe[[f"player_{feature}" for feature in features]]
+    values = values.to_numpy(dtype=np.float64)[order]
+    present = ~np.isnan(values)
+    stacked = np.hstack([np.where(present, values, 0.0), present])
+    # Weights relative to each player's first match, the query date's factor cancels
+    # out of the means, so they are the same for any date until the next match.
+    terms = calculate_log_ewm_terms(
+        stacked, (days - days[offsets[player_ids]]) / half_life_days
+    )
+    prior = calculate_prior_sums(stacked, player_ids)
+    log_prior = calculate_prior_sums(terms, player_ids, ufunc=np.logaddexp)
+
+    cumulative = np.zeros((len(player_ids) + num_players, 3 * len(features)))
+    cumulative[np.arange(len(player_ids)) + player_ids] = np.hstack(
+        [prior, np.nan_to_num(calculate_log_ewm_means(log_prior))]
+    )
+    played = np.flatnonzero(np.diff(offsets))
+    last_rows = offsets[played + 1] - 1
+    log_totals = np.logaddexp(log_prior[last_rows], terms[last_rows])
+    cumulative[offsets[played + 1] + played] = np.hstack(
+        [
+            prior[last_rows] + stacked[last_rows],
+            np.nan_to_num(calculate_log_ewm_means(log_totals)),
+        ]
+    )
+
+    return PlayerHistory(
+        features=tuple(features),
+        half_life_days=half_life_days,
+        last_days=last_days,
+        offsets=offsets,
+        keys=keys,
+        first_day=first_day,
+        key_spacing=key_spacing,
+        cumulative=cumulative,
+    )
+
+
+def load_player_history(path: str | Path = PLAYER_HISTORY_PATH) -> PlayerHistory:
+    """
+    Load a saved player history.
+
+    Parameters:
+        - path (str | Path): Path of the saved history.
+
+    Returns:
+        - PlayerHistory: The history.
+    """
+    with open(path, "rb") as file:
+        return pickle.load(file)
+
+
+def save_player_history(
+    history: PlayerHistory, path: str | Path = PLAYER_HISTORY_PATH
+) -> None:
+    """
+    Save a player history on disk.
+
+    Parameters:
+        - history (PlayerHistory): The history.
+        - path (str | Path): Path of the saved history.
+    """
+    with open(path, "wb") as file:
+        pickle.dump(history, file)
@@ -0,0 +1,307 @@
+"""
+Incremental store of the historic features.
+
+The store keeps the running state calculate_historic_features builds up for every player,
+on each side of the match: the date and match number of their last row, the sums of the
+features, the counts of their non-missing values and the number of rows over all their
+rows, and the same sums over their rows before that last tourney date. The state lives
+in numpy arrays indexed by player_id, so appending new matches only reads and writes the
+rows of the players in them, and emits their pre-match features.
+
+Notes:
+    The sums are continued with calculate_prior_sums, which adds values one at a time,
+    so the features of matches appended in any number of batches are exactly equal to
+    a full calculate_historic_features rebuild, as long as the new matches of each
+    player come after their stored ones in (tourney_date, match_num) order.
+"""
+
+import os
+import pickle
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from tennis.data_processing.historical_features.historic_featureset import (
+    HISTORIC_FEATURES,
+    calculate_means,
+    calculate_prior_sums,
+)
+
+FEATURE_STORE_PATH = "./data/historic_feature_store.pkl"
+HISTORIC_FEATURES_PATH = "./data/historic_features.csv"
+NO_DATE = np.datetime64("NaT", "ns")
+
+
+class LateMatchError(ValueError):
+    """Raised when new matches come before the stored matches of their players."""
+
+
+@dataclass
+class RunningAggregates:
+    """
+    Dataclass to hold the running state of every player on one side of the matches.
+
+    Attributes:
+        - num_features (int): Number of features.
+        - last_dates (np.ndarray): Tourney date of each player's last row, NaT if none.
+        - last_match_nums (np.ndarray): Match number of each player's last row.
+        - sums (np.ndarray): Sums of each feature, then the counts of its non-missing
+          values, then the number of rows, over all the player's rows.
+        - earlier_sums (np.ndarray): The same sums over the player's rows before their
+          last tourney date.
+    """
+
+    num_features: int
+    last_dates: np.ndarray = field(
+        default_factory=lambda: np.zeros(0, dtype="datetime64[ns]")
+    )
+    last_match_nums: np.ndarray = field(
+        default_factory=lambda: np.zeros(0, dtype=np.int64)
+    )
+    sums: np.ndarray | None = None
+    earlier_sums: np.ndarray | None = None
+
+    def __post_init__(self) -> None:
+        if self.sums is None:
+            self.sums = np.zeros((0, 2 * self.num_features + 1))
+        if self.earlier_sums is None:
+            self.earlier_sums = np.zeros_like(self.sums)
+
+    def _grow(self, num_players: int) -> None:
+        """Add empty state for player ids up to at least num_players - 1."""
+        if num_players <= len(self.last_dates):
+            return
+        # Grow geometrically, so new players do not copy the state on every append.
+        extra = max(num_players, 2 * len(self.last_dates)) - len(self.last_dates)
+        self.last_dates = np.r_[self.last_dates, np.full(extra, NO_DATE)]
+        self.last_match_nums = np.r_[
+            self.last_match_nums, np.zeros(extra, dtype=np.int64)
+        ]
+        empty = np.zeros((extra, self.sums.shape[1]))
+        self.sums = np.vstack([self.sums, empty])
+        self.earlier_sums = np.vstack([self.earlier_sums, empty])
+
+    def update(
+        self,
+        ids: np.ndarray,
+        dates: np.ndarray,
+        match_nums: np.ndarray,
+        values: np.ndarray,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Add rows to the state and get the state before each of them. Raises
+        LateMatchError, leaving the state unchanged, if a row comes before the last
+        stored row of its player.
+
+        Parameters:
+            - ids (np.ndarray): Player id of each row.
+            - dates (np.ndarray): datetime64[ns] tourney date of each row.
+            - match_nums (np.ndarray): Match number of each row.
+            - values (np.ndarray): 2D array of the features of each row, NaN if missing.
+              Rows must be in (tourney_date, match_num) order.
+
+        Returns:
+            - tuple[np.ndarray, np.ndarray]: The number of rows of each row's player at
+              earlier tourney dates, and the means of the features over them, NaN where
+              there are none.
+        """
+        self._grow(int(ids.max(initial=-1)) + 1)
+        earlier = (dates < self.last_dates[ids]) | (
+            (dates == self.last_dates[ids]) & (match_nums <= self.last_match_nums[ids])
+        )
+        if earlier.any():
+            msg = (
+                f"Matches must come after the stored matches of their players, "
+                f"{int(earlier.sum())} rows do not. Rebuild the store instead."
+            )
+            raise LateMatchError(msg)
+
+        present = ~np.isnan(values)
+        stacked = np.hstack(
+            [np.where(present, values, 0.0), present, np.ones((len(ids), 1))]
+        )
+        running = calculate_prior_sums(stacked, ids, self.sums)
+
+        # Every row of a player's date takes the sums from before the date, which are
+        # the stored earlier sums if the date continues the player's last one.
+        runs = pd.DataFrame({"id": ids, "date": dates})
+        runs = runs.groupby(["id", "date"], sort=False).ngroup().to_numpy()
+        _, first_rows, runs = np.unique(runs, return_index=True, return_inverse=True)
+        prior = running[first_rows[runs]]
+        continues = dates == self.last_dates[ids]
+        prior[continues] = self.earlier_sums[ids[continues]]
+
+        # Rows are in date order, so the last row of each player has their new state.
+        last_rows = len(ids) - 1 - np.unique(ids[::-1], return_index=True)[1]
+        last_ids = ids[last_rows]
+        self.sums[last_ids] = running[last_rows] + stacked[last_rows]
+        self.earlier_sums[last_ids] = prior[last_rows]
+        self.last_dates[last_ids] = dates[last_rows]
+        self.last_match_nums[last_ids] = match_nums[last_rows]
+
+        prior_sums, prior_counts = np.split(prior[:, :-1], 2, axis=1)
+        return prior[:, -1].astype(np.int64), calculate_means(prior_sums, prior_counts)
+
+
+@dataclass
+class HistoricFeatureStore:
+    """
+    Dataclass to hold the running state of the historic features of every player.
+
+    Attributes:
+        - features (tuple[str, ...]): The features, as in HISTORIC_FEATURES.
+        - player (RunningAggregates): State of each player_id from the player columns.
+        - opponent (RunningAggregates): State of each opponent_id from the opponent
+          columns.
+        - num_rows (int): Number of rows added, to check the store against the saved
+          features.
+    """
+
+    features: tuple[str, ...] = HISTORIC_FEATURES
+    player: RunningAggregates | None = None
+    opponent: RunningAggregates | None = None
+    num_rows: int = 0
+
+    def __post_init__(self) -> None:
+        if self.player is None:
+            self.player = RunningAggregates(len(self.features))
+        if self.opponent is None:
+            self.opponent = RunningAggregates(len(self.features))
+
+    def update(self, new_matches: pd.DataFrame) -> pd.DataFrame:
+        """
+        Add new matches to the store and get their historic features.
+
+        Parameters:
+            - new_matches (pd.DataFrame): The new rows, with the columns
+              calculate_historic_features reads.
+
+        Returns:
+            - pd.DataFrame: The historic features of the new rows, as
+              calculate_historic_features would give them from all the matches.
+        """
+        new_matches = new_matches.sort_values(by=["tourney_date", "match_num"])
+        dates = pd.to_datetime(new_matches["tourney_date"]).to_numpy("datetime64[ns]")
+        match_nums = new_matches["match_num"].to_numpy(dtype=np.int64)
+
+        historic_features_df = new_matches[["match_id", "player_id", "opponent_id"]]
+        historic_features_df = historic_features_df.copy()
+        means = {}
+        for side, aggregates in (("player", self.player), ("opponent", self.opponent)):
+            games_played, means[side] = aggregates.update(
+                new_matches[f"{side}_id"].to_numpy(),
+                dates,
+                match_nums,
+                new_matches[
+                    [f"{side}_{feature}" for feature in self.features]
+                ].to_numpy(dtype=np.float64),
+            )
+            historic_features_df[f"games_played_by_{side}"] = games_played
+        for position, feature in enumerate(self.features):
+            for side in ("player", "opponent"):
+                historic_features_df[f"historic_{side}_{feature}"] = means[side][
+                    :, position
+                ]
+        self.num_rows += len(new_matches)
+
+        return historic_features_df.fillna(0)
+
+
+def load_historic_feature_store(
+    path: str | Path = FEATURE_STORE_PATH,
+) -> HistoricFeatureStore:
+    """
+    Load a saved historic feature store, or start an empty one if there is none.
+
+    Parameters:
+        - path (str | Path): Path of the saved store.
+
+    Returns:
+        - HistoricFeatureStore: The store.
+    """
+    if not Path(path).exists():
+        return HistoricFeatureStore()
+    with open(path, "rb") as file:
+        return pickle.load(file)
+
+
+def save_historic_feature_store(
+    store: HistoricFeatureStore, path: str | Path = FEATURE_STORE_PATH
+) -> None:
+    """
+    Save a historic feature store on disk, replacing the saved one in one step.
+
+    Parameters:
+        - store (HistoricFeatureStore): The store.
+        - path (str | Path): Path of the saved store.
+    """
+    temporary_path = _temporary_path(path)
+    with open(temporary_path, "wb") as file:
+        pickle.dump(store, file)
+    os.replace(temporary_path, path)
+
+
+def _temporary_path(path: str | Path) -> Path:
+    """Path next to path to write to before replacing it."""
+    path = Path(path)
+    return path.with_name(f"{path.name}.tmp")
+
+
+def update_historic_features(
+    final_dataframe: pd.DataFrame,
+    store_path: str | Path = FEATURE_STORE_PATH,
+    features_path: str | Path = HISTORIC_FEATURES_PATH,
+) -> pd.DataFrame:
+    """
+    Calculate the historic features of the matches not in the saved features yet.
+
+    Parameters:
+        - final_dataframe (pd.DataFrame): All the matches, with the columns
+          calculate_historic_features reads.
+        - store_path (str | Path): Path of the saved store, updated with the new matches.
+        - features_path (str | Path): Path of the historic features CSV, the features of
+          the new matches are appended to it. Both are rebuilt if either is missing,
+          if they do not match each other or HISTORIC_FEATURES, or if new matches come
+          before stored matches of their players.
+
+    Returns:
+        - pd.DataFrame: The historic features of all the matches.
+    """
+    store, saved_features_df = None, None
+    if Path(store_path).exists() and Path(features_path).exists():
+        store = load_historic_feature_store(store_path)
+        saved_features_df = pd.read_csv(features_path, float_precision="round_trip")
+        # The features are appended before the store is saved, so a run stopped in
+        # between leaves them out of step and both are rebuilt, as they are when the
+        # features have changed since they were saved.
+        if (
+            getattr(store, "num_rows", None) != len(saved_features_df)
+            or getattr(store, "features", None) != HISTORIC_FEATURES
+        ):
+            store, saved_features_df = None, None
+
+    if saved_features_df is not None:
+        new_matches = final_dataframe[
+            ~final_dataframe["match_id"].isin(saved_features_df["match_id"])
+        ]
+        try:
+            new_features_df = store.update(new_matches)
+        except LateMatchError:
+            # Late or back filled matches come before stored matches of their players.
+            store, saved_features_df = None, None
+        else:
+            new_features_df.to_csv(features_path, mode="a", header=False, index=False)
+
+    if saved_features_df is None:
+        store = HistoricFeatureStore()
+        new_features_df = store.update(final_dataframe)
+        temporary_path = _temporary_path(features_path)
+        new_features_df.to_csv(temporary_path, index=False)
+        os.replace(temporary_path, features_path)
+
+    save_historic_feature_store(store, store_path)
+    if saved_features_df is None:
+        return new_features_df
+    return pd.concat([saved_features_df, new_features_df], ignore_index=True)
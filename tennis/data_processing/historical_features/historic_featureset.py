@@ -1,7 +1,25 @@
 """Functionality for calculating features at a given date."""
 
+import numpy as np
 import pandas as pd
 
+HISTORIC_FEATURES = (
+    "ace_pct",
+    "aces_per_game",
+    "bpsaved_pct",
+    "df_pct",
+    "df_per_game",
+    "first_serve_pct",
+    "first_serve_win_pct",
+    "second_serve_win_pct",
+    "serve_points_lost_per_game",
+    "serve_points_won_per_game",
+    "total_serve_win_pct",
+)
+FORM_HALF_LIFE_DAYS = 180.0
+FORM_LAST_MATCHES = 10
+FORM_LAST_DAYS = 365
+
 
 def calculate_cumulative_mean(df, group_cols, feature):
     """
@@ -16,25 +34,329 @@ def calculate_cumulative_mean(df, group_cols, feature):
         pd.Series: The cumulative mean series.
     """
     return (
-        df.groupby(group_cols)[feature]
+        df.groupby(group_cols, observed=True)[feature]
         .expanding()
         .mean()
         .reset_index(level=0, drop=True)
     )
 
 
-def calculate_games_played(df, group_cols):
+def calculate_games_played(df, group_cols, exclude_ties_on=None):
     """
     Calculate the cumulative count of games played by each player.
 
     Parameters:
         df (pd.DataFrame): The input DataFrame.
         group_cols (list): List of columns to group by.
+        exclude_ties_on (str | None): If given, rows of a group with the same value of
+            this column do not count each other. The df must be sorted by it.
 
     Returns:
         pd.Series: The cumulative count series.
     """
-    return df.groupby(group_cols).cumcount()
+    games_played = df.groupby(group_cols, observed=True).cumcount()
+    if exclude_ties_on is None:
+        return games_played
+    return games_played.groupby(
+        [df[col] for col in [*group_cols, exclude_ties_on]], observed=True, sort=False
+    ).transform("first")
+
+
+def calculate_prior_sums(
+    values: np.ndarray,
+    codes: np.ndarray,
+    initial: np.ndarray | None = None,
+    ufunc: np.ufunc = np.add,
+) -> np.ndarray:
+    """
+    Sum the values over the earlier rows of each group.
+
+    Parameters:
+        values (np.ndarray): 2D float array of the values, one row per df row.
+        codes (np.ndarray): Group code of each row, from 0 to the number of groups - 1.
+        initial (np.ndarray | None): Sums to start each group from, indexed by code.
+            The identity of ufunc if not given.
+        ufunc (np.ufunc): How two values are summed, e.g. np.logaddexp for sums of
+            values in the log domain.
+
+    Returns:
+        np.ndarray: The sums over the earlier rows of the group of each row, shaped like
+        values.
+
+    Notes:
+        The values of a group are added one row at a time in row order, without the
+        compensated summation of pandas' groupby cumsum, so continuing from the sums of
+        the last row of a group with initial gives exactly the same floats as summing
+        all the rows at once. Each step is vectorised over the groups, so the loop only
+        runs as many times as the largest group has rows.
+    """
+    if len(codes) == 0:
+        return np.full_like(values, ufunc.identity)
+    order = np.argsort(codes, kind="stable")
+    sorted_codes = codes[order]
+    sorted_values = values[order]
+    starts = np.r_[True, sorted_codes[1:] != sorted_codes[:-1]]
+    positions = np.arange(len(codes))
+    ranks = positions - np.maximum.accumulate(np.where(starts, positions, 0))
+
+    prior = np.empty_like(sorted_values)
+    prior[starts] = ufunc.identity if initial is None else initial[sorted_codes[starts]]
+    # Rows grouped by their rank in their group, so each step is one slice.
+    by_rank = np.argsort(ranks, kind="stable")
+    bounds = np.searchsorted(ranks[by_rank], np.arange(ranks.max(initial=0) + 2))
+    for rank in range(1, len(bounds) - 1):
+        rows = by_rank[bounds[rank] : bounds[rank + 1]]
+        prior[rows] = ufunc(prior[rows - 1], sorted_values[rows - 1])
+
+    result = np.empty_like(prior)
+    result[order] = prior
+    return result
+
+
+def calculate_prior_means(
+    df: pd.DataFrame,
+    group_cols: list[str],
+    features: list[str],
+    exclude_ties_on: str | None = None,
+) -> pd.DataFrame:
+    """
+    Calculate the mean of each feature over the earlier rows of each group.
+
+    Parameters:
+        df (pd.DataFrame): The input DataFrame, in time order.
+        group_cols (list): List of columns to group by.
+        features (list): The feature columns to calculate the prior means for.
+        exclude_ties_on (str | None): If given, rows of a group with the same value of
+            this column do not see each other, e.g. "tourney_date" to only use matches
+            from earlier tournaments. The df must be sorted by it.
+
+    Returns:
+        pd.DataFrame: The prior means, indexed like df, NaN where a group has no earlier
+        non-missing values. Equal to grouping by group_cols and taking
+        x.expanding().mean().shift() of each feature.
+
+    Notes:
+        All features are computed together from grouped sums and counts of the
+        non-missing values, one vectorised pass rather than a Python call per group.
+    """
+    group_keys = df[group_cols]
+    if exclude_ties_on is not None:
+        group_keys = group_keys.assign(**{exclude_ties_on: df[exclude_ties_on]})
+    codes = group_keys.groupby(group_cols, sort=False, observed=True).ngroup()
+    prior = calculate_prior_sums(_stack_features(df, features), codes.to_numpy())
+
+    if exclude_ties_on is not None:
+        # Every row of a run of ties takes the sums from the first row of the run.
+        runs = group_keys.groupby(
+            [*group_cols, exclude_ties_on], sort=False, observed=True
+        ).ngroup()
+        _, first_rows, runs = np.unique(
+            runs.to_numpy(), return_index=True, return_inverse=True
+        )
+        prior = prior[first_rows[runs]]
+
+    prior_sums, prior_counts = np.split(prior, 2, axis=1)
+    return pd.DataFrame(
+        calculate_means(prior_sums, prior_counts), index=df.index, columns=features
+    )
+
+
+def calculate_means(sums: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """
+    Divide sums by counts, NaN where the count is zero.
+
+    Parameters:
+        sums (np.ndarray): The sums.
+        counts (np.ndarray): The counts, shaped like sums.
+
+    Returns:
+        np.ndarray: The means.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(counts > 0, sums / counts, np.nan)
+
+
+def _stack_features(df: pd.DataFrame, features: list[str]) -> np.ndarray:
+    """Stack the features, 0 where missing, with 1s where they are not missing."""
+    values = df[features].to_numpy(dtype=np.float64)
+    present = ~np.isnan(values)
+    return np.hstack([np.where(present, values, 0.0), present])
+
+
+def _sort_by_group_and_date(
+    df: pd.DataFrame, group_cols: list[str], date_col: str
+) -> dict[str, np.ndarray]:
+    """
+    Sort the rows by group and then date, and locate each row's earlier rows.
+
+    Returns:
+        dict[str, np.ndarray]: The order sorting the rows, and for each sorted row its
+        group code, its day number, the sorted position of the first row of its group
+        and of the first row of its group at its date. The rows of a group before that
+        last position are exactly the ones at earlier dates.
+    """
+    codes = df.groupby(group_cols, sort=False, observed=True).ngroup().to_numpy()
+    days = pd.to_datetime(df[date_col]).to_numpy("datetime64[D]").astype(np.int64)
+    order = np.lexsort((days, codes))
+    codes, days = codes[order], days[order]
+    positions = np.arange(len(codes))
+    group_starts = np.r_[True, codes[1:] != codes[:-1]]
+    date_starts = group_starts | np.r_[True, days[1:] != days[:-1]]
+    return {
+        "order": order,
+        "codes": codes,
+        "days": days,
+        "group_start": np.maximum.accumulate(np.where(group_starts, positions, 0)),
+        "date_start": np.maximum.accumulate(np.where(date_starts, positions, 0)),
+    }
+
+
+def _unsort_means(
+    df: pd.DataFrame,
+    features: list[str],
+    order: np.ndarray,
+    sums: np.ndarray,
+) -> pd.DataFrame:
+    """Divide sorted sums by their counts and put the means back in the df's order."""
+    means = np.empty((len(order), len(features)))
+    means[order] = calculate_means(*np.split(sums, 2, axis=1))
+    return pd.DataFrame(means, index=df.index, columns=features)
+
+
+def calculate_prior_window_means(
+    df: pd.DataFrame,
+    group_cols: list[str],
+    features: list[str],
+    last_matches: int | None = None,
+    last_days: int | None = None,
+    date_col: str = "tourney_date",
+) -> pd.DataFrame:
+    """
+    Calculate the mean of each feature over a window of the earlier dates of each group.
+
+    Parameters:
+        df (pd.DataFrame): The input DataFrame.
+        group_cols (list): List of columns to group by.
+        features (list): The feature columns to calculate the window means for.
+        last_matches (int | None): Use the last this many rows before the row's date.
+        last_days (int | None): Use the rows less than this many days before the row's
+            date. Exactly one of last_matches and last_days must be given.
+        date_col (str): The date column, rows at the same date never see each other.
+
+    Returns:
+        pd.DataFrame: The window means, indexed like df, NaN where a window has no
+        non-missing values.
+
+    Notes:
+        Windows are ranges of the rows sorted by group and date, found from the sorted
+        positions for last_matches and with searchsorted on the dates for last_days, so
+        every window sum is a difference of two cumulative sums.
+    """
+    if (last_matches is None) == (last_days is None):
+        msg = "Exactly one of last_matches and last_days must be given"
+        raise ValueError(msg)
+    window = last_matches if last_matches is not None else last_days
+    if window < 1:
+        msg = f"The window must be at least 1, got {window}"
+        raise ValueError(msg)
+
+    rows = _sort_by_group_and_date(df, group_cols, date_col)
+    upper = rows["date_start"]
+    if last_matches is not None:
+        lower = np.maximum(upper - last_matches, rows["group_start"])
+    else:
+        # One sorted key per row, groups spaced further apart than any window reaches.
+        days = rows["days"] - rows["days"].min(initial=0)
+        spacing = days.max(initial=0) + last_days + 1
+        keys = rows["codes"].astype(np.int64) * spacing + days
+        lower = np.searchsorted(keys, keys - last_days, side="right")
+
+    stacked = _stack_features(df, features)[rows["order"]]
+    cumulative = np.vstack([np.zeros((1, stacked.shape[1])), stacked.cumsum(axis=0)])
+    return _unsort_means(
+        df, features, rows["order"], cumulative[upper] - cumulative[lower]
+    )
+
+
+def calculate_prior_ewm_means(
+    df: pd.DataFrame,
+    group_cols: list[str],
+    features: list[str],
+    half_life_days: float,
+    date_col: str = "tourney_date",
+) -> pd.DataFrame:
+    """
+    Calculate the exponentially weighted mean of each feature over the earlier dates of
+    each group.
+
+    Parameters:
+        df (pd.DataFrame): The input DataFrame.
+        group_cols (list): List of columns to group by.
+        features (list): The feature columns to calculate the weighted means for.
+        half_life_days (float): Days for the weight of a row to halve.
+        date_col (str): The date column, rows at the same date never see each other.
+
+    Returns:
+        pd.DataFrame: The weighted means, indexed like df, NaN where a group has no
+        earlier non-missing values.
+
+    Notes:
+        The weight of an earlier row is 2^(-days between the rows / half_life_days). The
+        row's own decay factor is common to all its earlier rows and cancels out of the
+        mean, so each row is scaled once by 2^(days since the group's first date /
+        half_life_days). The scaled rows are summed in the log domain, so the weights
+        never overflow however many half lives a group spans.
+    """
+    if half_life_days <= 0:
+        msg = f"half_life_days must be positive, got {half_life_days}"
+        raise ValueError(msg)
+
+    rows = _sort_by_group_and_date(df, group_cols, date_col)
+    exponents = (rows["days"] - rows["days"][rows["group_start"]]) / half_life_days
+    terms = calculate_log_ewm_terms(
+        _stack_features(df, features)[rows["order"]], exponents
+    )
+    prior = calculate_prior_sums(terms, rows["codes"], ufunc=np.logaddexp)
+    means = np.empty((len(rows["order"]), len(features)))
+    means[rows["order"]] = calculate_log_ewm_means(prior[rows["date_start"]])
+    return pd.DataFrame(means, index=df.index, columns=features)
+
+
+def calculate_log_ewm_terms(stacked: np.ndarray, exponents: np.ndarray) -> np.ndarray:
+    """
+    Take the logs of rows of stacked features scaled by powers of two.
+
+    Parameters:
+        stacked (np.ndarray): The features, 0 where missing, then 1s where they are not
+            missing.
+        exponents (np.ndarray): Power of two scaling each row.
+
+    Returns:
+        np.ndarray: The logs of the positive parts of the scaled features, of their
+        negative parts and of the scaled 1s, -inf for zeros. Sums of them with
+        np.logaddexp give calculate_log_ewm_means.
+    """
+    values, present = np.split(stacked, 2, axis=1)
+    parts = np.hstack([np.maximum(values, 0.0), np.maximum(-values, 0.0), present])
+    with np.errstate(divide="ignore"):
+        return np.log(parts) + (np.log(2) * exponents)[:, None]
+
+
+def calculate_log_ewm_means(log_sums: np.ndarray) -> np.ndarray:
+    """
+    Divide sums of calculate_log_ewm_terms by their weights.
+
+    Parameters:
+        log_sums (np.ndarray): The log sums of the positive parts, negative parts and
+            weights.
+
+    Returns:
+        np.ndarray: The weighted means, NaN where the weights are zero.
+    """
+    positive, negative, weights = np.split(log_sums, 3, axis=-1)
+    with np.errstate(invalid="ignore"):
+        means = np.exp(positive - weights) - np.exp(negative - weights)
+    return np.where(np.isneginf(weights), np.nan, means)
 
 
 def calculate_historic_features(final_dataframe: pd.DataFrame) -> pd.DataFrame:
@@ -47,48 +369,98 @@ def calculate_historic_features(final_dataframe: pd.DataFrame) -> pd.DataFrame:
     Returns:
     - pd.DataFrame: The DataFrame with calculated historic features.
     """
-    features = [
-        "ace_pct",
-        "aces_per_game",
-        "bpsaved_pct",
-        "df_pct",
-        "df_per_game",
-        "first_serve_pct",
-        "first_serve_win_pct",
-        "second_serve_win_pct",
-        "serve_points_lost_per_game",
-        "serve_points_won_per_game",
-        "total_serve_win_pct",
-    ]
-
     # Sort the DataFrame by tourney_date and match_num to ensure proper ordering
     final_dataframe = final_dataframe.sort_values(by=["tourney_date", "match_num"])
 
     historic_features_df = pd.DataFrame()
     historic_features_df["match_id"] = final_dataframe["match_id"]
-    historic_features_df["player_name"] = final_dataframe["player_name"]
-    historic_features_df["opponent_name"] = final_dataframe["opponent_name"]
+    historic_features_df["player_id"] = final_dataframe["player_id"]
+    historic_features_df["opponent_id"] = final_dataframe["opponent_id"]
 
-    # Calculate games played for players and opponents
+    # Calculate games played for players and opponents at earlier tourney dates
     historic_features_df["games_played_by_player"] = calculate_games_played(
-        final_dataframe, ["player_name"]
+        final_dataframe, ["player_id"], exclude_ties_on="tourney_date"
     )
     historic_features_df["games_played_by_opponent"] = calculate_games_played(
-        final_dataframe, ["opponent_name"]
+        final_dataframe, ["opponent_id"], exclude_ties_on="tourney_date"
     )
 
-    for feature in features:
-        # Calculate historic features for players
-        historic_features_df[f"historic_player_{feature}"] = final_dataframe.groupby(
-            ["player_name", "tourney_date"]
-        )[f"player_{feature}"].transform(lambda x: x.expanding().mean().shift())
-        # Calculate historic features for opponents
-        historic_features_df[f"historic_opponent_{feature}"] = final_dataframe.groupby(
-            ["opponent_name", "tourney_date"]
-        )[f"opponent_{feature}"].transform(lambda x: x.expanding().mean().shift())
+    # Means over all the earlier tourney dates, other rounds of the same tournament
+    # date are not known before the match.
+    prior_means = {
+        side: calculate_prior_means(
+            final_dataframe,
+            [f"{side}_id"],
+            [f"{side}_{feature}" for feature in HISTORIC_FEATURES],
+            exclude_ties_on="tourney_date",
+        )
+        for side in ("player", "opponent")
+    }
+    for feature in HISTORIC_FEATURES:
+        for side in ("player", "opponent"):
+            historic_features_df[f"historic_{side}_{feature}"] = prior_means[side][
+                f"{side}_{feature}"
+            ]
 
     historic_features_df.fillna(
         0, inplace=True
     )  # Handle NaN values for the first matches
 
     return historic_features_df
+
+
+def calculate_form_features(
+    final_dataframe: pd.DataFrame,
+    half_life_days: float = FORM_HALF_LIFE_DAYS,
+    last_matches: int = FORM_LAST_MATCHES,
+    last_days: int = FORM_LAST_DAYS,
+) -> pd.DataFrame:
+    """
+    Calculate recent form versions of the historic features for players and opponents.
+
+    Only matches from earlier tourney dates are used, as exponentially weighted means,
+    means over the last matches and the last days, and means on the match's surface.
+
+    Parameters:
+        final_dataframe (pd.DataFrame): The final DataFrame containing all the data.
+        half_life_days (float): Half life of the exponentially weighted means.
+        last_matches (int): Number of matches in the last matches means.
+        last_days (int): Number of days in the last days means.
+
+    Returns:
+        pd.DataFrame: The match_id, player_id, opponent_id and form features, in the
+        order of calculate_historic_features.
+    """
+    final_dataframe = final_dataframe.sort_values(by=["tourney_date", "match_num"])
+    form_features_df = final_dataframe[["match_id", "player_id", "opponent_id"]]
+
+    form_means = {}
+    for side in ("player", "opponent"):
+        group_cols = [f"{side}_id"]
+        features = [f"{side}_{feature}" for feature in HISTORIC_FEATURES]
+        form_means["ewm", side] = calculate_prior_ewm_means(
+            final_dataframe, group_cols, features, half_life_days
+        )
+        form_means[f"last_{last_matches}_matches", side] = calculate_prior_window_means(
+            final_dataframe, group_cols, features, last_matches=last_matches
+        )
+        form_means[f"last_{last_days}_days", side] = calculate_prior_window_means(
+            final_dataframe, group_cols, features, last_days=last_days
+        )
+        form_means["surface", side] = calculate_prior_means(
+            final_dataframe,
+            [*group_cols, "surface"],
+            features,
+            exclude_ties_on="tourney_date",
+        )
+
+    form_columns = {}
+    for kind in dict.fromkeys(kind for kind, _ in form_means):
+        for feature in HISTORIC_FEATURES:
+            for side in ("player", "opponent"):
+                form_columns[f"{kind}_{side}_{feature}"] = form_means[kind, side][
+                    f"{side}_{feature}"
+                ]
+    form_features_df = pd.concat([form_features_df, pd.DataFrame(form_columns)], axis=1)
+
+    return form_features_df.fillna(0)  # Handle NaN values for the first matches
@@ -4,22 +4,46 @@ import pandas as pd
 
 from tennis.data_processing.basic_processing.match_info import filter_match_info_csv
 from tennis.data_processing.basic_processing.match_scores import process_match_scores
+from tennis.data_processing.basic_processing.player_ids import (
+    PLAYER_IDS_PATH,
+    load_player_ids,
+    names_to_player_ids,
+    player_ids_to_names,
+    register_player_names,
+)
 from tennis.data_processing.basic_processing.player_info import (
     player_info_wide_to_long,
-    create_player_ids_from_dataframe,
+)
+from tennis.data_processing.basic_processing.player_names import (
+    update_player_name_index,
 )
 from tennis.data_processing.basic_processing.player_outcomes import (
-    add_transformed_variables,
+    add_derived_features,
     pivot_player_outcome_stats,
     merge_with_opponent_stats,
 )
+from tennis.data_processing.historical_features.as_of import (
+    build_player_history,
+    save_player_history,
+)
+from tennis.data_processing.historical_features.feature_store import (
+    update_historic_features,
+)
 from tennis.data_processing.historical_features.historic_featureset import (
-    calculate_historic_features,
+    HISTORIC_FEATURES,
+    calculate_form_features,
 )
 
 
 def run_pipeline():
-    """Run the entire data processing pipeline."""
+    """
+    Run the entire data processing pipeline.
+
+    Only the historic features of matches new since the last run are calculated, from
+    the feature store. The recent form features and the player history are not kept
+    incrementally, they are recalculated from all the matches on every run, one
+    vectorised pass each.
+    """
     # Load and process match information
     match_info_df = pd.read_csv("./data/match_info.csv")
     filtered_match_info_df = filter_match_info_csv(match_info_df)
@@ -28,20 +52,39 @@ def run_pipeline():
     match_outcome_df = pd.read_csv("./data/match_outcome_stats.csv")
     processed_match_outcome_df = process_match_scores(match_outcome_df)
 
-    # Load and process player information
+    # Load player information and player outcomes, and swap player names for ids from
+    # the registry so every merge and groupby below runs on integer keys
     player_info_df = pd.read_csv("./data/player_info.csv")
-
-    # Load player Ids
-    player_ids = create_player_ids_from_dataframe(player_info_df)
-    player_ids.to_csv("./data/player_ids.csv", index=False)
+    player_outcomes_df = pd.read_csv("./data/player_outcome_stats.csv")
+    player_names = pd.concat(
+        [
+            player_info_df["winner_name"],
+            player_info_df["loser_name"],
+            player_outcomes_df["player_name"],
+        ]
+    )
+    # Different spellings of a player's name share the id of their canonical spelling,
+    # registered names stay canonical so their ids never change
+    registered_names = load_player_ids(PLAYER_IDS_PATH)["player_name"]
+    canonical_names = update_player_name_index(
+        player_names, registered_names=registered_names
+    ).get_canonical_mapping()
+    player_ids = register_player_names(player_names, PLAYER_IDS_PATH, canonical_names)
+    for side in ("winner", "loser"):
+        player_info_df[f"{side}_id"] = names_to_player_ids(
+            player_info_df.pop(f"{side}_name"), player_ids, canonical_names
+        )
+    player_outcomes_df["player_id"] = names_to_player_ids(
+        player_outcomes_df.pop("player_name"), player_ids, canonical_names
+    )
 
     player_info_long_df = player_info_wide_to_long(player_info_df)
 
-    # Load, pivot, and process player outcomes
-    player_outcomes_df = pd.read_csv("./data/player_outcome_stats.csv")
+    # Pivot and process player outcomes
     player_outcomes_pivoted_df = pivot_player_outcome_stats(player_outcomes_df)
-    player_outcomes_transformed_df = add_transformed_variables(
-        player_outcomes_pivoted_df
+    # Only the derived features the historic features are built from are added
+    player_outcomes_transformed_df = add_derived_features(
+        player_outcomes_pivoted_df, HISTORIC_FEATURES
     )
     player_outcomes_with_opponent_df = merge_with_opponent_stats(
         player_outcomes_transformed_df
@@ -56,8 +99,8 @@ def run_pipeline():
     merged_player_info_outcome_df = pd.merge(
         player_info_long_df,
         player_outcomes_with_opponent_df,
-        left_on=["match_id", "player_name"],
-        right_on=["match_id", "player_name"],
+        left_on=["match_id", "player_id"],
+        right_on=["match_id", "player_id"],
     )
 
     # Merge all data
@@ -68,30 +111,37 @@ def run_pipeline():
         on="match_id",
     )
 
-    # Calculate historic features
-    historic_features_df = calculate_historic_features(merged_all_df)
-
-    # Save the final DataFrame
-    historic_features_df.to_csv("./data/historic_features.csv", index=False)
+    # Calculate the historic features of the new matches from the feature store, and
+    # append them to the saved historic features
+    historic_features_df = update_historic_features(merged_all_df)
 
     # Merge the historic features with the final DataFrame
     final_df = pd.merge(
         merged_all_df,
         historic_features_df,
         how="inner",
-        on=["match_id", "player_name", "opponent_name"],
+        on=["match_id", "player_id", "opponent_id"],
     )
 
-    # Merge the player ids with the final DataFrame to get player ids and opponent ids
-    final_df = pd.merge(final_df, player_ids, how="inner", on=["player_name"])
-    player_ids = player_ids.rename(
-        columns={"player_id": "opponent_id", "player_name": "opponent_name"}
+    # Merge the recent form features, which are not in the feature store and are
+    # recalculated from all the matches
+    final_df = pd.merge(
+        final_df,
+        calculate_form_features(merged_all_df),
+        how="inner",
+        on=["match_id", "player_id", "opponent_id"],
     )
-    final_df = pd.merge(final_df, player_ids, how="inner", on=["opponent_name"])
+
+    # Look up the player and opponent names for the final DataFrame
+    final_df["player_name"] = player_ids_to_names(final_df["player_id"], player_ids)
+    final_df["opponent_name"] = player_ids_to_names(final_df["opponent_id"], player_ids)
 
     # Save the final DataFrame
     final_df.to_csv("./data/final_data.csv", index=False)
 
+    # Save every player's history for as-of queries of their features
+    save_player_history(build_player_history(merged_all_df))
+
 
 if __name__ == "__main__":
     run_pipeline()
@@ -7,10 +7,7 @@ from sklearn.metrics import log_loss, brier_score_loss
 import mlflow.sklearn
 
 from tennis.model_usage.config import DEFAULT_RANDOM_SEED
-from tennis.models.markov_model import (
-    get_player_1_match_winning_probability,
-    TennisParameters,
-)
+from tennis.models.markov_model import get_player_1_match_winning_probability_batch
 
 # Load the final DataFrame
 final_df = pd.read_csv("./data/final_data.csv")
@@ -45,16 +42,11 @@ with mlflow.start_run():
 
     # use all above to predict winning prob
 
-    y_pred_proba = []
-    for i in range(len(player_avg_serve_win_pct)):
-        y_pred_proba.append(
-            get_player_1_match_winning_probability(
-                TennisParameters(
-                    player_avg_serve_win_pct.iloc[i], opponent_avg_serve_win_pct.iloc[i]
-                ),
-                int(n_sets.iloc[i]),
-            )
-        )
+    y_pred_proba = get_player_1_match_winning_probability_batch(
+        player_avg_serve_win_pct.to_numpy(),
+        opponent_avg_serve_win_pct.to_numpy(),
+        n_sets.to_numpy(),
+    )
 
     # Evaluate the model
     log_loss_value = log_loss(y_test, y_pred_proba)
@@ -0,0 +1,73 @@
+"""
+Benchmarks for the markov model.
+
+Run with `python -m tennis.models.benchmarks`, timings are printed in microseconds per call.
+"""
+
+import timeit
+
+from tennis.models.markov_model import (
+    SOLVER_ABSORBING,
+    SOLVER_MATRIX_POWER,
+    TennisParameters,
+    build_match_transition_matrix,
+    build_set_transition_matrix,
+    get_player_1_match_winning_probability_from_transition_matrix,
+    get_player_1_set_winning_probabilities,
+    service_game_winning_prob,
+)
+
+DEFAULT_BENCHMARK_PARAMETERS = TennisParameters(0.65, 0.62)
+
+
+def time_per_call(statement, number: int) -> float:
+    """Get the best time per call of a statement in microseconds, over 5 repeats."""
+    return min(timeit.repeat(statement, number=number, repeat=5)) / number * 1e6
+
+
+def benchmark_solvers(
+    params: TennisParameters = DEFAULT_BENCHMARK_PARAMETERS, number: int = 1000
+) -> dict[str, dict[str, float]]:
+    """
+    Compare the matrix power and absorbing solvers on the set and match chains.
+
+    Parameters:
+        - params (TennisParameters): The tennis parameters to build the chains with.
+        - number (int): Number of calls per timing repeat.
+
+    Returns:
+        - dict[str, dict[str, float]]: Microseconds per call, keyed by chain then solver.
+    """
+    set_transition_matrix = build_set_transition_matrix(
+        service_game_winning_prob(params.player_one_point_on_serve_prob),
+        service_game_winning_prob(params.player_two_point_on_serve_prob),
+    )
+    match_transition_matrix = build_match_transition_matrix(
+        get_player_1_set_winning_probabilities(set_transition_matrix), max_sets_won=3
+    )
+    timings: dict[str, dict[str, float]] = {"set": {}, "match": {}}
+    for solver in (SOLVER_MATRIX_POWER, SOLVER_ABSORBING):
+        timings["set"][solver] = time_per_call(
+            lambda solver=solver: get_player_1_set_winning_probabilities(
+                set_transition_matrix, solver
+            ),
+            number,
+        )
+        timings["match"][solver] = time_per_call(
+            lambda solver=solver: (
+                get_player_1_match_winning_probability_from_transition_matrix(
+                    match_transition_matrix, 5, solver
+                )
+            ),
+            number,
+        )
+    return timings
+
+
+if __name__ == "__main__":
+    for chain, solver_timings in benchmark_solvers().items():
+        baseline = solver_timings[SOLVER_MATRIX_POWER]
+        for solver, timing in solver_timings.items():
+            print(
+                f"{chain:<6} {solver:<13} {timing:8.1f}us  ({baseline / timing:.1f}x)"
+            )
@@ -0,0 +1,161 @@
+"""
+Opt-in memoisation for the markov model.
+
+Serve probabilities are rounded to a fixed number of decimals before being used as a cache
+key (and as the inputs the wrapped function is evaluated at), so rows that repeat up to
+that precision are answered with a dictionary lookup. Arguments are bound to the
+function's signature first, so positional, keyword and default arguments give the same
+key. Each cache is bounded with LRU
+eviction and keeps hit, miss and eviction counters.
+"""
+
+import inspect
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass
+from functools import update_wrapper
+from typing import Any
+
+import numpy as np
+
+from tennis.models.markov_model import (
+    TennisParameters,
+    build_set_transition_matrix,
+    get_player_1_match_winning_probability,
+    get_player_1_set_winning_probability,
+    service_game_winning_prob,
+)
+
+DEFAULT_CACHE_SIZE = 100_000
+DEFAULT_CACHE_DECIMALS = 4
+
+
+@dataclass
+class CacheInfo:
+    """Dataclass to hold the counters of a quantised cache."""
+
+    hits: int
+    misses: int
+    evictions: int
+    maxsize: int
+    currsize: int
+
+
+def quantize(value: Any, decimals: int) -> Any:
+    """
+    Round floats, including numpy floats, and the probabilities of TennisParameters,
+    leave anything else as is.
+    """
+    if isinstance(value, TennisParameters):
+        return TennisParameters(
+            round(float(value.player_one_point_on_serve_prob), decimals),
+            round(float(value.player_two_point_on_serve_prob), decimals),
+        )
+    if isinstance(value, (float, np.floating)):
+        return round(float(value), decimals)
+    return value
+
+
+def _to_key(value: Any) -> Hashable:
+    """Convert a quantised argument to a hashable key."""
+    if isinstance(value, TennisParameters):
+        return (
+            value.player_one_point_on_serve_prob,
+            value.player_two_point_on_serve_prob,
+        )
+    return value
+
+
+class QuantizedLRUCache:
+    """
+    Wrap a function with a bounded cache keyed on quantised arguments.
+
+    Parameters:
+        - function (Callable): The function to cache.
+        - maxsize (int): Maximum number of results to keep, least recently used results
+          are evicted first.
+        - decimals (int): Number of decimals serve probabilities are rounded to.
+
+    Notes:
+        - Array results are stored read-only, since the same object is handed to every
+          caller with the same key.
+    """
+
+    def __init__(
+        self,
+        function: Callable,
+        maxsize: int = DEFAULT_CACHE_SIZE,
+        decimals: int = DEFAULT_CACHE_DECIMALS,
+    ):
+        if maxsize < 1:
+            msg = f"Cache size must be positive, not {maxsize}"
+            raise ValueError(msg)
+        self.function = function
+        self.maxsize = maxsize
+        self.decimals = decimals
+        self._results: OrderedDict[Hashable, Any] = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._signature = inspect.signature(function)
+        update_wrapper(self, function)
+
+    def __call__(self, *args, **kwargs):
+        arguments = self._signature.bind(*args, **kwargs)
+        arguments.apply_defaults()
+        for name, arg in arguments.arguments.items():
+            arguments.arguments[name] = quantize(arg, self.decimals)
+        args, kwargs = arguments.args, arguments.kwargs
+        key = tuple(_to_key(arg) for arg in arguments.arguments.values())
+        if key in self._results:
+            self._hits += 1
+            self._results.move_to_end(key)
+            return self._results[key]
+
+        self._misses += 1
+        result = self.function(*args, **kwargs)
+        if isinstance(result, np.ndarray):
+            result.setflags(write=False)
+        self._results[key] = result
+        if len(self._results) > self.maxsize:
+            self._results.popitem(last=False)
+            self._evictions += 1
+        return result
+
+    def cache_info(self) -> CacheInfo:
+        """Get the hit, miss and eviction counters of the cache."""
+        return CacheInfo(
+            hits=self._hits,
+            misses=self._misses,
+            evictions=self._evictions,
+            maxsize=self.maxsize,
+            currsize=len(self._results),
+        )
+
+    def cache_clear(self) -> None:
+        """Clear the cached results and reset the counters."""
+        self._results.clear()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+
+def quantized_lru_cache(
+    maxsize: int = DEFAULT_CACHE_SIZE, decimals: int = DEFAULT_CACHE_DECIMALS
+) -> Callable[[Callable], QuantizedLRUCache]:
+    """Decorator version of QuantizedLRUCache."""
+
+    def decorator(function: Callable) -> QuantizedLRUCache:
+        return QuantizedLRUCache(function, maxsize=maxsize, decimals=decimals)
+
+    return decorator
+
+
+cached_service_game_winning_prob = QuantizedLRUCache(service_game_winning_prob)
+cached_build_set_transition_matrix = QuantizedLRUCache(build_set_transition_matrix)
+cached_get_player_1_set_winning_probability = QuantizedLRUCache(
+    get_player_1_set_winning_probability
+)
+cached_get_player_1_match_winning_probability = QuantizedLRUCache(
+    get_player_1_match_winning_probability
+)
@@ -0,0 +1,226 @@
+"""
+Implied serve probabilities for the markov model.
+
+Backs out the serve point probabilities that give a target match winning probability,
+either holding the sum of both players' serve probabilities fixed or holding player 2's
+serve probability fixed. The whole batch is solved together, every iteration is a single
+vectorised call to get_player_1_match_winning_probability_and_gradient on the rows that
+have not converged yet.
+
+Notes:
+    The match probability is increasing in the free variable in both modes, so each row
+    keeps a bracket [lower, upper] containing the root. A Newton step is taken when it
+    lands inside the bracket, otherwise the bracket is bisected, which guarantees
+    convergence for any target inside the attainable range. Targets outside it end with
+    the bracket collapsed on an end point and are reported as not converged.
+"""
+
+from collections.abc import Callable
+from dataclasses import dataclass
+
+import numpy as np
+
+from tennis.models.markov_model import (
+    get_player_1_match_winning_probability_and_gradient,
+)
+
+DEFAULT_TOLERANCE = 1e-10
+DEFAULT_MAX_ITERATIONS = 100
+MIN_BRACKET_WIDTH = 1e-14
+
+
+@dataclass
+class ImpliedServeProbabilities:
+    """
+    Dataclass to hold the result of solving for implied serve probabilities.
+
+    Attributes:
+        - p1_serve_probs (np.ndarray): Implied probabilities of player 1 winning a point
+          on serve.
+        - p2_serve_probs (np.ndarray): Implied probabilities of player 2 winning a point
+          on serve.
+        - converged (np.ndarray): Whether the match probability is within the tolerance
+          of the target.
+        - iterations (np.ndarray): Number of iterations used for each target.
+        - residuals (np.ndarray): Match probability minus target at the returned
+          probabilities.
+    """
+
+    p1_serve_probs: np.ndarray
+    p2_serve_probs: np.ndarray
+    converged: np.ndarray
+    iterations: np.ndarray
+    residuals: np.ndarray
+
+
+def _solve_increasing(
+    function_and_derivative: Callable[
+        [np.ndarray, np.ndarray], tuple[np.ndarray, np.ndarray]
+    ],
+    targets: np.ndarray,
+    lower: np.ndarray,
+    upper: np.ndarray,
+    tolerance: float,
+    max_iterations: int,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Solve function(x) = target for an increasing function, in lockstep over a batch.
+
+    Parameters:
+        - function_and_derivative (Callable): Takes x and the indices of the rows being
+          solved, returns the function values and derivatives at x for those rows.
+        - targets (np.ndarray): Target values.
+        - lower (np.ndarray): Lower end of the bracket for x.
+        - upper (np.ndarray): Upper end of the bracket for x.
+        - tolerance (float): Absolute tolerance on function(x) - target.
+        - max_iterations (int): Maximum number of iterations.
+
+    Returns:
+        - tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: The solutions, whether
+          each converged, the iterations used and the residuals.
+    """
+    lower = lower.astype(float)
+    upper = upper.astype(float)
+    x = (lower + upper) / 2
+    converged = np.zeros(targets.shape, dtype=bool)
+    iterations = np.zeros(targets.shape, dtype=int)
+    residuals = np.full(targets.shape, np.nan)
+    # The last x each row was evaluated at, so the solutions match their residuals even
+    # for rows that stop without converging.
+    solutions = x.copy()
+    active = np.flatnonzero(np.ones(targets.shape, dtype=bool))
+
+    for _ in range(max_iterations):
+        if active.size == 0:
+            break
+        values, derivatives = function_and_derivative(x[active], active)
+        residual = values - targets[active]
+        residuals[active] = residual
+        solutions[active] = x[active]
+        iterations[active] += 1
+
+        done = np.abs(residual) <= tolerance
+        converged[active[done]] = True
+        lower[active] = np.where(residual < 0, x[active], lower[active])
+        upper[active] = np.where(residual > 0, x[active], upper[active])
+
+        # Newton step, falling back to bisection when it leaves the bracket.
+        with np.errstate(divide="ignore", invalid="ignore"):
+            newton = x[active] - residual / derivatives
+        bisection = (lower[active] + upper[active]) / 2
+        inside = (derivatives > 0) & (newton > lower[active]) & (newton < upper[active])
+        x[active] = np.where(done, x[active], np.where(inside, newton, bisection))
+
+        collapsed = upper[active] - lower[active] <= MIN_BRACKET_WIDTH
+        active = active[~done & ~collapsed]
+
+    return solutions, converged, iterations, residuals
+
+
+def get_implied_serve_probabilities_fixed_total(
+    target_probs: np.ndarray,
+    serve_prob_totals: np.ndarray,
+    best_of: np.ndarray,
+    tolerance: float = DEFAULT_TOLERANCE,
+    max_iterations: int = DEFAULT_MAX_ITERATIONS,
+) -> ImpliedServeProbabilities:
+    """
+    Get the serve probabilities implied by target match probabilities, holding the sum of
+    both players' serve probabilities fixed.
+
+    Parameters:
+        - target_probs (np.ndarray): Target probabilities of player 1 winning the match.
+        - serve_prob_totals (np.ndarray): p1 serve probability + p2 serve probability.
+        - best_of (np.ndarray): Maximum number of sets playable in each match (3 or 5).
+        - tolerance (float): Absolute tolerance on the match probability.
+        - max_iterations (int): Maximum number of iterations.
+
+    Returns:
+        - ImpliedServeProbabilities: The implied probabilities and convergence report.
+    """
+    target_probs, serve_prob_totals, best_of = np.broadcast_arrays(
+        np.atleast_1d(np.asarray(target_probs, dtype=float)),
+        np.atleast_1d(np.asarray(serve_prob_totals, dtype=float)),
+        np.atleast_1d(np.rint(best_of).astype(int)),
+    )
+    if np.any((serve_prob_totals < 0) | (serve_prob_totals > 2)):
+        msg = "Serve probability totals must be between 0 and 2"
+        raise ValueError(msg)
+
+    def function_and_derivative(p1_serve_probs, rows):
+        probability, p1_derivative, p2_derivative = (
+            get_player_1_match_winning_probability_and_gradient(
+                p1_serve_probs,
+                serve_prob_totals[rows] - p1_serve_probs,
+                best_of[rows],
+            )
+        )
+        return probability, p1_derivative - p2_derivative
+
+    p1_serve_probs, converged, iterations, residuals = _solve_increasing(
+        function_and_derivative,
+        target_probs,
+        np.maximum(serve_prob_totals - 1, 0),
+        np.minimum(serve_prob_totals, 1),
+        tolerance,
+        max_iterations,
+    )
+    return ImpliedServeProbabilities(
+        p1_serve_probs=p1_serve_probs,
+        p2_serve_probs=serve_prob_totals - p1_serve_probs,
+        converged=converged,
+        iterations=iterations,
+        residuals=residuals,
+    )
+
+
+def get_implied_serve_probabilities_fixed_opponent(
+    target_probs: np.ndarray,
+    p2_serve_probs: np.ndarray,
+    best_of: np.ndarray,
+    tolerance: float = DEFAULT_TOLERANCE,
+    max_iterations: int = DEFAULT_MAX_ITERATIONS,
+) -> ImpliedServeProbabilities:
+    """
+    Get player 1's serve probabilities implied by target match probabilities, holding
+    player 2's serve probabilities fixed.
+
+    Parameters:
+        - target_probs (np.ndarray): Target probabilities of player 1 winning the match.
+        - p2_serve_probs (np.ndarray): Probabilities of player 2 winning a point on serve.
+        - best_of (np.ndarray): Maximum number of sets playable in each match (3 or 5).
+        - tolerance (float): Absolute tolerance on the match probability.
+        - max_iterations (int): Maximum number of iterations.
+
+    Returns:
+        - ImpliedServeProbabilities: The implied probabilities and convergence report.
+    """
+    target_probs, p2_serve_probs, best_of = np.broadcast_arrays(
+        np.atleast_1d(np.asarray(target_probs, dtype=float)),
+        np.atleast_1d(np.asarray(p2_serve_probs, dtype=float)),
+        np.atleast_1d(np.rint(best_of).astype(int)),
+    )
+
+    def function_and_derivative(p1_serve_probs, rows):
+        probability, p1_derivative, _ = (
+            get_player_1_match_winning_probability_and_gradient(
+                p1_serve_probs, p2_serve_probs[rows], best_of[rows]
+            )
+        )
+        return probability, p1_derivative
+
+    p1_serve_probs, converged, iterations, residuals = _solve_increasing(
+        function_and_derivative,
+        target_probs,
+        np.zeros(target_probs.shape),
+        np.ones(target_probs.shape),
+        tolerance,
+        max_iterations,
+    )
+    return ImpliedServeProbabilities(
+        p1_serve_probs=p1_serve_probs,
+        p2_serve_probs=p2_serve_probs.copy(),
+        converged=converged,
+        iterations=iterations,
+        residuals=residuals,
+    )
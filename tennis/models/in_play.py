@@ -0,0 +1,293 @@
+"""
+In-play pricing for the markov model.
+
+A single backward pass over the point, game, tiebreak, set and match chains fills value
+tables for each parameter pair, after which the probability of player 1 winning from any
+(sets, games, points, server) score is a fixed number of array lookups.
+
+Notes:
+    The tables are stored per level rather than as one table over every combined score,
+    which keeps them to a few hundred floats per match so thousands of live matches can
+    be held at once. Scores follow the same format as the markov model, standard games,
+    a 7 point tiebreak at 6-6 in every set.
+"""
+
+from collections.abc import Callable
+from dataclasses import dataclass
+
+import numpy as np
+
+from tennis.models.markov_model import TIEBREAK_POINTS, is_winning_set_score
+from tennis.models.match_formats import is_p1_serving_tiebreak_point
+
+GAME_POINTS = 4
+MAX_SETS_WON = 3
+
+
+@dataclass
+class InPlayValueTables:
+    """
+    Dataclass to hold the value tables for a batch of matches, the last axis of each
+    table indexes the match. Server indices are 0 for player 1 and 1 for player 2.
+
+    Attributes:
+        - match_values: P(player 1 wins the match) at the start of a set, indexed by
+          [player 1 sets, player 2 sets].
+        - set_values: P(player 1 wins the set) at the start of a game, indexed by
+          [player 1 games, player 2 games, server of the game].
+        - game_values: P(player 1 wins the game), indexed by
+          [player 1 points, player 2 points, server].
+        - tiebreak_values: P(player 1 wins the tiebreak), indexed by
+          [player 1 points, player 2 points, server of the current point].
+    """
+
+    match_values: np.ndarray
+    set_values: np.ndarray
+    game_values: np.ndarray
+    tiebreak_values: np.ndarray
+
+
+def _first_to_values(
+    p1_wins_point: Callable[[int, int], np.ndarray],
+    points_to_win: int,
+    shape: tuple[int, ...],
+) -> np.ndarray:
+    """
+    Backward pass for a race to points_to_win that must be won by two.
+
+    Parameters:
+        - p1_wins_point (Callable): Probability of player 1 winning the point at (a, b).
+        - points_to_win (int): Points needed to win, 4 for a game, 7 or 10 for a tiebreak.
+        - shape (tuple): Batch shape of the probabilities.
+
+    Returns:
+        - np.ndarray: Array of shape (points_to_win + 1, points_to_win + 1) + shape,
+          P(player 1 wins) from each score. Scores past (n - 1)-all are equivalent to
+          the ones two points earlier on each side.
+    """
+    last = points_to_win - 1
+    values = np.zeros((points_to_win + 1, points_to_win + 1) + shape)
+    values[points_to_win, :last] = 1.0
+
+    # From (n - 1)-all, either a player wins the next two points or it is all again.
+    first_point = p1_wins_point(last, last)
+    second_point = p1_wins_point(points_to_win, last)
+    p1_wins_both = first_point * second_point
+    decided = p1_wins_both + (1 - first_point) * (1 - second_point)
+    tied_value = np.divide(
+        p1_wins_both, decided, out=np.full(decided.shape, 0.5), where=decided > 0
+    )
+    values[last, last] = tied_value
+    values[points_to_win, points_to_win] = tied_value
+    values[points_to_win, last] = second_point + (1 - second_point) * tied_value
+    values[last, points_to_win] = second_point * tied_value
+
+    for total in range(2 * last - 1, -1, -1):
+        for a in range(max(0, total - last), min(total, last) + 1):
+            b = total - a
+            p1_wins = p1_wins_point(a, b)
+            values[a, b] = p1_wins * values[a + 1, b] + (1 - p1_wins) * values[a, b + 1]
+    return values
+
+
+def _tiebreak_values_by_current_server(
+    p1_serve_probs: np.ndarray, p2_serve_probs: np.ndarray, points_to_win: int
+) -> np.ndarray:
+    """Tiebreak values indexed by [p1 points, p2 points, server of the current point]."""
+    values_by_first_server = [
+        _first_to_values(
+            lambda a, b, first_server=first_server: (
+                p1_serve_probs
+                if is_p1_serving_tiebreak_point(a, b, first_server)
+                else 1 - p2_serve_probs
+            ),
+            points_to_win,
+            p1_serve_probs.shape,
+        )
+        for first_server in (1, 2)
+    ]
+    size = points_to_win + 1
+    values = np.zeros((size, size, 2) + p1_serve_probs.shape)
+    for a in range(size):
+        for b in range(size):
+            p1_serving_if_p1_first = is_p1_serving_tiebreak_point(a, b, 1)
+            values[a, b, 0] = values_by_first_server[
+                0 if p1_serving_if_p1_first else 1
+            ][a, b]
+            values[a, b, 1] = values_by_first_server[
+                1 if p1_serving_if_p1_first else 0
+            ][a, b]
+    return values
+
+
+def _set_values(p1_wins_game: np.ndarray, p1_wins_tiebreak: np.ndarray) -> np.ndarray:
+    """
+    Backward pass over the set chain.
+
+    Parameters:
+        - p1_wins_game (np.ndarray): P(player 1 wins a game from 0-0), indexed by server.
+        - p1_wins_tiebreak (np.ndarray): P(player 1 wins a tiebreak from 0-0), indexed by
+          the first server of the tiebreak.
+
+    Returns:
+        - np.ndarray: Set values indexed by [p1 games, p2 games, server of the game].
+    """
+    values = np.zeros((8, 8) + p1_wins_game.shape)
+    for a in range(7, -1, -1):
+        for b in range(7, -1, -1):
+            if a == b == 7 or (max(a, b) == 7 and min(a, b) < 5):
+                continue
+            if is_winning_set_score(a, b):
+                values[a, b] = float(a > b)
+            elif a == b == 6:
+                values[a, b] = p1_wins_tiebreak
+            else:
+                for server in (0, 1):
+                    values[a, b, server] = (
+                        p1_wins_game[server] * values[a + 1, b, 1 - server]
+                        + (1 - p1_wins_game[server]) * values[a, b + 1, 1 - server]
+                    )
+    return values
+
+
+def _match_values(p1_set_proba: np.ndarray, best_of: np.ndarray) -> np.ndarray:
+    """Backward pass over the match chain, indexed by [p1 sets, p2 sets]."""
+    size = MAX_SETS_WON + 1
+    values = np.zeros((size, size) + p1_set_proba.shape)
+    for max_sets_playable in np.unique(best_of):
+        mask = best_of == max_sets_playable
+        max_score = (int(max_sets_playable) + 1) // 2
+        values[max_score, :max_score, mask] = 1.0
+        for a in range(max_score - 1, -1, -1):
+            for b in range(max_score - 1, -1, -1):
+                values[a, b, mask] = (
+                    p1_set_proba[mask] * values[a + 1, b, mask]
+                    + (1 - p1_set_proba[mask]) * values[a, b + 1, mask]
+                )
+    return values
+
+
+def build_in_play_value_tables(
+    p1_serve_probs: np.ndarray, p2_serve_probs: np.ndarray, best_of: np.ndarray
+) -> InPlayValueTables:
+    """
+    Build the in-play value tables for a batch of matches.
+
+    Parameters:
+        - p1_serve_probs (np.ndarray): Probabilities of player 1 winning a point on serve.
+        - p2_serve_probs (np.ndarray): Probabilities of player 2 winning a point on serve.
+        - best_of (np.ndarray): Maximum number of sets playable in each match (3 or 5).
+
+    Returns:
+        - InPlayValueTables: The value tables, one entry per match on the last axis.
+    """
+    p1_serve_probs, p2_serve_probs, best_of = np.broadcast_arrays(
+        np.atleast_1d(np.asarray(p1_serve_probs, dtype=float)),
+        np.atleast_1d(np.asarray(p2_serve_probs, dtype=float)),
+        np.atleast_1d(np.rint(best_of).astype(int)),
+    )
+    shape = p1_serve_probs.shape
+    game_values = np.stack(
+        [
+            _first_to_values(lambda a, b: p1_serve_probs, GAME_POINTS, shape),
+            _first_to_values(lambda a, b: 1 - p2_serve_probs, GAME_POINTS, shape),
+        ],
+        axis=2,
+    )
+    tiebreak_values = _tiebreak_values_by_current_server(
+        p1_serve_probs, p2_serve_probs, TIEBREAK_POINTS
+    )
+    set_values = _set_values(game_values[0, 0], tiebreak_values[0, 0])
+    # The probability of winning a set does not depend on who serves first in it.
+    match_values = _match_values(set_values[0, 0, 0], best_of)
+    return InPlayValueTables(match_values, set_values, game_values, tiebreak_values)
+
+
+def _reduce_tied_points(
+    p1_points: np.ndarray, p2_points: np.ndarray, points_to_win: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """Map scores past (n - 1)-all to the equivalent score within the value tables."""
+    excess = np.maximum(0, (np.minimum(p1_points, p2_points) - points_to_win + 2) // 2)
+    return p1_points - 2 * excess, p2_points - 2 * excess
+
+
+def get_player_1_in_play_winning_probability(
+    tables: InPlayValueTables,
+    p1_sets: np.ndarray,
+    p2_sets: np.ndarray,
+    p1_games: np.ndarray,
+    p2_games: np.ndarray,
+    p1_points: np.ndarray,
+    p2_points: np.ndarray,
+    server: np.ndarray,
+    match_index: np.ndarray | int = 0,
+) -> np.ndarray:
+    """
+    Get the probability of player 1 winning the match from the current score.
+
+    All score arguments are arrays (or scalars) of the same shape, one entry per query.
+
+    Parameters:
+        - tables (InPlayValueTables): Tables from build_in_play_value_tables.
+        - p1_sets, p2_sets (np.ndarray): Sets won by each player.
+        - p1_games, p2_games (np.ndarray): Games won by each player in the current set.
+        - p1_points, p2_points (np.ndarray): Points won by each player in the current
+          game or tiebreak, as counts (0, 1, 2, 3, ...) rather than 15, 30, 40.
+        - server (np.ndarray): The player serving the current point, 1 or 2.
+        - match_index (np.ndarray | int): Index of each query's match in the tables.
+
+    Returns:
+        - np.ndarray: Probabilities of player 1 winning each match.
+    """
+    p1_sets, p2_sets, p1_games, p2_games, p1_points, p2_points, server, match_index = (
+        np.broadcast_arrays(
+            p1_sets,
+            p2_sets,
+            p1_games,
+            p2_games,
+            p1_points,
+            p2_points,
+            server,
+            match_index,
+        )
+    )
+    server_index = server - 1
+    in_tiebreak = (p1_games == 6) & (p2_games == 6)
+
+    tiebreak_p1_points, tiebreak_p2_points = _reduce_tied_points(
+        p1_points, p2_points, TIEBREAK_POINTS
+    )
+    game_p1_points, game_p2_points = _reduce_tied_points(
+        p1_points, p2_points, GAME_POINTS
+    )
+    # Outside a tiebreak, keep the game lookups in range (the result is discarded).
+    next_p1_games = np.where(in_tiebreak, 0, p1_games + 1)
+    next_p2_games = np.where(in_tiebreak, 0, p2_games + 1)
+    games = np.where(in_tiebreak, 0, p1_games)
+    game_p1_points = np.where(in_tiebreak, 0, game_p1_points)
+    game_p2_points = np.where(in_tiebreak, 0, game_p2_points)
+    tiebreak_p1_points = np.where(in_tiebreak, tiebreak_p1_points, 0)
+    tiebreak_p2_points = np.where(in_tiebreak, tiebreak_p2_points, 0)
+
+    p1_wins_game = tables.game_values[
+        game_p1_points, game_p2_points, server_index, match_index
+    ]
+    p1_wins_set_from_game = (
+        p1_wins_game
+        * tables.set_values[
+            next_p1_games,
+            np.where(in_tiebreak, 0, p2_games),
+            1 - server_index,
+            match_index,
+        ]
+        + (1 - p1_wins_game)
+        * tables.set_values[games, next_p2_games, 1 - server_index, match_index]
+    )
+    p1_wins_tiebreak = tables.tiebreak_values[
+        tiebreak_p1_points, tiebreak_p2_points, server_index, match_index
+    ]
+    p1_wins_set = np.where(in_tiebreak, p1_wins_tiebreak, p1_wins_set_from_game)
+
+    set_won_value = tables.match_values[p1_sets + 1, p2_sets, match_index]
+    set_lost_value = tables.match_values[p1_sets, p2_sets + 1, match_index]
+    return set_lost_value + p1_wins_set * (set_won_value - set_lost_value)
@@ -6,8 +6,8 @@ transition matrices and final transition matrices to calculate the probability o
 winning a set and match.
 
 Notes:
-    The code and model can be drastically improved. Basic assumptions are made i.e,
-    for tiebreaks and for final set format. The code is not optimized for performance.
+    The code and model can be drastically improved. The transition matrix functions assume
+    a standard final set, other formats are priced through tennis.models.match_formats.
 """
 
 from dataclasses import dataclass
@@ -15,7 +15,33 @@ from typing import Generator
 
 import numpy as np
 
+from tennis.models.match_formats import (
+    BEST_OF_3,
+    FORMATS_BY_BEST_OF,
+    KIND_ADVANTAGE,
+    KIND_FINAL_SET,
+    KIND_P1_SERVING,
+    KIND_P2_SERVING,
+    KIND_SET,
+    KIND_TIEBREAK,
+    MATCH_KINDS,
+    SET_KINDS,
+    MatchFormat,
+    SetFormat,
+    compile_match_chain,
+    compile_set_chain,
+    compile_tiebreak_chain,
+)
+
 DEFAULT_FIRST_SERVER = 1
+DEFAULT_SET_FORMAT = SetFormat()
+MAX_GAMES_IN_SET = 13
+TIEBREAK_POINTS = 7
+MATCH_TIEBREAK_POINTS = 10
+
+SOLVER_MATRIX_POWER = "matrix_power"
+SOLVER_ABSORBING = "absorbing"
+SOLVERS = (SOLVER_MATRIX_POWER, SOLVER_ABSORBING)
 
 
 @dataclass
@@ -48,6 +74,34 @@ def service_game_winning_prob(service_win_prob: float) -> float:
     )
 
 
+def service_game_winning_prob_derivative(service_win_prob: float) -> float:
+    """
+    Calculate the derivative of service_game_winning_prob with respect to the probability
+    of winning a point on serve.
+
+    Parameters:
+        - service_win_prob (float): Probability of winning a point on serve.
+
+    Returns:
+        - float: Derivative of the probability of winning a service game.
+    """
+    p = service_win_prob
+    q = 1 - p
+    deuce_numerator = q**3 * p**5
+    deuce_denominator = 1 - 2 * q * p
+    return (
+        4 * p**3
+        + 4 * (4 * q * p**3 - p**4)
+        + 10 * (4 * q**2 * p**3 - 2 * q * p**4)
+        + 20
+        * (
+            (5 * q**3 * p**4 - 3 * q**2 * p**5) * deuce_denominator
+            - deuce_numerator * (4 * p - 2)
+        )
+        / deuce_denominator**2
+    )
+
+
 def state_to_index_set(a: int, b: int) -> int:
     """Convert the state (a, b) to an index in the transition matrix.
     Possible states are 0-0 ->6-6, and 7-5,5-7,7-6,6-7
@@ -81,23 +135,116 @@ def is_p1_serving(a, b, first_server):
     return (a + b) % 2 == 1
 
 
-def tie_break_winning_prob(p1_serve_win_prob: float, p2_serve_win_prob: float) -> float:
+def _tied_pair_winning_prob(
+    p1_first_step_prob: np.ndarray, p1_second_step_prob: np.ndarray
+) -> np.ndarray:
     """
-    Estimate for winning tiebreak probability, implementation should be improved.
-    Should follow implementation of sets/match etc. and have transition matrix.
+    Probability of player 1 winning from a tied score that needs a two step lead, when
+    each pair of steps is one of each kind, e.g. deuce in a tiebreak or an advantage set.
 
-    Notes:
-        - This is likely to underestimate the probability of the favorite winning the tiebreak.
+    Parameters:
+        - p1_first_step_prob (np.ndarray): Probability of player 1 winning one step.
+        - p1_second_step_prob (np.ndarray): Probability of player 1 winning the other.
+
+    Returns:
+        - np.ndarray: Probability of player 1 winning two steps in a row first.
+    """
+    p1_wins_both = p1_first_step_prob * p1_second_step_prob
+    decided = p1_wins_both + (1 - p1_first_step_prob) * (1 - p1_second_step_prob)
+    return np.divide(
+        p1_wins_both, decided, out=np.full(decided.shape, 0.5), where=decided > 0
+    )
+
+
+def _tied_pair_winning_prob_gradient(
+    p1_first_step_prob: np.ndarray, p1_second_step_prob: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Derivatives of _tied_pair_winning_prob with respect to its two arguments."""
+    decided_squared = (
+        p1_first_step_prob * p1_second_step_prob
+        + (1 - p1_first_step_prob) * (1 - p1_second_step_prob)
+    ) ** 2
+    zeros = np.zeros(decided_squared.shape)
+    return (
+        np.divide(
+            p1_second_step_prob * (1 - p1_second_step_prob),
+            decided_squared,
+            out=zeros.copy(),
+            where=decided_squared > 0,
+        ),
+        np.divide(
+            p1_first_step_prob * (1 - p1_first_step_prob),
+            decided_squared,
+            out=zeros,
+            where=decided_squared > 0,
+        ),
+    )
+
+
+def tie_break_winning_prob(
+    p1_serve_win_prob: float | np.ndarray,
+    p2_serve_win_prob: float | np.ndarray,
+    points_to_win: int = TIEBREAK_POINTS,
+    first_server: int = DEFAULT_FIRST_SERVER,
+) -> float | np.ndarray:
+    """
+    Get the probability of player 1 winning a tiebreak, using a point by point chain.
+
+    Works elementwise on arrays of serve probabilities, each pair is solved once.
 
     Parameters:
-        - p1_serve_win_prob (float): Probability of player 1 winning a point on serve.
-        - p2_serve_win_prob (float): Probability of player 2 winning a point on serve.
+        - p1_serve_win_prob (float | np.ndarray): Probability of player 1 winning a point on serve.
+        - p2_serve_win_prob (float | np.ndarray): Probability of player 2 winning a point on serve.
+        - points_to_win (int): TIEBREAK_POINTS for a set tiebreak or MATCH_TIEBREAK_POINTS
+          for a match tiebreak, the tiebreak must still be won by two points.
+        - first_server (int): The player who serves the first point.
 
     Returns:
-        - float: Probability of player 1 winning the tiebreak.
+        - float | np.ndarray: Probability of player 1 winning the tiebreak.
 
+    Notes:
+        - From (points_to_win - 1) all, each pair of points has one point served by each
+          player, so the win probability from there is solved in closed form.
     """
-    return p1_serve_win_prob / (p1_serve_win_prob + p2_serve_win_prob)
+    p1_serve_win_prob = np.asarray(p1_serve_win_prob, dtype=float)
+    p2_serve_win_prob = np.asarray(p2_serve_win_prob, dtype=float)
+    kind_probabilities = np.zeros((SET_KINDS,) + p1_serve_win_prob.shape)
+    kind_probabilities[KIND_P1_SERVING] = p1_serve_win_prob
+    kind_probabilities[KIND_P2_SERVING] = 1 - p2_serve_win_prob
+    kind_probabilities[KIND_ADVANTAGE] = _tied_pair_winning_prob(
+        p1_serve_win_prob, 1 - p2_serve_win_prob
+    )
+    chain = compile_tiebreak_chain(points_to_win, first_server)
+    return chain.p1_winning_probability(kind_probabilities)[()]
+
+
+def _tie_break_winning_prob_and_gradient(
+    p1_serve_win_prob: np.ndarray, p2_serve_win_prob: np.ndarray, points_to_win: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Get tie_break_winning_prob and its gradient with respect to the serve probabilities.
+
+    Returns:
+        - tuple[np.ndarray, np.ndarray]: The probability, shape (n,), and the gradient,
+          shape (2, n), with respect to (p1_serve_win_prob, p2_serve_win_prob).
+    """
+    shape = p1_serve_win_prob.shape
+    kind_probabilities = np.zeros((SET_KINDS,) + shape)
+    kind_gradients = np.zeros((SET_KINDS, 2) + shape)
+    kind_probabilities[KIND_P1_SERVING] = p1_serve_win_prob
+    kind_gradients[KIND_P1_SERVING, 0] = 1.0
+    kind_probabilities[KIND_P2_SERVING] = 1 - p2_serve_win_prob
+    kind_gradients[KIND_P2_SERVING, 1] = -1.0
+    kind_probabilities[KIND_ADVANTAGE] = _tied_pair_winning_prob(
+        p1_serve_win_prob, 1 - p2_serve_win_prob
+    )
+    d_first, d_second = _tied_pair_winning_prob_gradient(
+        p1_serve_win_prob, 1 - p2_serve_win_prob
+    )
+    kind_gradients[KIND_ADVANTAGE, 0] = d_first
+    kind_gradients[KIND_ADVANTAGE, 1] = -d_second
+    chain = compile_tiebreak_chain(points_to_win, DEFAULT_FIRST_SERVER)
+    return chain.p1_winning_probability_and_gradient(kind_probabilities, kind_gradients)
 
 
 def build_set_transition_matrix(
@@ -117,6 +264,7 @@ def build_set_transition_matrix(
     Notes:
         We assume player 1 serves first in the set, the first server does not make a
         difference to winning probability in non-momentum models (does affect totals markets).
+        Player 1 therefore also serves first in the tiebreak, see tie_break_winning_prob.
     """
     first_server = DEFAULT_FIRST_SERVER
     size = 7**2 + 4
@@ -169,8 +317,39 @@ def get_set_final_transition_matrix(
     Notes:
         - Raises the matrix to the power of 13 to get the final transition matrix. (since 13 is the max number of games in a set)
     """
-    max_steps = 13
-    return np.linalg.matrix_power(single_set_transition_matrix, max_steps)
+    return np.linalg.matrix_power(single_set_transition_matrix, MAX_GAMES_IN_SET)
+
+
+def get_absorption_probabilities(
+    transition_matrix: np.ndarray, initial_index: int, max_steps: int
+) -> np.ndarray:
+    """
+    Get the probability of ending in each absorbing state, starting from one state.
+
+    Parameters:
+        - transition_matrix (np.ndarray): Transition matrix of an absorbing chain.
+        - initial_index (int): Index of the starting state.
+        - max_steps (int): Number of steps after which every path has been absorbed.
+
+    Returns:
+        - np.ndarray: Row of the final transition matrix for the initial state.
+
+    Notes:
+        - Only the distribution over states reachable from the initial state is
+          carried forward, so each step is a vector-matrix product rather than the
+          matrix-matrix products needed by np.linalg.matrix_power.
+    """
+    final_probabilities = transition_matrix[initial_index]
+    for _ in range(max_steps - 1):
+        final_probabilities = final_probabilities @ transition_matrix
+    return final_probabilities
+
+
+def check_solver(solver: str) -> None:
+    """Check that the solver is one of the supported solvers."""
+    if solver not in SOLVERS:
+        msg = f"Solver must be one of {SOLVERS}, not {solver}"
+        raise ValueError(msg)
 
 
 def final_set_states() -> Generator[tuple[int, int], None, None]:
@@ -192,32 +371,45 @@ def player_one_winning_set_states() -> Generator[tuple[int, int], None, None]:
 
 def get_player_1_set_winning_probabilities(
     single_set_transition_matrix: np.ndarray,
+    solver: str = SOLVER_MATRIX_POWER,
 ) -> float:
     """
     Get the probability of player 1 winning the set.
 
     Parameters:
         - single_set_transition_matrix (np.ndarray): Transition matrix for a set.
+        - solver (str): SOLVER_MATRIX_POWER to use the final transition matrix, or
+          SOLVER_ABSORBING to only carry the 0-0 row through the chain.
 
     Returns:
         - float: Probability of player 1 winning the set.
     """
+    check_solver(solver)
     initial_index = state_to_index_set(0, 0)
-    final_matrix = get_set_final_transition_matrix(single_set_transition_matrix)
+    if solver == SOLVER_ABSORBING:
+        final_probabilities = get_absorption_probabilities(
+            single_set_transition_matrix, initial_index, MAX_GAMES_IN_SET
+        )
+    else:
+        final_probabilities = get_set_final_transition_matrix(
+            single_set_transition_matrix
+        )[initial_index]
     p1_winning_states = list(player_one_winning_set_states())
     p1_winning_prob = sum(
-        final_matrix[initial_index, state_to_index_set(a, b)]
-        for a, b in p1_winning_states
+        final_probabilities[state_to_index_set(a, b)] for a, b in p1_winning_states
     )
     return p1_winning_prob
 
 
-def get_player_1_set_winning_probability(params: TennisParameters) -> float:
+def get_player_1_set_winning_probability(
+    params: TennisParameters, solver: str = SOLVER_MATRIX_POWER
+) -> float:
     """
     Get the probability of player 1 winning a set.
 
     Parameters:
         - params (TennisParameters): The tennis parameters.
+        - solver (str): Solver used for the set chain, see SOLVERS.
 
     Returns:
         - float: Probability of player 1 winning a set.
@@ -225,8 +417,12 @@ def get_player_1_set_winning_probability(params: TennisParameters) -> float:
     set_transition_matrix = build_set_transition_matrix(
         service_game_winning_prob(params.player_one_point_on_serve_prob),
         service_game_winning_prob(params.player_two_point_on_serve_prob),
+        tie_break_winning_prob(
+            params.player_one_point_on_serve_prob,
+            params.player_two_point_on_serve_prob,
+        ),
     )
-    return get_player_1_set_winning_probabilities(set_transition_matrix)
+    return get_player_1_set_winning_probabilities(set_transition_matrix, solver)
 
 
 def state_to_index_match(a: int, b: int) -> int:
@@ -316,7 +512,9 @@ def get_match_final_transition_matrix(
 
 
 def get_player_1_match_winning_probability_from_transition_matrix(
-    single_match_transition_matrix: np.ndarray, max_sets_playable: int
+    single_match_transition_matrix: np.ndarray,
+    max_sets_playable: int,
+    solver: str = SOLVER_MATRIX_POWER,
 ) -> float:
     """
     Get the probability of player 1 winning the match.
@@ -324,26 +522,35 @@ def get_player_1_match_winning_probability_from_transition_matrix(
     Parameters:
         - single_match_transition_matrix (np.ndarray): Transition matrix for a match.
         - max_sets_playable (int): The maximum number of sets that can be won.
+        - solver (str): SOLVER_MATRIX_POWER to use the final transition matrix, or
+          SOLVER_ABSORBING to only carry the 0-0 row through the chain.
 
     Returns:
         - float: Probability of player 1 winning the match.
     """
     max_score = (max_sets_playable + 1) // 2
+    check_solver(solver)
     initial_index = state_to_index_match(0, 0)
-    final_matrix = get_match_final_transition_matrix(
-        single_match_transition_matrix, max_sets_playable
-    )
+    if solver == SOLVER_ABSORBING:
+        final_probabilities = get_absorption_probabilities(
+            single_match_transition_matrix, initial_index, max_sets_playable
+        )
+    else:
+        final_probabilities = get_match_final_transition_matrix(
+            single_match_transition_matrix, max_sets_playable
+        )[initial_index]
     p1_winning_states = list(player_one_winning_match_states(max_score))
     p1_winning_prob = sum(
-        final_matrix[initial_index, state_to_index_match(a, b)]
-        for a, b in p1_winning_states
+        final_probabilities[state_to_index_match(a, b)] for a, b in p1_winning_states
     )
 
     return p1_winning_prob
 
 
 def get_player_1_match_winning_probability(
-    params: TennisParameters, max_sets_playable: int
+    params: TennisParameters,
+    max_sets_playable: int,
+    solver: str = SOLVER_MATRIX_POWER,
 ) -> float:
     """
     Get the probability of player 1 winning a match.
@@ -351,6 +558,7 @@ def get_player_1_match_winning_probability(
     Parameters:
         - params (TennisParameters): The tennis parameters.
         - max_sets_playable (int): The maximum number of sets that can be won.
+        - solver (str): Solver used for the set and match chains, see SOLVERS.
 
     Returns:
         - float: Probability of player 1 winning the match.
@@ -359,12 +567,511 @@ def get_player_1_match_winning_probability(
     set_transition_matrix = build_set_transition_matrix(
         service_game_winning_prob(params.player_one_point_on_serve_prob),
         service_game_winning_prob(params.player_two_point_on_serve_prob),
+        tie_break_winning_prob(
+            params.player_one_point_on_serve_prob,
+            params.player_two_point_on_serve_prob,
+        ),
     )
     match_transition_matrix = build_match_transition_matrix(
-        get_player_1_set_winning_probabilities(set_transition_matrix),
+        get_player_1_set_winning_probabilities(set_transition_matrix, solver),
         first_server=1,
         max_sets_won=max_score,
     )
     return get_player_1_match_winning_probability_from_transition_matrix(
-        match_transition_matrix, max_sets_playable
+        match_transition_matrix, max_sets_playable, solver
+    )
+
+
+def no_ad_service_game_winning_prob(service_win_prob: float) -> float:
+    """
+    Calculate the probability of winning a no-ad service game (a single deciding point
+    at deuce) given the probability of winning a point on serve.
+
+    Parameters:
+        - service_win_prob (float): Probability of winning a point on serve.
+
+    Returns:
+        - float: Probability of winning a service game.
+    """
+    return service_win_prob**4 * (
+        1
+        + 4 * (1 - service_win_prob)
+        + 10 * (1 - service_win_prob) ** 2
+        + 20 * (1 - service_win_prob) ** 3
+    )
+
+
+def no_ad_service_game_winning_prob_derivative(service_win_prob: float) -> float:
+    """
+    Calculate the derivative of no_ad_service_game_winning_prob with respect to the
+    probability of winning a point on serve.
+    """
+    p = service_win_prob
+    q = 1 - p
+    return 4 * p**3 * (1 + 4 * q + 10 * q**2 + 20 * q**3) - p**4 * (
+        4 + 20 * q + 60 * q**2
+    )
+
+
+def _set_kind_probabilities(
+    p1_serve_probs: np.ndarray,
+    p2_serve_probs: np.ndarray,
+    p1_service_game_proba: np.ndarray,
+    p2_service_game_proba: np.ndarray,
+    set_format: SetFormat,
+) -> np.ndarray:
+    """
+    Get the probability of player 1 winning each kind of step in a compiled set chain.
+
+    Returns:
+        - np.ndarray: Array of shape (SET_KINDS, n), indexed by the KIND_ constants of
+          tennis.models.match_formats.
+    """
+    kind_probabilities = np.empty((SET_KINDS,) + p1_serve_probs.shape)
+    kind_probabilities[KIND_P1_SERVING] = p1_service_game_proba
+    kind_probabilities[KIND_P2_SERVING] = 1 - p2_service_game_proba
+    kind_probabilities[KIND_TIEBREAK] = tie_break_winning_prob(
+        p1_serve_probs, p2_serve_probs, set_format.tiebreak_points
+    )
+    # Advantage sets, from games all each pair of games has one served by each player.
+    kind_probabilities[KIND_ADVANTAGE] = _tied_pair_winning_prob(
+        p1_service_game_proba, 1 - p2_service_game_proba
+    )
+    return kind_probabilities
+
+
+def _set_kind_probabilities_and_gradients(
+    p1_serve_probs: np.ndarray,
+    p2_serve_probs: np.ndarray,
+    set_format: SetFormat,
+    no_ad: bool,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Get _set_kind_probabilities and their gradients with respect to the serve
+    probabilities.
+
+    Returns:
+        - tuple[np.ndarray, np.ndarray]: Arrays of shape (SET_KINDS, n) and
+          (SET_KINDS, 2, n).
+    """
+    if no_ad:
+        game_winning_prob = no_ad_service_game_winning_prob
+        game_winning_prob_derivative = no_ad_service_game_winning_prob_derivative
+    else:
+        game_winning_prob = service_game_winning_prob
+        game_winning_prob_derivative = service_game_winning_prob_derivative
+    p1_service_game_proba = game_winning_prob(p1_serve_probs)
+    p2_service_game_proba = game_winning_prob(p2_serve_probs)
+    p1_service_game_derivative = game_winning_prob_derivative(p1_serve_probs)
+    p2_service_game_derivative = game_winning_prob_derivative(p2_serve_probs)
+
+    kind_probabilities = np.zeros((SET_KINDS,) + p1_serve_probs.shape)
+    kind_gradients = np.zeros((SET_KINDS, 2) + p1_serve_probs.shape)
+    kind_probabilities[KIND_P1_SERVING] = p1_service_game_proba
+    kind_gradients[KIND_P1_SERVING, 0] = p1_service_game_derivative
+    kind_probabilities[KIND_P2_SERVING] = 1 - p2_service_game_proba
+    kind_gradients[KIND_P2_SERVING, 1] = -p2_service_game_derivative
+    kind_probabilities[KIND_TIEBREAK], kind_gradients[KIND_TIEBREAK] = (
+        _tie_break_winning_prob_and_gradient(
+            p1_serve_probs, p2_serve_probs, set_format.tiebreak_points
+        )
+    )
+    kind_probabilities[KIND_ADVANTAGE] = _tied_pair_winning_prob(
+        p1_service_game_proba, 1 - p2_service_game_proba
+    )
+    d_first, d_second = _tied_pair_winning_prob_gradient(
+        p1_service_game_proba, 1 - p2_service_game_proba
+    )
+    kind_gradients[KIND_ADVANTAGE, 0] = d_first * p1_service_game_derivative
+    kind_gradients[KIND_ADVANTAGE, 1] = -d_second * p2_service_game_derivative
+    return kind_probabilities, kind_gradients
+
+
+def _set_score_probabilities(
+    p1_service_game_proba: np.ndarray,
+    p2_service_game_proba: np.ndarray,
+    p1_tiebreak_prob: np.ndarray | float = 0.5,
+    first_server: int = DEFAULT_FIRST_SERVER,
+) -> np.ndarray:
+    """
+    Get the probability of reaching every set score (a, b) from 0-0, for a batch.
+
+    Parameters:
+        - p1_service_game_proba (np.ndarray): Probabilities of player 1 winning a service game.
+        - p2_service_game_proba (np.ndarray): Probabilities of player 2 winning a service game.
+        - p1_tiebreak_prob (np.ndarray | float): Probabilities of player 1 winning a tiebreak.
+        - first_server (int): The player who serves first in the set.
+
+    Returns:
+        - np.ndarray: Array of shape (8, 8, n), entry [a, b] holds the probability of
+          passing through (or finishing at) the set score (a, b).
+
+    Notes:
+        Same chain as build_set_transition_matrix, using the compiled standard set chain.
+    """
+    p1_service_game_proba = np.asarray(p1_service_game_proba, dtype=float)
+    p2_service_game_proba = np.asarray(p2_service_game_proba, dtype=float)
+    chain = compile_set_chain(DEFAULT_SET_FORMAT, first_server)
+    kind_probabilities = np.zeros((SET_KINDS,) + p1_service_game_proba.shape)
+    kind_probabilities[KIND_P1_SERVING] = p1_service_game_proba
+    kind_probabilities[KIND_P2_SERVING] = 1 - p2_service_game_proba
+    kind_probabilities[KIND_TIEBREAK] = p1_tiebreak_prob
+    state_probabilities = chain.state_probabilities(kind_probabilities)
+    reach = np.zeros((8, 8) + p1_service_game_proba.shape)
+    for (a, b), i in chain.index.items():
+        reach[a, b] = state_probabilities[i]
+    return reach
+
+
+def get_player_1_set_winning_probability_batch(
+    p1_serve_probs: np.ndarray,
+    p2_serve_probs: np.ndarray,
+    set_format: SetFormat = DEFAULT_SET_FORMAT,
+    no_ad: bool = False,
+) -> np.ndarray:
+    """
+    Get the probability of player 1 winning a set, for arrays of serve probabilities.
+
+    Parameters:
+        - p1_serve_probs (np.ndarray): Probabilities of player 1 winning a point on serve.
+        - p2_serve_probs (np.ndarray): Probabilities of player 2 winning a point on serve.
+        - set_format (SetFormat): The scoring of the set.
+        - no_ad (bool): Whether games are decided by a single point at deuce.
+
+    Returns:
+        - np.ndarray: Probabilities of player 1 winning a set.
+    """
+    p1_serve_probs = np.asarray(p1_serve_probs, dtype=float)
+    p2_serve_probs = np.asarray(p2_serve_probs, dtype=float)
+    game_winning_prob = (
+        no_ad_service_game_winning_prob if no_ad else service_game_winning_prob
+    )
+    return compile_set_chain(set_format).p1_winning_probability(
+        _set_kind_probabilities(
+            p1_serve_probs,
+            p2_serve_probs,
+            game_winning_prob(p1_serve_probs),
+            game_winning_prob(p2_serve_probs),
+            set_format,
+        )
+    )
+
+
+def get_player_1_match_winning_probability_for_format(
+    p1_serve_probs: np.ndarray,
+    p2_serve_probs: np.ndarray,
+    match_format: MatchFormat = BEST_OF_3,
+) -> np.ndarray:
+    """
+    Get the probability of player 1 winning a match with the given scoring, for arrays of
+    serve probabilities.
+
+    Parameters:
+        - p1_serve_probs (np.ndarray): Probabilities of player 1 winning a point on serve.
+        - p2_serve_probs (np.ndarray): Probabilities of player 2 winning a point on serve.
+        - match_format (MatchFormat): The scoring of the match, see
+          tennis.models.match_formats.
+
+    Returns:
+        - np.ndarray: Probabilities of player 1 winning each match.
+    """
+    p1_set_proba = get_player_1_set_winning_probability_batch(
+        p1_serve_probs, p2_serve_probs, match_format.set_format, match_format.no_ad
+    )
+    if match_format.final_set_format == match_format.set_format:
+        p1_final_set_proba = p1_set_proba
+    else:
+        p1_final_set_proba = get_player_1_set_winning_probability_batch(
+            p1_serve_probs,
+            p2_serve_probs,
+            match_format.final_set_format,
+            match_format.no_ad,
+        )
+    kind_probabilities = np.empty((MATCH_KINDS,) + p1_set_proba.shape)
+    kind_probabilities[KIND_SET] = p1_set_proba
+    kind_probabilities[KIND_FINAL_SET] = p1_final_set_proba
+    return compile_match_chain(match_format).p1_winning_probability(kind_probabilities)
+
+
+def check_best_of(best_of: np.ndarray) -> None:
+    """Check that every best of has a match format in FORMATS_BY_BEST_OF."""
+    if not np.isin(best_of, tuple(FORMATS_BY_BEST_OF)).all():
+        msg = f"Best of must be one of {tuple(FORMATS_BY_BEST_OF)}"
+        raise ValueError(msg)
+
+
+def get_player_1_match_winning_probability_batch(
+    p1_serve_probs: np.ndarray, p2_serve_probs: np.ndarray, best_of: np.ndarray
+) -> np.ndarray:
+    """
+    Get the probability of player 1 winning a match, for arrays of serve probabilities.
+
+    Vectorised equivalent of calling get_player_1_match_winning_probability on each row.
+
+    Parameters:
+        - p1_serve_probs (np.ndarray): Probabilities of player 1 winning a point on serve.
+        - p2_serve_probs (np.ndarray): Probabilities of player 2 winning a point on serve.
+        - best_of (np.ndarray): Maximum number of sets playable in each match (3 or 5),
+          a scalar is broadcast to all matches.
+
+    Returns:
+        - np.ndarray: Probabilities of player 1 winning each match.
+    """
+    p1_serve_probs, p2_serve_probs, best_of = np.broadcast_arrays(
+        np.asarray(p1_serve_probs, dtype=float),
+        np.asarray(p2_serve_probs, dtype=float),
+        np.rint(best_of).astype(int),
+    )
+    check_best_of(best_of)
+    p1_match_proba = np.empty(p1_serve_probs.shape)
+    for max_sets_playable in np.unique(best_of):
+        mask = best_of == max_sets_playable
+        p1_match_proba[mask] = get_player_1_match_winning_probability_for_format(
+            p1_serve_probs[mask],
+            p2_serve_probs[mask],
+            FORMATS_BY_BEST_OF[int(max_sets_playable)],
+        )
+    return p1_match_proba[()]
+
+
+def get_player_1_match_winning_probability_and_gradient_for_format(
+    p1_serve_probs: np.ndarray,
+    p2_serve_probs: np.ndarray,
+    match_format: MatchFormat = BEST_OF_3,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Get the probability of player 1 winning a match with the given scoring, and its
+    derivatives with respect to both serve probabilities, for arrays of serve probabilities.
+
+    Parameters:
+        - p1_serve_probs (np.ndarray): Probabilities of player 1 winning a point on serve.
+        - p2_serve_probs (np.ndarray): Probabilities of player 2 winning a point on serve.
+        - match_format (MatchFormat): The scoring of the match.
+
+    Returns:
+        - tuple[np.ndarray, np.ndarray, np.ndarray]: The probabilities of player 1
+          winning, and their derivatives with respect to p1_serve_probs and p2_serve_probs.
+
+    Notes:
+        - Derivatives of the service game formula are found in closed form, then each of
+          the tiebreak, set and match chains is differentiated with one forward and one
+          backward sweep (reverse mode), and the results are combined with the chain
+          rule, so no extra evaluations are needed as with finite differences.
+    """
+    p1_serve_probs, p2_serve_probs = np.broadcast_arrays(
+        np.asarray(p1_serve_probs, dtype=float),
+        np.asarray(p2_serve_probs, dtype=float),
+    )
+    set_probabilities = {}
+    for set_format in {match_format.set_format, match_format.final_set_format}:
+        set_probabilities[set_format] = compile_set_chain(
+            set_format
+        ).p1_winning_probability_and_gradient(
+            *_set_kind_probabilities_and_gradients(
+                p1_serve_probs, p2_serve_probs, set_format, match_format.no_ad
+            )
+        )
+    kind_probabilities = np.empty((MATCH_KINDS,) + p1_serve_probs.shape)
+    kind_gradients = np.empty((MATCH_KINDS, 2) + p1_serve_probs.shape)
+    kind_probabilities[KIND_SET], kind_gradients[KIND_SET] = set_probabilities[
+        match_format.set_format
+    ]
+    kind_probabilities[KIND_FINAL_SET], kind_gradients[KIND_FINAL_SET] = (
+        set_probabilities[match_format.final_set_format]
+    )
+    p1_match_proba, gradient = compile_match_chain(
+        match_format
+    ).p1_winning_probability_and_gradient(kind_probabilities, kind_gradients)
+    return p1_match_proba, gradient[0], gradient[1]
+
+
+def get_player_1_match_winning_probability_and_gradient(
+    p1_serve_probs: np.ndarray, p2_serve_probs: np.ndarray, best_of: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Get the probability of player 1 winning a match and its derivatives with respect to
+    both serve probabilities, for arrays of serve probabilities.
+
+    Parameters:
+        - p1_serve_probs (np.ndarray): Probabilities of player 1 winning a point on serve.
+        - p2_serve_probs (np.ndarray): Probabilities of player 2 winning a point on serve.
+        - best_of (np.ndarray): Maximum number of sets playable in each match (3 or 5).
+
+    Returns:
+        - tuple[np.ndarray, np.ndarray, np.ndarray]: The probabilities of player 1
+          winning, and their derivatives with respect to p1_serve_probs and p2_serve_probs.
+    """
+    p1_serve_probs, p2_serve_probs, best_of = np.broadcast_arrays(
+        np.asarray(p1_serve_probs, dtype=float),
+        np.asarray(p2_serve_probs, dtype=float),
+        np.rint(best_of).astype(int),
+    )
+    check_best_of(best_of)
+    p1_match_proba = np.empty(p1_serve_probs.shape)
+    p1_derivative = np.empty(p1_serve_probs.shape)
+    p2_derivative = np.empty(p1_serve_probs.shape)
+    for max_sets_playable in np.unique(best_of):
+        mask = best_of == max_sets_playable
+        p1_match_proba[mask], p1_derivative[mask], p2_derivative[mask] = (
+            get_player_1_match_winning_probability_and_gradient_for_format(
+                p1_serve_probs[mask],
+                p2_serve_probs[mask],
+                FORMATS_BY_BEST_OF[int(max_sets_playable)],
+            )
+        )
+    return p1_match_proba[()], p1_derivative[()], p2_derivative[()]
+
+
+@dataclass
+class ScoreDistribution:
+    """
+    Dataclass to hold the score distributions for a batch of matches, the last axis of
+    each array indexes the match.
+
+    Attributes:
+        - set_scores: P(a set finishes a-b) for a set where player 1 serves first, keyed
+          by final set score.
+        - match_scores: P(the match finishes a-b in sets), keyed by final match score.
+        - total_games: P(total games in the match == g), indexed by [g, match].
+        - games_difference: P(player 1 games - player 2 games == d), indexed by
+          [d + max_games_difference, match].
+        - max_games_difference: Offset of games_difference.
+    """
+
+    set_scores: dict[tuple[int, int], np.ndarray]
+    match_scores: dict[tuple[int, int], np.ndarray]
+    total_games: np.ndarray
+    games_difference: np.ndarray
+    max_games_difference: int
+
+    @property
+    def p1_match_winning_probability(self) -> np.ndarray:
+        """Probability of player 1 winning each match."""
+        return sum(
+            probability for (a, b), probability in self.match_scores.items() if a > b
+        )
+
+
+def _shift_add(
+    target: np.ndarray,
+    source: np.ndarray,
+    probability: np.ndarray,
+    shift: int,
+    window: tuple[int, int],
+) -> None:
+    """
+    Add source rows start to stop, times probability, to target shifted along the
+    first axis. source[i] lands on target[i + shift], rows outside target are dropped.
+    """
+    start = max(window[0], -shift, 0)
+    stop = min(window[1], len(source), len(target) - shift)
+    target[start + shift : stop + shift] += source[start:stop] * probability
+
+
+def get_score_distribution_batch(
+    p1_serve_probs: np.ndarray, p2_serve_probs: np.ndarray, best_of: np.ndarray
+) -> ScoreDistribution:
+    """
+    Get the set score, match score, total games and games handicap distributions.
+
+    All distributions come from one pass over the set chain (for each first server) and
+    one pass over the match chain, for arrays of serve probabilities.
+
+    Parameters:
+        - p1_serve_probs (np.ndarray): Probabilities of player 1 winning a point on serve.
+        - p2_serve_probs (np.ndarray): Probabilities of player 2 winning a point on serve.
+        - best_of (np.ndarray): Maximum number of sets playable in each match (3 or 5).
+
+    Returns:
+        - ScoreDistribution: The distributions for each match.
+
+    Notes:
+        - Player 1 serves first in the match. The server alternates every game through
+          the match, so the first server of each set depends on the number of games
+          played before it. This does not change who wins but does change the totals.
+    """
+    p1_serve_probs, p2_serve_probs, best_of = np.broadcast_arrays(
+        np.atleast_1d(np.asarray(p1_serve_probs, dtype=float)),
+        np.atleast_1d(np.asarray(p2_serve_probs, dtype=float)),
+        np.atleast_1d(np.rint(best_of).astype(int)),
+    )
+    p1_service_game_proba = service_game_winning_prob(p1_serve_probs)
+    p2_service_game_proba = service_game_winning_prob(p2_serve_probs)
+    p1_tiebreak_prob = tie_break_winning_prob(p1_serve_probs, p2_serve_probs)
+    set_scores_by_first_server = {
+        first_server: _set_score_probabilities(
+            p1_service_game_proba,
+            p2_service_game_proba,
+            p1_tiebreak_prob,
+            first_server=first_server,
+        )
+        for first_server in (1, 2)
+    }
+    final_scores = list(final_set_states())
+
+    max_score = (int(best_of.max()) + 1) // 2
+    max_sets = 2 * max_score - 1
+    max_games_difference = 6 * max_score
+    total_games = np.zeros((MAX_GAMES_IN_SET * max_sets + 1,) + best_of.shape)
+    games_difference = np.zeros((2 * max_games_difference + 1,) + best_of.shape)
+    match_scores = {}
+
+    for max_sets_playable in np.unique(best_of):
+        mask = best_of == max_sets_playable
+        sets_to_win = (int(max_sets_playable) + 1) // 2
+        outcomes = {
+            first_server: [(a, b, set_scores[a, b][mask]) for a, b in final_scores]
+            for first_server, set_scores in set_scores_by_first_server.items()
+        }
+        # Reach distributions over games for each (p1 sets, p2 sets, first server).
+        empty_total = np.zeros((total_games.shape[0], np.count_nonzero(mask)))
+        empty_difference = np.zeros((games_difference.shape[0], empty_total.shape[1]))
+        states = {
+            (0, 0, DEFAULT_FIRST_SERVER): (empty_total.copy(), empty_difference.copy())
+        }
+        states[0, 0, DEFAULT_FIRST_SERVER][0][0] = 1.0
+        states[0, 0, DEFAULT_FIRST_SERVER][1][max_games_difference] = 1.0
+        for sets_played in range(2 * sets_to_win - 1):
+            # Only rows that can hold mass after this many sets are shifted.
+            total_window = (6 * sets_played, MAX_GAMES_IN_SET * sets_played + 1)
+            difference_window = (
+                max_games_difference - 7 * sets_played,
+                max_games_difference + 7 * sets_played + 1,
+            )
+            for (sa, sb, first_server), (total, difference) in list(states.items()):
+                if sa + sb != sets_played or max(sa, sb) == sets_to_win:
+                    continue
+                del states[sa, sb, first_server]
+                for a, b, probability in outcomes[first_server]:
+                    next_first_server = (
+                        first_server if (a + b) % 2 == 0 else 3 - first_server
+                    )
+                    key = (sa + (a > b), sb + (b > a), next_first_server)
+                    if key not in states:
+                        states[key] = (empty_total.copy(), empty_difference.copy())
+                    _shift_add(states[key][0], total, probability, a + b, total_window)
+                    _shift_add(
+                        states[key][1],
+                        difference,
+                        probability,
+                        a - b,
+                        difference_window,
+                    )
+
+        for (sa, sb, _), (total, difference) in states.items():
+            if (sa, sb) not in match_scores:
+                match_scores[sa, sb] = np.zeros(best_of.shape)
+            match_scores[sa, sb][mask] += total.sum(axis=0)
+            total_games[:, mask] += total
+            games_difference[:, mask] += difference
+
+    return ScoreDistribution(
+        set_scores={
+            (a, b): set_scores_by_first_server[DEFAULT_FIRST_SERVER][a, b]
+            for a, b in final_scores
+        },
+        match_scores=dict(sorted(match_scores.items())),
+        total_games=total_games,
+        games_difference=games_difference,
+        max_games_difference=max_games_difference,
     )
@@ -0,0 +1,312 @@
+"""
+Match formats for the markov model.
+
+A MatchFormat describes how a match is scored (number of sets, tiebreaks, final set rules and
+no-ad games). The set and match chains of each format are compiled once into a state index
+and a list of steps, and cached, so pricing a batch only has to fill in the
+probabilities of each step.
+
+Notes:
+    Every step of a compiled chain is won or lost by player 1, and the probability of player
+    1 winning it is given by the step kind, e.g. a game served by player 1 or a tiebreak.
+    Sets without a tiebreak are resolved from (games_to_win - 1)-all in closed form, since
+    from there each pair of games has one served by each player.
+"""
+
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+import numpy as np
+
+# Step kinds in a set chain.
+KIND_P1_SERVING = 0
+KIND_P2_SERVING = 1
+KIND_TIEBREAK = 2
+KIND_ADVANTAGE = 3
+SET_KINDS = 4
+
+# Step kinds in a match chain.
+KIND_SET = 0
+KIND_FINAL_SET = 1
+MATCH_KINDS = 2
+
+
+@dataclass(frozen=True)
+class SetFormat:
+    """
+    Dataclass to hold the scoring of a set.
+
+    Attributes:
+        - games_to_win (int): Games needed to win the set, by two clear games.
+        - tiebreak_at (int | None): Games all score a tiebreak is played at, None for an
+          advantage set.
+        - tiebreak_points (int): Points needed to win the tiebreak, by two clear points.
+    """
+
+    games_to_win: int = 6
+    tiebreak_at: int | None = 6
+    tiebreak_points: int = 7
+
+
+@dataclass(frozen=True)
+class MatchFormat:
+    """
+    Dataclass to hold the scoring of a match.
+
+    Attributes:
+        - sets_to_win (int): Sets needed to win the match.
+        - set_format (SetFormat): Scoring of every set but the final set.
+        - final_set_format (SetFormat): Scoring of the final set.
+        - no_ad (bool): Whether games are decided by a single point at deuce.
+    """
+
+    sets_to_win: int = 2
+    set_format: SetFormat = field(default_factory=SetFormat)
+    final_set_format: SetFormat = field(default_factory=SetFormat)
+    no_ad: bool = False
+
+    @property
+    def max_sets(self) -> int:
+        """The maximum number of sets that can be played."""
+        return 2 * self.sets_to_win - 1
+
+
+BEST_OF_3 = MatchFormat(sets_to_win=2)
+BEST_OF_5 = MatchFormat(sets_to_win=3)
+BEST_OF_3_NO_AD = MatchFormat(sets_to_win=2, no_ad=True)
+BEST_OF_5_ADVANTAGE_FINAL_SET = MatchFormat(
+    sets_to_win=3, final_set_format=SetFormat(tiebreak_at=None)
+)
+BEST_OF_5_FINAL_SET_TIEBREAK_AT_12 = MatchFormat(
+    sets_to_win=3, final_set_format=SetFormat(tiebreak_at=12)
+)
+BEST_OF_5_FINAL_SET_10_POINT_TIEBREAK = MatchFormat(
+    sets_to_win=3, final_set_format=SetFormat(tiebreak_points=10)
+)
+BEST_OF_3_FINAL_SET_10_POINT_TIEBREAK = MatchFormat(
+    sets_to_win=2, final_set_format=SetFormat(tiebreak_points=10)
+)
+FORMATS_BY_BEST_OF = {3: BEST_OF_3, 5: BEST_OF_5}
+
+
+def is_p1_serving_tiebreak_point(a, b, first_server):
+    """
+    Check if player 1 is serving at tiebreak score (a, b).
+
+    The first server serves one point, then players alternate every two points.
+    """
+    first_server_serving = ((a + b + 1) // 2) % 2 == 0
+    return first_server_serving == (first_server == 1)
+
+
+@dataclass(frozen=True, eq=False)
+class CompiledChain:
+    """
+    Dataclass to hold the compiled structure of a set or match chain.
+
+    Attributes:
+        - states (tuple): The (a, b) scores of the chain, the first is 0-0.
+        - index (dict): Map from score to position in states.
+        - steps (tuple): For each non-final state in order of steps played, the positions
+          of the state and of the states reached if player 1 wins or loses the step, and
+          the step kind.
+        - final (np.ndarray): Mask of the final states.
+        - p1_winning (np.ndarray): Mask of the final states won by player 1.
+    """
+
+    states: tuple[tuple[int, int], ...]
+    index: dict[tuple[int, int], int]
+    steps: tuple[tuple[int, int, int, int], ...]
+    final: np.ndarray
+    p1_winning: np.ndarray
+
+    def state_probabilities(self, kind_probabilities: np.ndarray) -> np.ndarray:
+        """
+        Get the probability of passing through (or finishing at) every state from 0-0.
+
+        Parameters:
+            - kind_probabilities (np.ndarray): Probability of player 1 winning a step of
+              each kind, shape (number of kinds, ...) for a batch.
+
+        Returns:
+            - np.ndarray: Array of shape (len(states), ...).
+        """
+        kind_probabilities = np.asarray(kind_probabilities, dtype=float)
+        reach = np.zeros((len(self.states),) + kind_probabilities.shape[1:])
+        reach[0] = 1.0
+        for state, win_state, lose_state, kind in self.steps:
+            won = reach[state] * kind_probabilities[kind]
+            reach[win_state] += won
+            reach[lose_state] += reach[state] - won
+        return reach
+
+    def p1_winning_probability(self, kind_probabilities: np.ndarray) -> np.ndarray:
+        """Get the probability of player 1 finishing in a winning state."""
+        return self.state_probabilities(kind_probabilities)[self.p1_winning].sum(axis=0)
+
+    def p1_winning_probability_and_gradient(
+        self, kind_probabilities: np.ndarray, kind_gradients: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Get the probability of player 1 finishing in a winning state and its gradient.
+
+        Parameters:
+            - kind_probabilities (np.ndarray): Probability of player 1 winning a step of
+              each kind, shape (number of kinds, ...).
+            - kind_gradients (np.ndarray): Derivatives of kind_probabilities with respect
+              to each parameter, shape (number of kinds, number of parameters, ...).
+
+        Returns:
+            - tuple[np.ndarray, np.ndarray]: The probability, shape (...), and its
+              gradient, shape (number of parameters, ...).
+
+        Notes:
+            - The derivative with respect to a step probability is the probability of
+              reaching the step times the difference between the values of its win and
+              lose states, so one forward and one backward pass give the derivatives
+              for every kind at once (reverse mode).
+        """
+        kind_probabilities = np.asarray(kind_probabilities, dtype=float)
+        kind_gradients = np.asarray(kind_gradients, dtype=float)
+        reach = self.state_probabilities(kind_probabilities)
+        values = np.zeros(reach.shape)
+        values[self.p1_winning] = 1.0
+        kind_sensitivities = np.zeros(kind_probabilities.shape)
+        for state, win_state, lose_state, kind in reversed(self.steps):
+            value_difference = values[win_state] - values[lose_state]
+            values[state] = (
+                values[lose_state] + kind_probabilities[kind] * value_difference
+            )
+            kind_sensitivities[kind] += reach[state] * value_difference
+        gradient = (kind_sensitivities[:, np.newaxis] * kind_gradients).sum(axis=0)
+        return values[0], gradient
+
+
+def _compile_chain(transitions: dict, p1_winning_states: set) -> CompiledChain:
+    """
+    Compile a chain from its transitions.
+
+    Parameters:
+        - transitions (dict): Map from each non-final state to (win state, lose state, kind).
+        - p1_winning_states (set): Final states won by player 1.
+
+    Returns:
+        - CompiledChain: The compiled chain.
+    """
+    reachable = {(0, 0)}
+    frontier = [(0, 0)]
+    while frontier:
+        state = frontier.pop()
+        if state in transitions:
+            for next_state in transitions[state][:2]:
+                if next_state not in reachable:
+                    reachable.add(next_state)
+                    frontier.append(next_state)
+    states = tuple(sorted(reachable, key=lambda state: (sum(state), -state[0])))
+    index = {state: i for i, state in enumerate(states)}
+
+    steps = []
+    for state in states:
+        if state in transitions:
+            win_state, lose_state, kind = transitions[state]
+            steps.append((index[state], index[win_state], index[lose_state], kind))
+    return CompiledChain(
+        states=states,
+        index=index,
+        steps=tuple(steps),
+        final=np.array([state not in transitions for state in states]),
+        p1_winning=np.array([state in p1_winning_states for state in states]),
+    )
+
+
+@lru_cache
+def compile_tiebreak_chain(points_to_win: int, first_server: int = 1) -> CompiledChain:
+    """
+    Compile the chain of points in a tiebreak.
+
+    Parameters:
+        - points_to_win (int): Points needed to win the tiebreak, by two clear points.
+        - first_server (int): The player who serves the first point.
+
+    Returns:
+        - CompiledChain: The tiebreak chain, with step kinds KIND_P1_SERVING and
+          KIND_P2_SERVING for points and KIND_ADVANTAGE from (points_to_win - 1)-all.
+    """
+    last = points_to_win - 1
+    transitions = {}
+    for a in range(points_to_win):
+        for b in range(points_to_win):
+            if a == b == last:
+                transitions[a, b] = ((a + 2, b), (a, b + 2), KIND_ADVANTAGE)
+                continue
+            if is_p1_serving_tiebreak_point(a, b, first_server):
+                kind = KIND_P1_SERVING
+            else:
+                kind = KIND_P2_SERVING
+            transitions[a, b] = ((a + 1, b), (a, b + 1), kind)
+    p1_winning_states = {(points_to_win, b) for b in range(last)} | {
+        (points_to_win + 1, last)
+    }
+    return _compile_chain(transitions, p1_winning_states)
+
+
+@lru_cache
+def compile_set_chain(set_format: SetFormat, first_server: int = 1) -> CompiledChain:
+    """
+    Compile the chain of games in a set.
+
+    Parameters:
+        - set_format (SetFormat): The scoring of the set.
+        - first_server (int): The player who serves the first game of the set.
+
+    Returns:
+        - CompiledChain: The set chain, with step kinds KIND_P1_SERVING, KIND_P2_SERVING,
+          KIND_TIEBREAK and KIND_ADVANTAGE.
+    """
+    games_to_win = set_format.games_to_win
+    tiebreak_at = set_format.tiebreak_at
+    max_games = games_to_win + 1 if tiebreak_at is None else tiebreak_at + 1
+
+    def is_final(a: int, b: int) -> bool:
+        if tiebreak_at is not None and max(a, b) == tiebreak_at + 1:
+            return True
+        return max(a, b) >= games_to_win and abs(a - b) >= 2
+
+    transitions = {}
+    p1_winning_states = set()
+    for a in range(max_games + 1):
+        for b in range(max_games + 1):
+            if is_final(a, b):
+                if a > b:
+                    p1_winning_states.add((a, b))
+            elif a == b == tiebreak_at:
+                transitions[a, b] = ((a + 1, b), (a, b + 1), KIND_TIEBREAK)
+            elif tiebreak_at is None and a == b == games_to_win - 1:
+                transitions[a, b] = ((a + 2, b), (a, b + 2), KIND_ADVANTAGE)
+            elif max(a, b) < max_games:
+                p1_serving = ((a + b) % 2 == 0) == (first_server == 1)
+                kind = KIND_P1_SERVING if p1_serving else KIND_P2_SERVING
+                transitions[a, b] = ((a + 1, b), (a, b + 1), kind)
+    return _compile_chain(transitions, p1_winning_states)
+
+
+@lru_cache
+def compile_match_chain(match_format: MatchFormat) -> CompiledChain:
+    """
+    Compile the chain of sets in a match.
+
+    Parameters:
+        - match_format (MatchFormat): The scoring of the match.
+
+    Returns:
+        - CompiledChain: The match chain, with step kinds KIND_SET and KIND_FINAL_SET.
+    """
+    sets_to_win = match_format.sets_to_win
+    transitions = {}
+    for a in range(sets_to_win):
+        for b in range(sets_to_win):
+            final_set = a == b == sets_to_win - 1
+            kind = KIND_FINAL_SET if final_set else KIND_SET
+            transitions[a, b] = ((a + 1, b), (a, b + 1), kind)
+    p1_winning_states = {(sets_to_win, b) for b in range(sets_to_win)}
+    return _compile_chain(transitions, p1_winning_states)
@@ -0,0 +1,115 @@
+"""
+Lookup table mode for the markov model.
+
+Match winning probabilities are precomputed on a regular (p1 serve, p2 serve) grid over
+[0, 1] x [0, 1] for best of 3 and best of 5, and saved as a .npy file. Loading the file
+memory-maps it, so worker processes share one copy of the table through the page cache
+and start without recomputing it. Queries are answered with bilinear interpolation.
+
+Notes:
+    With the default resolution (step 0.001) the interpolation error against the markov
+    model is below MAX_INTERPOLATION_ERROR (2e-5) for both serve probabilities in
+    INTERPOLATION_DOMAIN ([0.05, 0.95]), measured at every cell centre. There the
+    largest errors are around p1 ~ p2 ~ 0.5 where the match probability is steepest, a
+    coarser grid increases the error roughly quadratically.
+
+    Outside the domain the error grows towards the edges, up to 0.034 for best of 3 and
+    0.074 for best of 5 next to (0, 0). When both serve probabilities go to 0 (or 1)
+    nearly every set reaches the point-level tiebreak, whose winning probability then
+    depends on the ratio of the serve probabilities (or of their complements), which no
+    regular grid resolves. Serve probabilities that far out do not occur in matches.
+"""
+
+import numpy as np
+
+from tennis.models.markov_model import get_player_1_match_winning_probability_batch
+
+DEFAULT_GRID_PATH = "./data/match_probability_grid.npy"
+DEFAULT_GRID_RESOLUTION = 1001
+GRID_BEST_OF = (3, 5)
+MAX_INTERPOLATION_ERROR = 2e-5
+INTERPOLATION_DOMAIN = (0.05, 0.95)
+_ROWS_PER_CHUNK = 64
+
+
+def build_probability_grid(resolution: int = DEFAULT_GRID_RESOLUTION) -> np.ndarray:
+    """
+    Build the grid of player 1 match winning probabilities.
+
+    Parameters:
+        - resolution (int): Number of grid points along each serve probability axis.
+
+    Returns:
+        - np.ndarray: Array of shape (len(GRID_BEST_OF), resolution, resolution), entry
+          [k, i, j] is the probability of player 1 winning a best of GRID_BEST_OF[k]
+          match with serve probabilities serve_probs[i] and serve_probs[j].
+    """
+    serve_probs = np.linspace(0, 1, resolution)
+    grid = np.empty((len(GRID_BEST_OF), resolution, resolution))
+    for k, best_of in enumerate(GRID_BEST_OF):
+        for start in range(0, resolution, _ROWS_PER_CHUNK):
+            p1, p2 = np.meshgrid(
+                serve_probs[start : start + _ROWS_PER_CHUNK], serve_probs, indexing="ij"
+            )
+            grid[k, start : start + _ROWS_PER_CHUNK] = (
+                get_player_1_match_winning_probability_batch(
+                    p1.ravel(), p2.ravel(), best_of
+                ).reshape(p1.shape)
+            )
+    return grid
+
+
+def save_probability_grid(grid: np.ndarray, path: str = DEFAULT_GRID_PATH) -> None:
+    """Save the probability grid as a .npy file."""
+    np.save(path, grid)
+
+
+def load_probability_grid(path: str = DEFAULT_GRID_PATH) -> np.ndarray:
+    """Load the probability grid as a read-only memory-mapped array."""
+    return np.load(path, mmap_mode="r")
+
+
+def get_player_1_match_winning_probability_from_grid(
+    grid: np.ndarray,
+    p1_serve_probs: np.ndarray,
+    p2_serve_probs: np.ndarray,
+    best_of: np.ndarray,
+) -> np.ndarray:
+    """
+    Get the probability of player 1 winning a match by interpolating the grid.
+
+    Parameters:
+        - grid (np.ndarray): Grid from build_probability_grid or load_probability_grid.
+        - p1_serve_probs (np.ndarray): Probabilities of player 1 winning a point on serve.
+        - p2_serve_probs (np.ndarray): Probabilities of player 2 winning a point on serve.
+        - best_of (np.ndarray): Maximum number of sets playable, 3 or 5.
+
+    Returns:
+        - np.ndarray: Probabilities of player 1 winning each match.
+    """
+    p1_serve_probs, p2_serve_probs, best_of = np.broadcast_arrays(
+        np.asarray(p1_serve_probs, dtype=float),
+        np.asarray(p2_serve_probs, dtype=float),
+        np.rint(best_of).astype(int),
+    )
+    if not np.isin(best_of, GRID_BEST_OF).all():
+        msg = f"Best of must be one of {GRID_BEST_OF}"
+        raise ValueError(msg)
+    last_cell = grid.shape[1] - 2
+    x = np.clip(p1_serve_probs, 0, 1) * (grid.shape[1] - 1)
+    y = np.clip(p2_serve_probs, 0, 1) * (grid.shape[2] - 1)
+    i = np.minimum(x.astype(int), last_cell)
+    j = np.minimum(y.astype(int), last_cell)
+    dx = x - i
+    dy = y - j
+    k = np.searchsorted(GRID_BEST_OF, best_of)
+    return (
+        grid[k, i, j] * (1 - dx) * (1 - dy)
+        + grid[k, i + 1, j] * dx * (1 - dy)
+        + grid[k, i, j + 1] * (1 - dx) * dy
+        + grid[k, i + 1, j + 1] * dx * dy
+    )
+
+
+if __name__ == "__main__":
+    save_probability_grid(build_probability_grid())
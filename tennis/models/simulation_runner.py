@@ -0,0 +1,234 @@
+"""
+Multi-core runner for the match simulator.
+
+The matches are split into shards of a fixed size, each shard is simulated with its own
+random stream spawned from one numpy.random.SeedSequence, and the shards are spread over a
+process pool. Inputs and outputs live in multiprocessing.shared_memory blocks, so workers
+read their slice of the inputs and write their results in place rather than pickling
+arrays back to the parent.
+
+Notes:
+    The shards and their seeds depend only on the number of matches, the shard size and
+    the seed, never on the number of workers or the order the shards finish in, so the
+    results are bit-identical for any n_workers (including 1, which runs in process).
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, fields
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from tennis.models.markov_model import TennisParameters
+from tennis.models.simulator import MAX_SETS, SimulatedMatches, simulate_matches
+
+DEFAULT_SHARD_SIZE = 2**18
+_RESULT_DTYPES = {
+    "p1_wins": np.bool_,
+    "set_scores": np.int8,
+    "p1_sets": np.int8,
+    "p2_sets": np.int8,
+    "total_games": np.int16,
+    "total_points": np.int32,
+}
+
+
+@dataclass(frozen=True)
+class _SharedArraySpec:
+    """
+    Dataclass to hold what a worker needs to attach to an array in shared memory.
+
+    Attributes:
+        - name (str): Name of the shared memory block.
+        - shape (tuple): Shape of the array.
+        - dtype (str): Data type of the array.
+    """
+
+    name: str
+    shape: tuple[int, ...]
+    dtype: str
+
+
+def _create_shared_array(
+    shape: tuple[int, ...], dtype: np.dtype, values: np.ndarray | None = None
+) -> tuple[SharedMemory, _SharedArraySpec]:
+    """Create an array in a new shared memory block, filled with values if given."""
+    dtype = np.dtype(dtype)
+    size = max(int(np.prod(shape)) * dtype.itemsize, 1)
+    shared_memory = SharedMemory(create=True, size=size)
+    spec = _SharedArraySpec(shared_memory.name, shape, dtype.str)
+    if values is not None:
+        _shared_array_view(shared_memory, spec)[...] = values
+    return shared_memory, spec
+
+
+def _shared_array_view(
+    shared_memory: SharedMemory, spec: _SharedArraySpec
+) -> np.ndarray:
+    """View of an array in a shared memory block, drop it before closing the block."""
+    return np.ndarray(spec.shape, dtype=spec.dtype, buffer=shared_memory.buf)
+
+
+def _close_shared_memory(shared_memory: SharedMemory) -> None:
+    """
+    Close a shared memory block, unless views of it are still alive.
+
+    Views can outlive the block when an exception is raised, e.g. in the frames of its
+    traceback. Closing would then raise a BufferError that hides the exception, so the
+    block is left to be closed when it is garbage collected instead.
+    """
+    try:
+        shared_memory.close()
+    except BufferError:
+        pass
+
+
+def _simulate_shard(
+    inputs: dict[str, _SharedArraySpec],
+    outputs: dict[str, _SharedArraySpec],
+    start: int,
+    stop: int,
+    seed_sequence: np.random.SeedSequence,
+) -> None:
+    """Simulate matches start to stop and write the results into shared memory."""
+    blocks = {
+        name: SharedMemory(name=spec.name) for name, spec in (inputs | outputs).items()
+    }
+    views = {
+        name: _shared_array_view(blocks[name], spec)
+        for name, spec in (inputs | outputs).items()
+    }
+    try:
+        results = simulate_matches(
+            *(
+                views[name][start:stop]
+                for name in ("p1_serve_probs", "p2_serve_probs", "best_of")
+            ),
+            seed_sequence,
+        )
+        for name in outputs:
+            views[name][..., start:stop] = getattr(results, name)
+    finally:
+        del views
+        for shared_memory in blocks.values():
+            _close_shared_memory(shared_memory)
+
+
+def run_simulations(
+    p1_serve_probs: np.ndarray,
+    p2_serve_probs: np.ndarray,
+    best_of: np.ndarray,
+    seed: int | np.random.SeedSequence,
+    n_workers: int | None = None,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+) -> SimulatedMatches:
+    """
+    Simulate a batch of matches over a pool of worker processes.
+
+    Parameters:
+        - p1_serve_probs (np.ndarray): Probabilities of player 1 winning a point on serve.
+        - p2_serve_probs (np.ndarray): Probabilities of player 2 winning a point on serve.
+        - best_of (np.ndarray): Maximum number of sets playable in each match (3 or 5).
+        - seed (int | np.random.SeedSequence): Root seed, one child stream is spawned
+          from it per shard.
+        - n_workers (int | None): Number of worker processes, defaults to the CPU count.
+          With 1 the shards are simulated in this process.
+        - shard_size (int): Number of matches per shard, this (not n_workers) decides
+          the random streams, so keep it fixed to reproduce a run.
+
+    Returns:
+        - SimulatedMatches: The results, one entry per match on the last axis.
+    """
+    if shard_size < 1:
+        msg = f"Shard size must be positive, not {shard_size}"
+        raise ValueError(msg)
+    p1_serve_probs, p2_serve_probs, best_of = np.broadcast_arrays(
+        np.atleast_1d(np.asarray(p1_serve_probs, dtype=float)),
+        np.atleast_1d(np.asarray(p2_serve_probs, dtype=float)),
+        np.atleast_1d(np.rint(best_of).astype(int)),
+    )
+    n_matches = p1_serve_probs.shape[0]
+    n_workers = n_workers or os.cpu_count() or 1
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    starts = range(0, n_matches, shard_size)
+    seed_sequences = seed.spawn(len(starts))
+
+    blocks = []
+    try:
+        input_specs = {}
+        for name, values in (
+            ("p1_serve_probs", p1_serve_probs),
+            ("p2_serve_probs", p2_serve_probs),
+            ("best_of", best_of),
+        ):
+            shared_memory, input_specs[name] = _create_shared_array(
+                values.shape, values.dtype, values
+            )
+            blocks.append(shared_memory)
+        output_specs = {}
+        for name, dtype in _RESULT_DTYPES.items():
+            shape = (MAX_SETS, 2, n_matches) if name == "set_scores" else (n_matches,)
+            shared_memory, output_specs[name] = _create_shared_array(shape, dtype)
+            blocks.append(shared_memory)
+
+        shards = [
+            (input_specs, output_specs, start, min(start + shard_size, n_matches), seq)
+            for start, seq in zip(starts, seed_sequences)
+        ]
+        if n_workers == 1 or len(shards) <= 1:
+            for shard in shards:
+                _simulate_shard(*shard)
+        else:
+            with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                futures = [executor.submit(_simulate_shard, *shard) for shard in shards]
+                for future in futures:
+                    future.result()
+
+        output_blocks = dict(zip(output_specs, blocks[-len(output_specs) :]))
+        results = SimulatedMatches(
+            **{
+                field.name: _shared_array_view(
+                    output_blocks[field.name], output_specs[field.name]
+                ).copy()
+                for field in fields(SimulatedMatches)
+            }
+        )
+    finally:
+        for shared_memory in blocks:
+            _close_shared_memory(shared_memory)
+            shared_memory.unlink()
+    return results
+
+
+def run_simulations_from_parameters(
+    params: TennisParameters,
+    best_of: int,
+    n_matches: int,
+    seed: int | np.random.SeedSequence,
+    n_workers: int | None = None,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+) -> SimulatedMatches:
+    """
+    Simulate n_matches matches between the same two players over a pool of workers.
+
+    Parameters:
+        - params (TennisParameters): The serve probabilities of both players.
+        - best_of (int): Maximum number of sets playable (3 or 5).
+        - n_matches (int): Number of matches to simulate.
+        - seed (int | np.random.SeedSequence): Root seed for the shard streams.
+        - n_workers (int | None): Number of worker processes.
+        - shard_size (int): Number of matches per shard.
+
+    Returns:
+        - SimulatedMatches: The results, one entry per match on the last axis.
+    """
+    return run_simulations(
+        np.full(n_matches, params.player_one_point_on_serve_prob),
+        np.full(n_matches, params.player_two_point_on_serve_prob),
+        np.full(n_matches, best_of),
+        seed,
+        n_workers,
+        shard_size,
+    )
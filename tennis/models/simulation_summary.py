@@ -0,0 +1,202 @@
+"""
+Streaming summaries of simulated matches.
+
+A SimulationSummary is updated one batch of SimulatedMatches at a time and only keeps
+fixed size histograms and running moments, so its memory does not grow with the number
+of matches simulated. summarise_simulations consumes a generator of batches, such as
+simulate_match_batches, and can stop as soon as the win rate is known precisely enough.
+
+Notes:
+    Moments are merged a batch at a time with the parallel form of Welford's algorithm
+    (Chan et al.), which stays accurate over 10^8+ matches where summing squares would
+    lose precision.
+"""
+
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from tennis.models.markov_model import MAX_GAMES_IN_SET
+from tennis.models.simulator import GAMES_TO_WIN_SET, MAX_SETS, SimulatedMatches
+
+MAX_SETS_WON = (MAX_SETS + 1) // 2
+MAX_GAMES_WON_IN_SET = GAMES_TO_WIN_SET + 1
+MAX_TOTAL_GAMES = MAX_GAMES_IN_SET * MAX_SETS
+# Matches with more points are counted in the last bin of the points histogram.
+MAX_TOTAL_POINTS = 600
+DEFAULT_MIN_MATCHES = 10_000
+NORMAL_95_QUANTILE = 1.959963984540054
+
+
+@dataclass
+class RunningMoments:
+    """
+    Dataclass to hold the count, mean and sum of squared deviations from the mean of a
+    stream of values.
+    """
+
+    count: int = 0
+    mean: float = 0.0
+    sum_squared_deviations: float = 0.0
+
+    def update(self, values: np.ndarray) -> None:
+        """Merge a batch of values into the running moments."""
+        values = np.asarray(values, dtype=float)
+        if values.size == 0:
+            return
+        batch_mean = values.mean()
+        batch_sum_squared_deviations = ((values - batch_mean) ** 2).sum()
+        total = self.count + values.size
+        delta = batch_mean - self.mean
+        self.mean += delta * values.size / total
+        self.sum_squared_deviations += (
+            batch_sum_squared_deviations + delta**2 * self.count * values.size / total
+        )
+        self.count = total
+
+    @property
+    def variance(self) -> float:
+        """Sample variance of the values."""
+        if self.count < 2:
+            return float("nan")
+        return self.sum_squared_deviations / (self.count - 1)
+
+    @property
+    def standard_error(self) -> float:
+        """Standard error of the mean."""
+        return float(np.sqrt(self.variance / self.count))
+
+
+@dataclass
+class SimulationSummary:
+    """
+    Dataclass to hold constant memory summaries of simulated matches.
+
+    Attributes:
+        - matches (int): Number of matches summarised.
+        - p1_wins (int): Number of matches won by player 1.
+        - match_score_counts (np.ndarray): Counts of final scores in sets, indexed by
+          [player 1 sets, player 2 sets].
+        - set_score_counts (np.ndarray): Counts of set scores in games, indexed by
+          [player 1 games, player 2 games].
+        - total_games_counts (np.ndarray): Histogram of games played in a match.
+        - total_points_counts (np.ndarray): Histogram of points played in a match, the
+          last bin counts MAX_TOTAL_POINTS points or more.
+        - total_games_moments (RunningMoments): Moments of games played in a match.
+        - total_points_moments (RunningMoments): Moments of points played in a match.
+    """
+
+    matches: int = 0
+    p1_wins: int = 0
+    match_score_counts: np.ndarray = field(
+        default_factory=lambda: np.zeros((MAX_SETS_WON + 1,) * 2, dtype=np.int64)
+    )
+    set_score_counts: np.ndarray = field(
+        default_factory=lambda: np.zeros(
+            (MAX_GAMES_WON_IN_SET + 1,) * 2, dtype=np.int64
+        )
+    )
+    total_games_counts: np.ndarray = field(
+        default_factory=lambda: np.zeros(MAX_TOTAL_GAMES + 1, dtype=np.int64)
+    )
+    total_points_counts: np.ndarray = field(
+        default_factory=lambda: np.zeros(MAX_TOTAL_POINTS + 1, dtype=np.int64)
+    )
+    total_games_moments: RunningMoments = field(default_factory=RunningMoments)
+    total_points_moments: RunningMoments = field(default_factory=RunningMoments)
+
+    def update(self, batch: SimulatedMatches) -> None:
+        """Add a batch of simulated matches to the summary."""
+        self.matches += batch.p1_wins.size
+        self.p1_wins += int(batch.p1_wins.sum())
+
+        self.match_score_counts += np.bincount(
+            batch.p1_sets.astype(np.intp) * (MAX_SETS_WON + 1) + batch.p2_sets,
+            minlength=self.match_score_counts.size,
+        ).reshape(self.match_score_counts.shape)
+        played = batch.set_scores[:, 0] >= 0
+        set_size = self.set_score_counts.shape[1]
+        self.set_score_counts += np.bincount(
+            batch.set_scores[:, 0][played].astype(np.intp) * set_size
+            + batch.set_scores[:, 1][played],
+            minlength=self.set_score_counts.size,
+        ).reshape(self.set_score_counts.shape)
+        self.total_games_counts += np.bincount(
+            batch.total_games, minlength=self.total_games_counts.size
+        )
+        self.total_points_counts += np.bincount(
+            np.minimum(batch.total_points, MAX_TOTAL_POINTS),
+            minlength=self.total_points_counts.size,
+        )
+        self.total_games_moments.update(batch.total_games)
+        self.total_points_moments.update(batch.total_points)
+
+    @property
+    def p1_win_rate(self) -> float:
+        """Fraction of matches won by player 1."""
+        return self.p1_wins / self.matches if self.matches else float("nan")
+
+    @property
+    def p1_win_rate_standard_error(self) -> float:
+        """Standard error of the player 1 win rate."""
+        if not self.matches:
+            return float("nan")
+        return float(np.sqrt(self.p1_win_rate * (1 - self.p1_win_rate) / self.matches))
+
+    def p1_win_rate_confidence_interval(
+        self, z: float = NORMAL_95_QUANTILE
+    ) -> tuple[float, float]:
+        """
+        Get a normal approximation confidence interval for the player 1 win rate.
+
+        Parameters:
+            - z (float): Normal quantile of the interval, 95% by default.
+
+        Returns:
+            - tuple[float, float]: Lower and upper ends of the interval.
+        """
+        half_width = z * self.p1_win_rate_standard_error
+        return self.p1_win_rate - half_width, self.p1_win_rate + half_width
+
+
+def summarise_simulations(
+    batches: Iterable[SimulatedMatches],
+    target_standard_error: float | None = None,
+    max_matches: int | None = None,
+    min_matches: int = DEFAULT_MIN_MATCHES,
+) -> SimulationSummary:
+    """
+    Summarise batches of simulated matches, stopping early once the win rate is precise.
+
+    Parameters:
+        - batches (Iterable[SimulatedMatches]): Batches to consume, e.g. from
+          simulate_match_batches. Consumption stops at the first stopping rule met.
+        - target_standard_error (float | None): Stop once the standard error of the
+          player 1 win rate is at or below this.
+        - max_matches (int | None): Stop once at least this many matches are summarised.
+        - min_matches (int): Matches needed before target_standard_error is checked, so a
+          lopsided first batch cannot stop the run.
+
+    Returns:
+        - SimulationSummary: The summary of the batches consumed.
+    """
+    if target_standard_error is None and max_matches is None:
+        try:
+            len(batches)
+        except TypeError:
+            msg = "Batches without a length need target_standard_error or max_matches"
+            raise ValueError(msg) from None
+
+    summary = SimulationSummary()
+    for batch in batches:
+        summary.update(batch)
+        if max_matches is not None and summary.matches >= max_matches:
+            break
+        if (
+            target_standard_error is not None
+            and summary.matches >= min_matches
+            and summary.p1_win_rate_standard_error <= target_standard_error
+        ):
+            break
+    return summary
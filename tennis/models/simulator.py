@@ -1 +1,381 @@
-"""Methods for simulating tennis matches."""
+"""
+Methods for simulating tennis matches.
+
+Matches are simulated in batches with NumPy, a set at a time: every game of the set (up
+to 6-6) is drawn for all unfinished matches at once, the game the set was decided in is
+found from the running score, and the tiebreak is played for the matches that reach 6-6.
+Python only loops over sets and the games of a set, never over matches or points.
+
+Notes:
+    Games are simulated point by point in distribution: the score a game is decided at
+    (4-0, 4-1, 4-2 or deuce) is drawn from its exact probability given the server's point
+    probability, and from deuce the number of pairs of points played is geometric with
+    the winner independent of it. Tiebreak points up to 6-6 are drawn individually.
+    Scoring follows the markov model: player 1 serves first, standard games and a 7 point
+    tiebreak at 6-6 in every set, the server alternating every game through the match.
+"""
+
+from collections.abc import Generator
+from dataclasses import dataclass
+
+import numpy as np
+
+from tennis.models.markov_model import TIEBREAK_POINTS, TennisParameters
+
+GAMES_BEFORE_TIEBREAK = 12
+GAMES_TO_WIN_SET = 6
+MAX_SETS = 5
+# Points played for each way a service game can finish: the server wins 4-0, 4-1, 4-2,
+# the receiver wins 4-0, 4-1, 4-2, then deuce, where the pairs of points played are added.
+_GAME_LENGTHS = np.array([4, 5, 6, 4, 5, 6, 6], dtype=np.int16)
+_DEUCE = 6
+# Game outcomes are drawn as 31 bit integers, so probabilities are resolved to 2**-31.
+_DRAW_RANGE = 2**31
+_MATCHES_PER_CHUNK = 65536
+
+
+@dataclass
+class SimulatedMatches:
+    """
+    Dataclass to hold the results of a batch of simulated matches, the last axis of each
+    array indexes the match.
+
+    Attributes:
+        - p1_wins (np.ndarray): Whether player 1 won the match.
+        - set_scores (np.ndarray): Games won in each set, shape (MAX_SETS, 2, n) indexed by
+          [set, player], -1 for sets not played. A tiebreak counts as a game (7-6).
+        - p1_sets (np.ndarray): Sets won by player 1.
+        - p2_sets (np.ndarray): Sets won by player 2.
+        - total_games (np.ndarray): Games played in the match.
+        - total_points (np.ndarray): Points played in the match.
+    """
+
+    p1_wins: np.ndarray
+    set_scores: np.ndarray
+    p1_sets: np.ndarray
+    p2_sets: np.ndarray
+    total_games: np.ndarray
+    total_points: np.ndarray
+
+
+def _game_thresholds(serve_probs: np.ndarray) -> np.ndarray:
+    """
+    Cumulative probabilities of the ways a service game can finish before deuce, in the
+    order of _GAME_LENGTHS and scaled to _DRAW_RANGE, shape (6, ...). The remaining
+    probability is deuce.
+    """
+    p = serve_probs
+    q = 1 - p
+    cumulative_probs = np.cumsum(
+        [p**4, 4 * p**4 * q, 10 * p**4 * q**2, q**4, 4 * q**4 * p, 10 * q**4 * p**2],
+        axis=0,
+    )
+    return np.rint(np.minimum(cumulative_probs, 1) * _DRAW_RANGE).astype(np.uint32)
+
+
+def _random_draws(rng: np.random.Generator, shape: tuple[int, ...]) -> np.ndarray:
+    """Integers uniform on [0, _DRAW_RANGE), taken from the raw bits of the generator."""
+    size = int(np.prod(shape))
+    raw = rng.bit_generator.random_raw((size + 1) // 2).view(np.uint32)
+    return (raw[:size] >> 1).reshape(shape)
+
+
+def _geometric(rng: np.random.Generator, continue_probs: np.ndarray) -> np.ndarray:
+    """
+    Draw the number of trials up to and including the first that stops, when each trial
+    continues with continue_probs, by inverting the distribution function.
+    """
+    with np.errstate(divide="ignore"):
+        trials = np.log1p(-rng.random(continue_probs.shape)) / np.log(continue_probs)
+    return 1 + np.floor(trials).astype(np.int16)
+
+
+def _simulate_games(
+    rng: np.random.Generator,
+    thresholds: np.ndarray,
+    serve_probs: np.ndarray,
+    n_rows: int,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Simulate rows of service games.
+
+    Parameters:
+        - rng (np.random.Generator): Random number generator.
+        - thresholds (np.ndarray): _game_thresholds of the server of each game in a row.
+        - serve_probs (np.ndarray): Server's point probability for each game in a row.
+        - n_rows (int): Number of rows of games to simulate.
+
+    Returns:
+        - tuple[np.ndarray, np.ndarray]: Whether the server won each game, and the points
+          played in each game, shape (n_rows,) + serve_probs.shape.
+    """
+    draws = _random_draws(rng, (n_rows,) + serve_probs.shape)
+    outcome = (draws >= thresholds[0]).view(np.int8)
+    for threshold in thresholds[1:]:
+        outcome += (draws >= threshold).view(np.int8)
+    server_won = outcome < 3
+    lengths = np.take(_GAME_LENGTHS, outcome)
+
+    # From deuce, the number of pairs of points played and who wins are independent.
+    deuce = np.flatnonzero(outcome == _DEUCE)
+    p = serve_probs.reshape(-1)[deuce % serve_probs.size]
+    p1_wins_both = p**2
+    split = 2 * p * (1 - p)
+    server_won.reshape(-1)[deuce] = rng.random(p.shape) * (1 - split) < p1_wins_both
+    lengths.reshape(-1)[deuce] = 6 + 2 * _geometric(rng, split)
+    return server_won, lengths
+
+
+def _simulate_tiebreaks(
+    rng: np.random.Generator,
+    p1_serve_probs: np.ndarray,
+    p2_serve_probs: np.ndarray,
+    p1_serves_first: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Simulate 7 point tiebreaks.
+
+    Returns:
+        - tuple[np.ndarray, np.ndarray]: Whether player 1 won each tiebreak and the points
+          played in it.
+    """
+    last = TIEBREAK_POINTS - 1
+    points_before_tie = 2 * last
+    point_index = np.arange(points_before_tie)[:, np.newaxis]
+    # The first server serves one point, then serve alternates every two points.
+    first_server_serving = ((point_index + 1) // 2) % 2 == 0
+    p1_serving = first_server_serving == p1_serves_first
+    p1_point_probs = np.where(p1_serving, p1_serve_probs, 1 - p2_serve_probs)
+    p1_points = np.cumsum(rng.random(p1_serving.shape) < p1_point_probs, axis=0)
+    p2_points = point_index + 1 - p1_points
+
+    finished = (np.maximum(p1_points, p2_points) >= TIEBREAK_POINTS) & (
+        np.abs(p1_points - p2_points) >= 2
+    )
+    decided_early = finished.any(axis=0)
+    last_point = np.argmax(finished, axis=0)
+    columns = np.arange(p1_serving.shape[1])
+    p1_won = p1_points[last_point, columns] > p2_points[last_point, columns]
+    lengths = last_point + 1
+
+    # From 6-6 each pair of points has one served by each player.
+    tied = np.nonzero(~decided_early)
+    p1_wins_both = p1_serve_probs[tied] * (1 - p2_serve_probs[tied])
+    decided = p1_wins_both + (1 - p1_serve_probs[tied]) * p2_serve_probs[tied]
+    p1_won[tied] = rng.random(decided.shape) * decided < p1_wins_both
+    lengths[tied] = points_before_tie + 2 * _geometric(rng, 1 - decided)
+    return p1_won, lengths
+
+
+def _simulate_sets(
+    rng: np.random.Generator,
+    p1_serve_probs: np.ndarray,
+    p2_serve_probs: np.ndarray,
+    p1_thresholds: np.ndarray,
+    p2_thresholds: np.ndarray,
+    p1_serves_first: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Simulate sets with a tiebreak at 6-6.
+
+    Returns:
+        - tuple[np.ndarray, np.ndarray, np.ndarray]: Games won by player 1, games won by
+          player 2 and points played in each set.
+    """
+    # Games are drawn as (first server's game, second server's game) pairs.
+    n_sets = p1_serve_probs.shape[0]
+    p1_serving = np.stack([p1_serves_first, ~p1_serves_first])
+    server_won, lengths = _simulate_games(
+        rng,
+        np.where(
+            p1_serving, p1_thresholds[:, np.newaxis], p2_thresholds[:, np.newaxis]
+        ),
+        np.where(p1_serving, p1_serve_probs, p2_serve_probs),
+        GAMES_BEFORE_TIEBREAK // 2,
+    )
+    p1_won = (server_won == p1_serving).reshape(GAMES_BEFORE_TIEBREAK, n_sets)
+    lengths = lengths.reshape(GAMES_BEFORE_TIEBREAK, n_sets)
+
+    # After game g (from 0) the set is over once the lead is at least 2 and at least
+    # 11 - g, i.e. the leader has 6 or more games.
+    set_games = np.zeros(n_sets, dtype=np.int8)
+    set_p1_games = np.zeros(n_sets, dtype=np.int8)
+    set_points = np.zeros(n_sets, dtype=np.int32)
+    ongoing = np.ones(n_sets, dtype=bool)
+    for game in range(GAMES_BEFORE_TIEBREAK):
+        set_games += ongoing
+        set_p1_games += (p1_won[game] & ongoing).view(np.int8)
+        set_points += lengths[game] * ongoing
+        winning_lead = max(2, 2 * GAMES_TO_WIN_SET - 1 - game)
+        ongoing &= np.abs(2 * set_p1_games - set_games) < winning_lead
+    set_p2_games = set_games - set_p1_games
+
+    # The first server of the set also serves first in the tiebreak.
+    tiebreak = np.nonzero(ongoing)
+    p1_won_tiebreak, tiebreak_points = _simulate_tiebreaks(
+        rng,
+        p1_serve_probs[tiebreak],
+        p2_serve_probs[tiebreak],
+        p1_serves_first[tiebreak],
+    )
+    set_p1_games[tiebreak] += p1_won_tiebreak
+    set_p2_games[tiebreak] += ~p1_won_tiebreak
+    set_points[tiebreak] += tiebreak_points
+    return set_p1_games, set_p2_games, set_points
+
+
+def _simulate_chunk(
+    rng: np.random.Generator,
+    p1_serve_probs: np.ndarray,
+    p2_serve_probs: np.ndarray,
+    sets_to_win: np.ndarray,
+) -> SimulatedMatches:
+    """Simulate a chunk of matches, one set of every unfinished match at a time."""
+    n_matches = p1_serve_probs.shape[0]
+    set_scores = np.full((MAX_SETS, 2, n_matches), -1, dtype=np.int8)
+    p1_sets = np.zeros(n_matches, dtype=np.int8)
+    p2_sets = np.zeros(n_matches, dtype=np.int8)
+    total_games = np.zeros(n_matches, dtype=np.int16)
+    total_points = np.zeros(n_matches, dtype=np.int32)
+    p1_serves_first = np.ones(n_matches, dtype=bool)
+    p1_thresholds = _game_thresholds(p1_serve_probs)
+    p2_thresholds = _game_thresholds(p2_serve_probs)
+
+    active = np.arange(n_matches)
+    for set_number in range(MAX_SETS):
+        if active.size == 0:
+            break
+        set_p1_games, set_p2_games, set_points = _simulate_sets(
+            rng,
+            p1_serve_probs[active],
+            p2_serve_probs[active],
+            p1_thresholds[:, active],
+            p2_thresholds[:, active],
+            p1_serves_first[active],
+        )
+        set_scores[set_number, 0, active] = set_p1_games
+        set_scores[set_number, 1, active] = set_p2_games
+        p1_sets[active] += set_p1_games > set_p2_games
+        p2_sets[active] += set_p2_games > set_p1_games
+        set_games = set_p1_games + set_p2_games
+        total_games[active] += set_games
+        total_points[active] += set_points
+        # The server alternates every game, including across sets.
+        p1_serves_first[active] ^= set_games % 2 == 1
+        unfinished = np.maximum(p1_sets[active], p2_sets[active]) < sets_to_win[active]
+        active = active[unfinished]
+
+    return SimulatedMatches(
+        p1_wins=p1_sets > p2_sets,
+        set_scores=set_scores,
+        p1_sets=p1_sets,
+        p2_sets=p2_sets,
+        total_games=total_games,
+        total_points=total_points,
+    )
+
+
+def simulate_matches(
+    p1_serve_probs: np.ndarray,
+    p2_serve_probs: np.ndarray,
+    best_of: np.ndarray,
+    seed: int | np.random.SeedSequence | np.random.Generator | None = None,
+) -> SimulatedMatches:
+    """
+    Simulate a batch of matches point by point.
+
+    Parameters:
+        - p1_serve_probs (np.ndarray): Probabilities of player 1 winning a point on serve.
+        - p2_serve_probs (np.ndarray): Probabilities of player 2 winning a point on serve.
+        - best_of (np.ndarray): Maximum number of sets playable in each match (3 or 5).
+        - seed (int | np.random.SeedSequence | np.random.Generator | None): Seed or
+          generator for the random numbers, the same seed gives the same matches.
+
+    Returns:
+        - SimulatedMatches: The results, one entry per match on the last axis.
+    """
+    p1_serve_probs, p2_serve_probs, best_of = np.broadcast_arrays(
+        np.atleast_1d(np.asarray(p1_serve_probs, dtype=float)),
+        np.atleast_1d(np.asarray(p2_serve_probs, dtype=float)),
+        np.atleast_1d(np.rint(best_of).astype(int)),
+    )
+    if p1_serve_probs.ndim != 1:
+        msg = f"Serve probabilities must be one dimensional, not {p1_serve_probs.ndim}"
+        raise ValueError(msg)
+    certain_tiebreak_points = (p1_serve_probs == p2_serve_probs) & (
+        (p1_serve_probs == 0) | (p1_serve_probs == 1)
+    )
+    if np.any(certain_tiebreak_points):
+        msg = "Tiebreaks never finish when both serve probabilities are 0 or both are 1"
+        raise ValueError(msg)
+
+    rng = np.random.default_rng(seed)
+    sets_to_win = (best_of + 1) // 2
+    chunks = [
+        _simulate_chunk(
+            rng,
+            p1_serve_probs[start : start + _MATCHES_PER_CHUNK],
+            p2_serve_probs[start : start + _MATCHES_PER_CHUNK],
+            sets_to_win[start : start + _MATCHES_PER_CHUNK],
+        )
+        for start in range(0, p1_serve_probs.shape[0], _MATCHES_PER_CHUNK)
+    ]
+    return SimulatedMatches(
+        p1_wins=np.concatenate([chunk.p1_wins for chunk in chunks]),
+        set_scores=np.concatenate([chunk.set_scores for chunk in chunks], axis=-1),
+        p1_sets=np.concatenate([chunk.p1_sets for chunk in chunks]),
+        p2_sets=np.concatenate([chunk.p2_sets for chunk in chunks]),
+        total_games=np.concatenate([chunk.total_games for chunk in chunks]),
+        total_points=np.concatenate([chunk.total_points for chunk in chunks]),
+    )
+
+
+def simulate_matches_from_parameters(
+    params: TennisParameters,
+    best_of: int,
+    n_matches: int,
+    seed: int | np.random.SeedSequence | np.random.Generator | None = None,
+) -> SimulatedMatches:
+    """
+    Simulate n_matches matches between the same two players.
+
+    Parameters:
+        - params (TennisParameters): The serve probabilities of both players.
+        - best_of (int): Maximum number of sets playable (3 or 5).
+        - n_matches (int): Number of matches to simulate.
+        - seed (int | np.random.SeedSequence | np.random.Generator | None): Seed or
+          generator for the random numbers.
+
+    Returns:
+        - SimulatedMatches: The results, one entry per match on the last axis.
+    """
+    return simulate_matches(
+        np.full(n_matches, params.player_one_point_on_serve_prob),
+        np.full(n_matches, params.player_two_point_on_serve_prob),
+        np.full(n_matches, best_of),
+        seed,
+    )
+
+
+def simulate_match_batches(
+    params: TennisParameters,
+    best_of: int,
+    batch_size: int,
+    seed: int | np.random.SeedSequence | np.random.Generator | None = None,
+) -> Generator[SimulatedMatches, None, None]:
+    """
+    Generate batches of simulated matches between the same two players, without end.
+
+    Parameters:
+        - params (TennisParameters): The serve probabilities of both players.
+        - best_of (int): Maximum number of sets playable (3 or 5).
+        - batch_size (int): Number of matches in each batch.
+        - seed (int | np.random.SeedSequence | np.random.Generator | None): Seed or
+          generator for the random numbers, shared by every batch.
+
+    Yields:
+        - SimulatedMatches: The next batch of results.
+    """
+    rng = np.random.default_rng(seed)
+    while True:
+        yield simulate_matches_from_parameters(params, best_of, batch_size, rng)
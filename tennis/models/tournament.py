@@ -0,0 +1,184 @@
+"""
+Tournament draw pricing for the markov model.
+
+The probability of every player beating every other player is computed once with the
+markov model into a pairwise matrix, then the probability of each player reaching each
+round is propagated exactly through the bracket, one round at a time. A 128 player draw
+needs one batched markov call over the 128 * 127 / 2 pairs and seven small matrix
+products, rather than a markov evaluation per simulated match.
+
+Notes:
+    The draw is given in bracket order: positions 2k and 2k + 1 meet in the first round,
+    the winners of positions 0-3 in the second round and so on. Byes are given as None
+    and always lose.
+"""
+
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+import numpy as np
+
+from tennis.data_processing.pydantic_models.match_info import TournamentRound
+from tennis.models.markov_model import get_player_1_match_winning_probability_batch
+
+KNOCKOUT_ROUNDS = (
+    TournamentRound.R128,
+    TournamentRound.R64,
+    TournamentRound.R32,
+    TournamentRound.R16,
+    TournamentRound.QF,
+    TournamentRound.SF,
+    TournamentRound.F,
+)
+
+
+@dataclass
+class TournamentProbabilities:
+    """
+    Dataclass to hold the probabilities of each player in a draw reaching each round.
+
+    Attributes:
+        - player_ids (list): Player ids in draw order, None for byes.
+        - rounds (list[TournamentRound]): Rounds of the draw, from the first to the final.
+        - reach_probabilities (np.ndarray): Probability of each player playing in each
+          round, shape (draw size, number of rounds).
+        - win_probabilities (np.ndarray): Probability of each player winning the draw.
+    """
+
+    player_ids: list[int | None]
+    rounds: list[TournamentRound]
+    reach_probabilities: np.ndarray
+    win_probabilities: np.ndarray
+
+
+def get_draw_rounds(draw_size: int) -> list[TournamentRound]:
+    """
+    Get the rounds of a knockout draw.
+
+    Parameters:
+        - draw_size (int): Number of positions in the draw, a power of 2 up to 128.
+
+    Returns:
+        - list[TournamentRound]: The rounds, from the first to the final.
+    """
+    n_rounds = draw_size.bit_length() - 1
+    if draw_size < 2 or draw_size != 2**n_rounds or n_rounds > len(KNOCKOUT_ROUNDS):
+        msg = f"Draw size must be a power of 2 from 2 to 128, not {draw_size}"
+        raise ValueError(msg)
+    return list(KNOCKOUT_ROUNDS[-n_rounds:])
+
+
+def build_pairwise_probability_matrix(
+    serve_probs: np.ndarray, best_of: int
+) -> np.ndarray:
+    """
+    Get the probability of each player beating each other player.
+
+    Parameters:
+        - serve_probs (np.ndarray): Probability of each player winning a point on serve.
+        - best_of (int): Maximum number of sets playable (3 or 5).
+
+    Returns:
+        - np.ndarray: Matrix whose [i, j] entry is the probability of player i beating
+          player j, the diagonal is 0.5.
+
+    Notes:
+        - Who serves first does not change the match winning probability, so only the
+          pairs i < j are evaluated and the rest is filled from [j, i] = 1 - [i, j].
+    """
+    serve_probs = np.asarray(serve_probs, dtype=float)
+    rows, columns = np.triu_indices(serve_probs.shape[0], k=1)
+    upper = get_player_1_match_winning_probability_batch(
+        serve_probs[rows], serve_probs[columns], np.full(rows.shape, best_of)
+    )
+    matrix = np.full((serve_probs.shape[0],) * 2, 0.5)
+    matrix[rows, columns] = upper
+    matrix[columns, rows] = 1 - upper
+    return matrix
+
+
+def get_tournament_probabilities_from_matrix(
+    player_ids: Sequence[int | None], pairwise_probabilities: np.ndarray
+) -> TournamentProbabilities:
+    """
+    Propagate the probability of reaching each round through a draw.
+
+    Parameters:
+        - player_ids (Sequence[int | None]): Player ids in draw order, None for byes.
+        - pairwise_probabilities (np.ndarray): Probability of the player at each draw
+          position beating the player at each other position.
+
+    Returns:
+        - TournamentProbabilities: Reach and win probabilities for each draw position.
+    """
+    player_ids = list(player_ids)
+    draw_size = len(player_ids)
+    rounds = get_draw_rounds(draw_size)
+    if pairwise_probabilities.shape != (draw_size, draw_size):
+        msg = (
+            f"Pairwise probabilities must have shape {(draw_size, draw_size)}, "
+            f"not {pairwise_probabilities.shape}"
+        )
+        raise ValueError(msg)
+
+    reach_probabilities = np.zeros((draw_size, len(rounds)))
+    reach = np.array([player_id is not None for player_id in player_ids], dtype=float)
+    for round_index in range(len(rounds)):
+        reach_probabilities[:, round_index] = reach
+        # Each block of the draw produces one winner of this round, from a match between
+        # the winners of its two halves.
+        half = 2**round_index
+        blocks = draw_size // (2 * half)
+        block_reach = reach.reshape(blocks, 2, half)
+        block_probabilities = pairwise_probabilities.reshape(
+            blocks, 2, half, blocks, 2, half
+        )[np.arange(blocks), :, :, np.arange(blocks)]
+        # Indexed by [block, side, player, other side, opponent].
+        beats_opponent = np.stack(
+            [
+                np.einsum(
+                    "kij,kj->ki", block_probabilities[:, 0, :, 1], block_reach[:, 1]
+                ),
+                np.einsum(
+                    "kij,kj->ki", block_probabilities[:, 1, :, 0], block_reach[:, 0]
+                ),
+            ],
+            axis=1,
+        )
+        # A player whose side of the block is all byes walks over.
+        opponent_present = block_reach[:, ::-1].sum(axis=2, keepdims=True)
+        beats_opponent = np.where(opponent_present > 0, beats_opponent, 1.0)
+        reach = (block_reach * beats_opponent).reshape(draw_size)
+
+    return TournamentProbabilities(
+        player_ids=player_ids,
+        rounds=rounds,
+        reach_probabilities=reach_probabilities,
+        win_probabilities=reach,
+    )
+
+
+def get_tournament_probabilities(
+    player_ids: Sequence[int | None], serve_probs: np.ndarray, best_of: int
+) -> TournamentProbabilities:
+    """
+    Get the probability of each player in a draw reaching each round and winning it.
+
+    Parameters:
+        - player_ids (Sequence[int | None]): Player ids in draw order, None for byes.
+        - serve_probs (np.ndarray): Probability of the player at each draw position
+          winning a point on serve, ignored for byes.
+        - best_of (int): Maximum number of sets playable (3 or 5).
+
+    Returns:
+        - TournamentProbabilities: Reach and win probabilities for each draw position.
+    """
+    serve_probs = np.asarray(serve_probs, dtype=float)
+    if serve_probs.shape != (len(player_ids),):
+        msg = f"Expected {len(player_ids)} serve probabilities, not {serve_probs.shape}"
+        raise ValueError(msg)
+    byes = np.array([player_id is None for player_id in player_ids])
+    pairwise_probabilities = build_pairwise_probability_matrix(
+        np.where(byes, 0.5, serve_probs), best_of
+    )
+    return get_tournament_probabilities_from_matrix(player_ids, pairwise_probabilities)
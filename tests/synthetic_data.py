@@ -0,0 +1,51 @@
+"""Synthetic data shared by the tests."""
+
+import numpy as np
+import pandas as pd
+
+from tennis.data_processing.historical_features.historic_featureset import (
+    HISTORIC_FEATURES,
+)
+
+NUM_PLAYERS = 1400
+MATCHES_PER_TOURNAMENT = 31
+SURFACES = ("Hard", "Clay", "Grass")
+
+
+def make_synthetic_final_data(num_matches: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Make a DataFrame with the columns calculate_historic_features reads.
+
+    Parameters:
+        - num_matches (int): Number of matches, each gives a row for both players.
+        - seed (int): Seed for the random values.
+
+    Returns:
+        - pd.DataFrame: One row per player per match, matches grouped in weekly
+          tournaments of MATCHES_PER_TOURNAMENT matches cycling through SURFACES, with
+          about 1% of the features missing.
+    """
+    rng = np.random.default_rng(seed)
+    match_ids = np.arange(num_matches)
+    players = rng.integers(NUM_PLAYERS, size=num_matches, dtype=np.int32)
+    opponents = (players + rng.integers(1, NUM_PLAYERS, size=num_matches)) % NUM_PLAYERS
+    tourney_dates = pd.Timestamp("2000-01-03") + pd.to_timedelta(
+        7 * (match_ids // MATCHES_PER_TOURNAMENT), unit="D"
+    )
+    df = pd.DataFrame(
+        {
+            "match_id": np.r_[match_ids, match_ids],
+            "tourney_date": np.r_[tourney_dates, tourney_dates],
+            "match_num": np.r_[match_ids, match_ids] % MATCHES_PER_TOURNAMENT + 1,
+            "player_id": np.r_[players, opponents],
+            "opponent_id": np.r_[opponents, players],
+        }
+    )
+    tournaments = df["match_id"] // MATCHES_PER_TOURNAMENT
+    df["surface"] = np.array(SURFACES)[tournaments % len(SURFACES)]
+    for side in ("player", "opponent"):
+        for feature in HISTORIC_FEATURES:
+            values = rng.random(2 * num_matches)
+            values[rng.random(2 * num_matches) < 0.01] = np.nan
+            df[f"{side}_{feature}"] = values
+    return df
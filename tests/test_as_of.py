@@ -0,0 +1,48 @@
+import numpy as np
+
+from tennis.data_processing.historical_features.as_of import build_player_history
+from tennis.data_processing.historical_features.historic_featureset import (
+    HISTORIC_FEATURES,
+    calculate_form_features,
+    calculate_historic_features,
+)
+from tests.synthetic_data import make_synthetic_final_data
+
+
+def test_features_as_of_batch_matches_the_pipeline_features():
+    df = make_synthetic_final_data(1000)
+    df = df.sort_values(by=["tourney_date", "match_num"], ignore_index=True)
+    historic_features_df = calculate_historic_features(df)
+    form_features_df = calculate_form_features(df)
+
+    result = build_player_history(df).features_as_of_batch(
+        df["player_id"], df["tourney_date"]
+    )
+
+    np.testing.assert_array_equal(
+        result["games_played"], historic_features_df["games_played_by_player"]
+    )
+    for feature in HISTORIC_FEATURES:
+        np.testing.assert_array_equal(
+            result[f"historic_{feature}"],
+            historic_features_df[f"historic_player_{feature}"],
+        )
+        np.testing.assert_array_equal(
+            result[f"ewm_{feature}"], form_features_df[f"ewm_player_{feature}"]
+        )
+
+
+def test_features_as_of_matches_the_batch():
+    df = make_synthetic_final_data(300)
+    history = build_player_history(df)
+    player_ids = [0, 3, 3, 10_000, -1]
+    dates = ["2000-01-03", "2000-02-01", "2030-01-01", "2000-02-01", "2000-02-01"]
+
+    batch = history.features_as_of_batch(player_ids, dates)
+
+    for row, (player_id, date) in enumerate(zip(player_ids, dates)):
+        np.testing.assert_array_equal(
+            history.features_as_of(player_id, date), batch.iloc[row]
+        )
+    # Unknown players and dates before any match have no history.
+    assert (batch.iloc[[0, 3, 4]] == 0).all().all()
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from tennis.models.cache import QuantizedLRUCache, quantize
+from tennis.models.markov_model import (
+    TennisParameters,
+    get_player_1_match_winning_probability,
+)
+
+
+def test_quantize_rounds_floats_and_tennis_parameters():
+    assert quantize(0.612345, 4) == 0.6123
+    assert quantize(np.float32(0.612345), 4) == 0.6123
+    assert quantize(TennisParameters(np.float32(0.612345), 0.55556), 4) == (
+        TennisParameters(0.6123, 0.5556)
+    )
+    assert quantize(5, 4) == 5
+    assert quantize("absorbing", 4) == "absorbing"
+
+
+def test_cache_hits_on_probabilities_equal_up_to_the_decimals():
+    cached = QuantizedLRUCache(get_player_1_match_winning_probability)
+
+    first = cached(TennisParameters(0.65001, 0.62), 3)
+    second = cached(TennisParameters(np.float32(0.65), np.float64(0.62)), 3)
+
+    assert second == first
+    assert first == get_player_1_match_winning_probability(
+        TennisParameters(0.65, 0.62), 3
+    )
+    info = cached.cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+
+
+def test_cache_key_ignores_how_the_arguments_are_passed():
+    cached = QuantizedLRUCache(get_player_1_match_winning_probability)
+    params = TennisParameters(0.65, 0.62)
+
+    cached(params, 5)
+    cached(params, max_sets_playable=5)
+    cached(params=params, max_sets_playable=5)
+    cached(params, 5, "matrix_power")
+
+    info = cached.cache_info()
+    assert (info.hits, info.misses, info.currsize) == (3, 1, 1)
+
+
+def test_cache_evicts_the_least_recently_used_result():
+    cached = QuantizedLRUCache(lambda x: 2 * x, maxsize=2)
+
+    cached(0.1)
+    cached(0.2)
+    cached(0.1)
+    cached(0.3)
+    cached(0.1)
+    cached(0.2)
+
+    info = cached.cache_info()
+    assert (info.hits, info.misses, info.evictions) == (2, 4, 2)
+
+
+def test_cache_results_are_read_only():
+    cached = QuantizedLRUCache(lambda x: np.full(2, x))
+
+    with pytest.raises(ValueError, match="read-only"):
+        cached(0.5)[0] = 1.0
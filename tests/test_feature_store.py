@@ -0,0 +1,122 @@
+import shutil
+
+import pandas as pd
+import pytest
+
+from tennis.data_processing.historical_features.feature_store import (
+    HistoricFeatureStore,
+    LateMatchError,
+    save_historic_feature_store,
+    update_historic_features,
+)
+from tennis.data_processing.historical_features.historic_featureset import (
+    HISTORIC_FEATURES,
+    calculate_historic_features,
+)
+from tests.synthetic_data import make_synthetic_final_data
+
+
+def sort_rows(features_df: pd.DataFrame) -> pd.DataFrame:
+    """Historic features sorted by match_id and player_id."""
+    return features_df.sort_values(["match_id", "player_id"], ignore_index=True)
+
+
+def test_store_batches_equal_a_rebuild():
+    df = make_synthetic_final_data(500)
+    store = HistoricFeatureStore()
+
+    # Batches split the tournaments, so some continue the last date of their players.
+    results = [
+        store.update(batch)
+        for _, batch in df.groupby([df["tourney_date"], df["match_num"] > 25])
+    ]
+
+    pd.testing.assert_frame_equal(
+        sort_rows(pd.concat(results)),
+        sort_rows(calculate_historic_features(df)),
+        check_exact=True,
+    )
+    assert store.num_rows == len(df)
+
+
+def test_store_rejects_matches_before_the_stored_ones():
+    df = make_synthetic_final_data(200)
+    late = df["match_id"] < 31
+    store = HistoricFeatureStore()
+    store.update(df[~late & (df["match_id"] < 100)])
+
+    with pytest.raises(LateMatchError, match="Rebuild the store instead"):
+        store.update(df[late])
+
+    # The failed update leaves the store as it was.
+    result = store.update(df[df["match_id"] >= 100])
+    expected = calculate_historic_features(df[~late])
+    pd.testing.assert_frame_equal(
+        sort_rows(result),
+        sort_rows(expected[expected["match_id"] >= 100]),
+        check_exact=True,
+    )
+
+
+def test_update_historic_features_appends_new_matches(tmp_path):
+    df = make_synthetic_final_data(500)
+    store_path = tmp_path / "store.pkl"
+    features_path = tmp_path / "features.csv"
+
+    update_historic_features(df[df["match_id"] < 300], store_path, features_path)
+    result = update_historic_features(df, store_path, features_path)
+
+    pd.testing.assert_frame_equal(
+        sort_rows(result), sort_rows(calculate_historic_features(df)), rtol=1e-15
+    )
+    assert len(pd.read_csv(features_path)) == len(df)
+
+
+def test_update_historic_features_rebuilds_for_late_matches(tmp_path):
+    df = make_synthetic_final_data(500)
+    store_path = tmp_path / "store.pkl"
+    features_path = tmp_path / "features.csv"
+    # Matches of the first tournament arriving after the later ones were stored.
+    late = df["match_id"].between(10, 19)
+
+    update_historic_features(df[~late], store_path, features_path)
+    result = update_historic_features(df, store_path, features_path)
+
+    pd.testing.assert_frame_equal(
+        sort_rows(result), sort_rows(calculate_historic_features(df)), rtol=1e-15
+    )
+
+
+def test_update_historic_features_rebuilds_out_of_step_files(tmp_path):
+    df = make_synthetic_final_data(500)
+    store_path = tmp_path / "store.pkl"
+    features_path = tmp_path / "features.csv"
+    update_historic_features(df[df["match_id"] < 300], store_path, features_path)
+    shutil.copy(store_path, tmp_path / "old_store.pkl")
+    update_historic_features(df[df["match_id"] < 400], store_path, features_path)
+    # A run stopped after appending the features and before saving the store.
+    shutil.copy(tmp_path / "old_store.pkl", store_path)
+
+    result = update_historic_features(df, store_path, features_path)
+
+    pd.testing.assert_frame_equal(
+        sort_rows(result), sort_rows(calculate_historic_features(df)), rtol=1e-15
+    )
+    assert len(pd.read_csv(features_path)) == len(df)
+
+
+def test_update_historic_features_rebuilds_when_the_features_change(tmp_path):
+    df = make_synthetic_final_data(500)
+    store_path = tmp_path / "store.pkl"
+    features_path = tmp_path / "features.csv"
+    # A store and features saved before the last feature was added.
+    old_store = HistoricFeatureStore(features=HISTORIC_FEATURES[:-1])
+    old_store.update(df[df["match_id"] < 300]).to_csv(features_path, index=False)
+    save_historic_feature_store(old_store, store_path)
+
+    result = update_historic_features(df, store_path, features_path)
+
+    pd.testing.assert_frame_equal(
+        sort_rows(result), sort_rows(calculate_historic_features(df)), rtol=1e-15
+    )
+    assert len(pd.read_csv(features_path).columns) == len(result.columns)
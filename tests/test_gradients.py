@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from tennis.models.markov_model import (
+    get_player_1_match_winning_probability_and_gradient,
+    get_player_1_match_winning_probability_and_gradient_for_format,
+    get_player_1_match_winning_probability_batch,
+    get_player_1_match_winning_probability_for_format,
+)
+from tennis.models.match_formats import (
+    BEST_OF_3_FINAL_SET_10_POINT_TIEBREAK,
+    BEST_OF_3_NO_AD,
+    BEST_OF_5_ADVANTAGE_FINAL_SET,
+    BEST_OF_5_FINAL_SET_TIEBREAK_AT_12,
+)
+
+P1_SERVE_PROBS = np.array([0.65, 0.5, 0.7, 0.45, 0.9, 0.3])
+P2_SERVE_PROBS = np.array([0.62, 0.5, 0.55, 0.6, 0.2, 0.35])
+STEP = 1e-6
+
+
+def central_differences(function, p1_serve_probs, p2_serve_probs):
+    """Central finite differences of function with respect to both serve probabilities."""
+    p1_derivative = (
+        function(p1_serve_probs + STEP, p2_serve_probs)
+        - function(p1_serve_probs - STEP, p2_serve_probs)
+    ) / (2 * STEP)
+    p2_derivative = (
+        function(p1_serve_probs, p2_serve_probs + STEP)
+        - function(p1_serve_probs, p2_serve_probs - STEP)
+    ) / (2 * STEP)
+    return p1_derivative, p2_derivative
+
+
+@pytest.mark.parametrize("best_of", [3, 5])
+def test_gradient_matches_finite_differences(best_of):
+    probability, p1_derivative, p2_derivative = (
+        get_player_1_match_winning_probability_and_gradient(
+            P1_SERVE_PROBS, P2_SERVE_PROBS, best_of
+        )
+    )
+
+    expected = central_differences(
+        lambda p1, p2: get_player_1_match_winning_probability_batch(p1, p2, best_of),
+        P1_SERVE_PROBS,
+        P2_SERVE_PROBS,
+    )
+    np.testing.assert_allclose(
+        probability,
+        get_player_1_match_winning_probability_batch(
+            P1_SERVE_PROBS, P2_SERVE_PROBS, best_of
+        ),
+        atol=1e-14,
+    )
+    np.testing.assert_allclose(p1_derivative, expected[0], atol=1e-7)
+    np.testing.assert_allclose(p2_derivative, expected[1], atol=1e-7)
+    assert (p1_derivative > 0).all()
+    assert (p2_derivative < 0).all()
+
+
+@pytest.mark.parametrize(
+    "match_format",
+    [
+        BEST_OF_3_NO_AD,
+        BEST_OF_5_ADVANTAGE_FINAL_SET,
+        BEST_OF_5_FINAL_SET_TIEBREAK_AT_12,
+        BEST_OF_3_FINAL_SET_10_POINT_TIEBREAK,
+    ],
+)
+def test_gradient_for_format_matches_finite_differences(match_format):
+    probability, p1_derivative, p2_derivative = (
+        get_player_1_match_winning_probability_and_gradient_for_format(
+            P1_SERVE_PROBS, P2_SERVE_PROBS, match_format
+        )
+    )
+
+    expected = central_differences(
+        lambda p1, p2: get_player_1_match_winning_probability_for_format(
+            p1, p2, match_format
+        ),
+        P1_SERVE_PROBS,
+        P2_SERVE_PROBS,
+    )
+    np.testing.assert_allclose(
+        probability,
+        get_player_1_match_winning_probability_for_format(
+            P1_SERVE_PROBS, P2_SERVE_PROBS, match_format
+        ),
+        atol=1e-14,
+    )
+    np.testing.assert_allclose(p1_derivative, expected[0], atol=1e-7)
+    np.testing.assert_allclose(p2_derivative, expected[1], atol=1e-7)
@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+
+from tennis.data_processing.historical_features.historic_featureset import (
+    HISTORIC_FEATURES,
+    calculate_historic_features,
+    calculate_prior_ewm_means,
+    calculate_prior_means,
+)
+
+
+def make_final_data(
+    rows: list[tuple[int, str, int, int, int, float, float]],
+) -> pd.DataFrame:
+    """
+    Final data with the columns calculate_historic_features reads, from rows of
+    match_id, tourney_date, match_num, player_id, opponent_id, player and opponent
+    values. Each feature is its row's value plus the feature's position.
+    """
+    df = pd.DataFrame(
+        rows,
+        columns=[
+            "match_id",
+            "tourney_date",
+            "match_num",
+            "player_id",
+            "opponent_id",
+            "player_value",
+            "opponent_value",
+        ],
+    )
+    df["tourney_date"] = pd.to_datetime(df["tourney_date"])
+    for position, feature in enumerate(HISTORIC_FEATURES):
+        for side in ("player", "opponent"):
+            df[f"{side}_{feature}"] = df[f"{side}_value"] + position
+    return df.drop(columns=["player_value", "opponent_value"])
+
+
+def test_calculate_prior_means_matches_the_groupby_transform():
+    df = pd.DataFrame(
+        {
+            "player_id": [1, 2, 1, 1, 2, 1, 2],
+            "tourney_date": pd.to_datetime(
+                [
+                    "2024-01-01",
+                    "2024-01-01",
+                    "2024-01-01",
+                    "2024-01-08",
+                    "2024-01-08",
+                    "2024-01-08",
+                    "2024-01-15",
+                ]
+            ),
+            "ace_pct": [0.1, 0.2, np.nan, 0.4, 0.5, 0.6, 0.7],
+            "df_pct": [1.0, 2.0, 3.0, np.nan, 5.0, 6.0, 7.0],
+        }
+    )
+    features = ["ace_pct", "df_pct"]
+
+    for group_cols in (["player_id"], ["player_id", "tourney_date"]):
+        result = calculate_prior_means(df, group_cols, features)
+
+        expected = df.groupby(group_cols)[features].transform(
+            lambda x: x.expanding().mean().shift()
+        )
+        pd.testing.assert_frame_equal(result, expected, rtol=1e-12)
+
+
+def test_calculate_historic_features_excludes_same_date_matches():
+    df = make_final_data(
+        [
+            (1, "2024-01-01", 1, 7, 8, 0.25, 0.5),
+            (2, "2024-01-01", 2, 7, 9, 0.75, 0.125),
+            (3, "2024-01-08", 1, 7, 8, 0.5, 0.25),
+            (4, "2024-01-08", 2, 7, 9, 0.0, 1.0),
+            (5, "2024-01-08", 3, 7, 8, 1.0, 0.0),
+        ]
+    )
+
+    result = calculate_historic_features(df).set_index("match_id")
+
+    # Player 7 only has the matches of 2024-01-01 before each round of 2024-01-08.
+    assert result["games_played_by_player"].tolist() == [0, 0, 2, 2, 2]
+    assert result["games_played_by_opponent"].tolist() == [0, 0, 1, 1, 1]
+    np.testing.assert_array_equal(
+        result["historic_player_ace_pct"], [0.0, 0.0, 0.5, 0.5, 0.5]
+    )
+    np.testing.assert_array_equal(
+        result["historic_opponent_ace_pct"], [0.0, 0.0, 0.5, 0.125, 0.5]
+    )
+    np.testing.assert_array_equal(
+        result["historic_player_df_pct"], [0.0, 0.0, 3.5, 3.5, 3.5]
+    )
+
+
+def test_calculate_historic_features_same_date_rows_never_see_each_other():
+    df = make_final_data(
+        [
+            (1, "2024-01-01", 1, 1, 2, 0.25, 0.5),
+            (2, "2024-01-08", 1, 1, 3, 0.5, 0.25),
+            (3, "2024-01-08", 2, 1, 2, 0.75, 0.125),
+            (4, "2024-01-08", 3, 1, 3, 1.0, 0.75),
+            (5, "2024-01-15", 1, 1, 2, 0.0, 0.0),
+        ]
+    )
+    result = calculate_historic_features(df)
+
+    # Changing the rows of 2024-01-08 leaves their own features unchanged.
+    changed = df.copy()
+    same_date = changed["tourney_date"] == "2024-01-08"
+    feature_columns = [
+        f"{side}_{feature}"
+        for side in ("player", "opponent")
+        for feature in HISTORIC_FEATURES
+    ]
+    changed.loc[same_date, feature_columns] = np.nan
+    changed_result = calculate_historic_features(changed)
+
+    pd.testing.assert_frame_equal(
+        changed_result[same_date.to_numpy()], result[same_date.to_numpy()]
+    )
+    assert not changed_result.iloc[-1].equals(result.iloc[-1])
+
+
+def test_calculate_prior_ewm_means_over_many_half_lives():
+    days = np.array([0, 1, 1500, 3000, 3001])
+    df = pd.DataFrame(
+        {
+            "player_id": 1,
+            "tourney_date": pd.Timestamp("2000-01-01") + pd.to_timedelta(days, "D"),
+            "ace_pct": [0.5, -1.0, 0.25, 2.0, 4.0],
+        }
+    )
+
+    result = calculate_prior_ewm_means(df, ["player_id"], ["ace_pct"], 1.0)
+
+    # Weights of 2^-1500 and less underflow next to the later matches.
+    expected = [np.nan, 0.5, (0.5 + 2 * -1.0) / 3, 0.25, 2.0]
+    np.testing.assert_allclose(result["ace_pct"], expected, rtol=1e-12)
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from tennis.models.implied_probabilities import (
+    get_implied_serve_probabilities_fixed_opponent,
+    get_implied_serve_probabilities_fixed_total,
+)
+from tennis.models.markov_model import get_player_1_match_winning_probability_batch
+
+P1_SERVE_PROBS = np.array([0.65, 0.5, 0.7, 0.45, 0.6, 0.3])
+P2_SERVE_PROBS = np.array([0.62, 0.5, 0.55, 0.6, 0.58, 0.35])
+BEST_OF = np.array([3, 5, 5, 3, 5, 3])
+
+
+def test_fixed_total_recovers_the_serve_probabilities():
+    targets = get_player_1_match_winning_probability_batch(
+        P1_SERVE_PROBS, P2_SERVE_PROBS, BEST_OF
+    )
+
+    result = get_implied_serve_probabilities_fixed_total(
+        targets, P1_SERVE_PROBS + P2_SERVE_PROBS, BEST_OF
+    )
+
+    assert result.converged.all()
+    np.testing.assert_allclose(result.p1_serve_probs, P1_SERVE_PROBS, atol=1e-8)
+    np.testing.assert_allclose(result.p2_serve_probs, P2_SERVE_PROBS, atol=1e-8)
+    np.testing.assert_allclose(
+        get_player_1_match_winning_probability_batch(
+            result.p1_serve_probs, result.p2_serve_probs, BEST_OF
+        ),
+        targets,
+        atol=1e-10,
+    )
+
+
+def test_fixed_opponent_recovers_the_serve_probabilities():
+    targets = get_player_1_match_winning_probability_batch(
+        P1_SERVE_PROBS, P2_SERVE_PROBS, BEST_OF
+    )
+
+    result = get_implied_serve_probabilities_fixed_opponent(
+        targets, P2_SERVE_PROBS, BEST_OF
+    )
+
+    assert result.converged.all()
+    np.testing.assert_array_equal(result.p2_serve_probs, P2_SERVE_PROBS)
+    np.testing.assert_allclose(result.p1_serve_probs, P1_SERVE_PROBS, atol=1e-8)
+    np.testing.assert_allclose(result.residuals, 0, atol=1e-10)
+
+
+def test_unattainable_targets_are_reported_as_not_converged():
+    result = get_implied_serve_probabilities_fixed_opponent([1.5, 0.5], 0.6, 3)
+
+    assert result.converged.tolist() == [False, True]
+    assert result.p1_serve_probs[0] == pytest.approx(1, abs=1e-12)
+    assert result.residuals[0] < 0
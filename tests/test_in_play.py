@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+
+from tennis.models.in_play import (
+    build_in_play_value_tables,
+    get_player_1_in_play_winning_probability,
+)
+from tennis.models.markov_model import get_player_1_match_winning_probability_batch
+
+P1_SERVE_PROBS = np.array([0.65, 0.6, 0.7])
+P2_SERVE_PROBS = np.array([0.62, 0.64, 0.55])
+BEST_OF = np.array([3, 5, 5])
+
+
+@pytest.fixture(scope="module")
+def tables():
+    return build_in_play_value_tables(P1_SERVE_PROBS, P2_SERVE_PROBS, BEST_OF)
+
+
+def value(tables, sets, games, points, server, match_index=0):
+    """In-play value of one match from (sets, games, points) pairs and the server."""
+    return get_player_1_in_play_winning_probability(
+        tables, *sets, *games, *points, server, match_index
+    )
+
+
+def test_value_at_the_start_is_the_pre_match_probability(tables):
+    result = value(tables, (0, 0), (0, 0), (0, 0), 1, np.arange(3))
+
+    expected = get_player_1_match_winning_probability_batch(
+        P1_SERVE_PROBS, P2_SERVE_PROBS, BEST_OF
+    )
+    np.testing.assert_allclose(result, expected, rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize(
+    "sets, games, points, server, won, lost",
+    [
+        # Within a game, the server keeps serving.
+        (
+            (1, 0),
+            (3, 2),
+            (1, 2),
+            1,
+            ((1, 0), (3, 2), (2, 2), 1),
+            ((1, 0), (3, 2), (1, 3), 1),
+        ),
+        # Game point for the server, the other player serves the next game.
+        (
+            (0, 1),
+            (4, 2),
+            (3, 0),
+            1,
+            ((0, 1), (5, 2), (0, 0), 2),
+            ((0, 1), (4, 2), (3, 1), 1),
+        ),
+        # Set point on the other player's serve, losing it goes to deuce.
+        (
+            (0, 0),
+            (5, 4),
+            (3, 2),
+            2,
+            ((1, 0), (0, 0), (0, 0), 1),
+            ((0, 0), (5, 4), (3, 3), 2),
+        ),
+        # Tiebreak points, the server changes after the first point then every two.
+        (
+            (1, 1),
+            (6, 6),
+            (0, 0),
+            1,
+            ((1, 1), (6, 6), (1, 0), 2),
+            ((1, 1), (6, 6), (0, 1), 2),
+        ),
+        (
+            (1, 1),
+            (6, 6),
+            (2, 1),
+            2,
+            ((1, 1), (6, 6), (3, 1), 1),
+            ((1, 1), (6, 6), (2, 2), 1),
+        ),
+    ],
+)
+def test_value_is_the_expected_value_after_the_next_point(
+    tables, sets, games, points, server, won, lost
+):
+    p1_wins_point = P1_SERVE_PROBS[0] if server == 1 else 1 - P2_SERVE_PROBS[0]
+
+    result = value(tables, sets, games, points, server)
+
+    expected = p1_wins_point * value(tables, *won) + (1 - p1_wins_point) * value(
+        tables, *lost
+    )
+    assert result == pytest.approx(expected, abs=1e-12)
+
+
+def test_scores_past_deuce_match_the_equivalent_score(tables):
+    assert value(tables, (0, 0), (2, 2), (5, 6), 1) == value(
+        tables, (0, 0), (2, 2), (3, 4), 1
+    )
+    assert value(tables, (0, 0), (6, 6), (9, 9), 2) == value(
+        tables, (0, 0), (6, 6), (7, 7), 2
+    )
+
+
+def test_value_on_match_point_of_the_final_set(tables):
+    # Best of 3 at one set all and 5-6, player 1 serving at 0-40 must win the next three
+    # points to stay in the match.
+    result = value(tables, (1, 1), (5, 6), (0, 3), 1)
+
+    assert 0 < result < P1_SERVE_PROBS[0] ** 3
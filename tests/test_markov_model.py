@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+
+from tennis.models.markov_model import (
+    SOLVER_ABSORBING,
+    SOLVER_MATRIX_POWER,
+    TennisParameters,
+    get_player_1_match_winning_probability,
+    get_player_1_match_winning_probability_batch,
+    get_player_1_set_winning_probability,
+    get_player_1_set_winning_probability_batch,
+    get_score_distribution_batch,
+)
+
+SERVE_PROBS = [(0.65, 0.62), (0.5, 0.5), (0.7, 0.55), (0.45, 0.6), (0.9, 0.1)]
+
+
+def test_batch_matches_the_scalar_match_probability():
+    p1_serve_probs, p2_serve_probs = np.array(SERVE_PROBS).T
+    best_of = np.array([3, 5, 5, 3, 5])
+
+    result = get_player_1_match_winning_probability_batch(
+        p1_serve_probs, p2_serve_probs, best_of
+    )
+
+    expected = [
+        get_player_1_match_winning_probability(TennisParameters(p1, p2), sets)
+        for p1, p2, sets in zip(p1_serve_probs, p2_serve_probs, best_of)
+    ]
+    np.testing.assert_allclose(result, expected, rtol=0, atol=1e-12)
+
+
+def test_batch_broadcasts_a_scalar_best_of():
+    result = get_player_1_match_winning_probability_batch(0.65, [0.62, 0.6], 5)
+
+    assert result.shape == (2,)
+    assert result[0] == get_player_1_match_winning_probability_batch(0.65, 0.62, 5)
+
+
+def test_batch_rejects_an_unknown_best_of():
+    with pytest.raises(ValueError, match="Best of must be one of"):
+        get_player_1_match_winning_probability_batch([0.6, 0.6], [0.6, 0.6], [3, 4])
+
+
+@pytest.mark.parametrize("p1, p2", SERVE_PROBS)
+def test_solvers_agree_on_set_and_match_probabilities(p1, p2):
+    params = TennisParameters(p1, p2)
+
+    set_probabilities = [
+        get_player_1_set_winning_probability(params, solver)
+        for solver in (SOLVER_MATRIX_POWER, SOLVER_ABSORBING)
+    ]
+    match_probabilities = [
+        get_player_1_match_winning_probability(params, best_of, solver)
+        for best_of in (3, 5)
+        for solver in (SOLVER_MATRIX_POWER, SOLVER_ABSORBING)
+    ]
+
+    np.testing.assert_allclose(set_probabilities[1], set_probabilities[0], atol=1e-14)
+    np.testing.assert_allclose(
+        match_probabilities[1::2], match_probabilities[::2], atol=1e-14
+    )
+
+
+def test_unknown_solver_is_rejected():
+    with pytest.raises(ValueError, match="Solver must be one of"):
+        get_player_1_match_winning_probability(TennisParameters(0.6, 0.6), 3, "lu")
+
+
+def test_score_distribution_sums_to_one_and_matches_the_win_probability():
+    p1_serve_probs, p2_serve_probs = np.array(SERVE_PROBS).T
+    best_of = np.array([3, 5, 5, 3, 5])
+
+    distribution = get_score_distribution_batch(p1_serve_probs, p2_serve_probs, best_of)
+
+    np.testing.assert_allclose(sum(distribution.set_scores.values()), 1, atol=1e-12)
+    np.testing.assert_allclose(sum(distribution.match_scores.values()), 1, atol=1e-12)
+    np.testing.assert_allclose(distribution.total_games.sum(axis=0), 1, atol=1e-12)
+    np.testing.assert_allclose(distribution.games_difference.sum(axis=0), 1, atol=1e-12)
+    np.testing.assert_allclose(
+        distribution.p1_match_winning_probability,
+        get_player_1_match_winning_probability_batch(
+            p1_serve_probs, p2_serve_probs, best_of
+        ),
+        atol=1e-12,
+    )
+    np.testing.assert_allclose(
+        sum(
+            probability
+            for (a, b), probability in distribution.set_scores.items()
+            if a > b
+        ),
+        get_player_1_set_winning_probability_batch(p1_serve_probs, p2_serve_probs),
+        atol=1e-12,
+    )
+
+
+def test_score_distribution_of_a_single_set_score():
+    # Player 1 always holds and player 2 never does, so every set is 6-0.
+    distribution = get_score_distribution_batch(1.0, 0.0, 3)
+
+    assert distribution.set_scores[6, 0] == pytest.approx(1)
+    assert distribution.match_scores[2, 0] == pytest.approx(1)
+    assert distribution.total_games[12] == pytest.approx(1)
+    difference = distribution.games_difference[distribution.max_games_difference + 12]
+    assert difference == pytest.approx(1)
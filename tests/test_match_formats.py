@@ -0,0 +1,83 @@
+from functools import cache
+
+import numpy as np
+import pytest
+
+from tennis.models.markov_model import (
+    get_player_1_match_winning_probability_for_format,
+    no_ad_service_game_winning_prob,
+    tie_break_winning_prob,
+)
+from tennis.models.match_formats import (
+    BEST_OF_5,
+    BEST_OF_5_ADVANTAGE_FINAL_SET,
+    MatchFormat,
+    SetFormat,
+    compile_match_chain,
+    compile_set_chain,
+    is_p1_serving_tiebreak_point,
+)
+
+
+def race_winning_prob(p1_wins_point, points_to_win: int, win_by: int) -> float:
+    """P(player 1 wins a race to points_to_win), by a point by point recursion."""
+
+    @cache
+    def value(a: int, b: int) -> float:
+        if a >= points_to_win and a - b >= win_by:
+            return 1.0
+        if b >= points_to_win and b - a >= win_by:
+            return 0.0
+        if a + b > 200:
+            return 0.5
+        p = p1_wins_point(a, b)
+        return p * value(a + 1, b) + (1 - p) * value(a, b + 1)
+
+    return value(0, 0)
+
+
+@pytest.mark.parametrize("points_to_win", [7, 10])
+@pytest.mark.parametrize("first_server", [1, 2])
+def test_tiebreak_chain_matches_a_point_by_point_recursion(points_to_win, first_server):
+    p1, p2 = 0.65, 0.6
+
+    result = tie_break_winning_prob(p1, p2, points_to_win, first_server)
+
+    expected = race_winning_prob(
+        lambda a, b: p1 if is_p1_serving_tiebreak_point(a, b, first_server) else 1 - p2,
+        points_to_win,
+        win_by=2,
+    )
+    assert result == pytest.approx(expected, abs=1e-12)
+
+
+def test_no_ad_game_matches_a_point_by_point_recursion():
+    for p in (0.3, 0.5, 0.65):
+        # At deuce (3-3) the next point wins, which a race to 4 by one point gives.
+        expected = race_winning_prob(lambda a, b, p=p: p, 4, win_by=1)
+
+        assert no_ad_service_game_winning_prob(p) == pytest.approx(expected, abs=1e-14)
+
+
+def test_advantage_final_set_is_the_limit_of_a_late_tiebreak():
+    late_tiebreak = MatchFormat(
+        sets_to_win=3, final_set_format=SetFormat(tiebreak_at=40)
+    )
+
+    result = get_player_1_match_winning_probability_for_format(
+        np.array([0.65, 0.6]), np.array([0.62, 0.6]), BEST_OF_5_ADVANTAGE_FINAL_SET
+    )
+
+    expected = get_player_1_match_winning_probability_for_format(
+        np.array([0.65, 0.6]), np.array([0.62, 0.6]), late_tiebreak
+    )
+    np.testing.assert_allclose(result, expected, atol=1e-8)
+    assert result[1] == pytest.approx(0.5, abs=1e-12)
+
+
+def test_compiled_chains_are_cached_per_format():
+    assert compile_set_chain(SetFormat()) is compile_set_chain(SetFormat())
+    assert compile_match_chain(BEST_OF_5) is compile_match_chain(MatchFormat(3))
+    assert compile_set_chain(SetFormat()) is not compile_set_chain(
+        SetFormat(tiebreak_at=None)
+    )
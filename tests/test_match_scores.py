@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tennis.data_processing.basic_processing.match_scores import (
+    parse_scores,
+    parse_scores_vectorized,
+    process_match_scores,
+)
+
+SCORES = [
+    "6-4 6-3",
+    "7-6(5) 6-7(3) 6-4",
+    "4-6 7-5 6-7(10) 7-6(2) 12-10",
+    "7-6 6-7",
+    "6-4  6-2",
+    "7-6(5 6-3",
+    "1-0",
+    "",
+    "6-4 6-4 6-4 6-4 6-4 6-4",
+    "6-4 3-2 RET",
+    "6-4 RET",
+    "6-4 6-4 DEF",
+    "6-7(3) 3-1 RET 6-4",
+    "RET",
+    "W/O",
+    "W/O 6-4",
+    "6-4 abc",
+    "7-6(",
+    "64 6-4",
+    "6-4 6:3",
+]
+
+
+def to_python(value):
+    """A parsed value as parse_scores gives it, with None for missing values."""
+    if pd.isna(value):
+        return None
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def test_vectorized_parse_matches_parse_scores():
+    scores = pd.Series(SCORES, index=np.arange(len(SCORES)) * 10)
+
+    parsed_scores_df, errors = parse_scores_vectorized(scores)
+
+    assert parsed_scores_df.index.equals(scores.index)
+    for (index, score), error in zip(scores.items(), errors):
+        expected = parse_scores(score)
+        assert error == (expected is None), score
+        if expected is None:
+            continue
+        row = parsed_scores_df.loc[index]
+        assert {column: to_python(row[column]) for column in expected} == expected
+        # Sets past the fifth only have columns in the rows that reached them.
+        other_sets = row.index[row.index.str.startswith("set_")].difference(expected)
+        assert row[other_sets].isna().all(), score
+
+
+def test_vectorized_parse_totals():
+    parsed_scores_df, _ = parse_scores_vectorized(
+        pd.Series(["7-6(5) 6-7(3) 6-4", "6-4 3-2 RET", "W/O"])
+    )
+
+    assert parsed_scores_df["p1_games_won"].tolist() == [19, 9, 0]
+    assert parsed_scores_df["p2_games_won"].tolist() == [17, 6, 0]
+    assert parsed_scores_df["tiebreaks_played"].tolist() == [2, 0, 0]
+    assert parsed_scores_df["sets_played"].tolist() == [3, 2, 0]
+
+
+def test_missing_scores_are_errors():
+    _, errors = parse_scores_vectorized(pd.Series(["6-4 6-4", None, np.nan]))
+
+    assert errors.tolist() == [False, True, True]
+
+
+def test_process_match_scores_drops_errors_and_keeps_rows_aligned():
+    df = pd.DataFrame(
+        {"match_id": [5, 6, 7], "score": ["6-4 6-4", "6-4 abc", "4-6 6-3 7-5"]},
+        index=[2, 1, 0],
+    )
+
+    result = process_match_scores(df)
+
+    assert result["match_id"].tolist() == [5, 7]
+    assert result["set_3_p1"].tolist() == [pd.NA, 7]
+    assert "score" not in result
+
+
+@pytest.mark.parametrize("score", ["7-6(5) 6-3", "7-6(5 6-3"])
+def test_tiebreak_points_are_parsed_with_or_without_the_closing_bracket(score):
+    parsed_scores_df, errors = parse_scores_vectorized(pd.Series([score]))
+
+    assert not errors[0]
+    assert parsed_scores_df["set_1_tiebreaker"][0] == 5
+
+
+def test_long_tiebreaks_do_not_overflow():
+    parsed_scores_df, errors = parse_scores_vectorized(
+        pd.Series(["7-6(130) 6-4", "6-4 7-6(40000)", "200-198 6-4", "70-68 6-4"])
+    )
+
+    assert errors.tolist() == [False, True, True, False]
+    assert parsed_scores_df["set_1_tiebreaker"][0] == 130
+    assert parsed_scores_df["set_1_p1"][3] == 70
+    assert parsed_scores_df["p1_games_won"][3] == 76
@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+
+from tennis.data_processing.basic_processing.player_info import (
+    player_info_wide_to_long,
+)
+
+ATTRIBUTES = ("name", "age", "rank", "rank_points", "seed", "ioc", "hand")
+
+
+def player_info_wide_to_long_iterrows(df: pd.DataFrame) -> pd.DataFrame:
+    """The original row by row player_info_wide_to_long, as the reference."""
+    transformed_data = []
+    for _, row in df.iterrows():
+        for player, opponent, outcome, win in (
+            ("winner", "loser", "win", 1),
+            ("loser", "winner", "lose", 0),
+        ):
+            data = {"match_id": row["match_id"]}
+            for attribute in ATTRIBUTES:
+                data[f"player_{attribute}"] = row[f"{player}_{attribute}"]
+                data[f"opponent_{attribute}"] = row[f"{opponent}_{attribute}"]
+            data["outcome"] = outcome
+            data["win"] = win
+            transformed_data.append(data)
+    return pd.DataFrame(transformed_data)
+
+
+def make_player_info() -> pd.DataFrame:
+    """Wide player info for three matches, with a repeated player and missing values."""
+    df = pd.DataFrame({"match_id": [10, 11, 12]})
+    for side, names, ages, ranks, seeds, iocs, hands in (
+        (
+            "winner",
+            ["A", "B", "A"],
+            [20.5, 31.0, 20.6],
+            [1.0, np.nan, 1.0],
+            [1.0, np.nan, np.nan],
+            ["FRA", "ESP", "FRA"],
+            ["R", "L", "R"],
+        ),
+        (
+            "loser",
+            ["C", "A", "D"],
+            [25.0, 20.5, 18.2],
+            [40.0, 1.0, 300.0],
+            [np.nan, 1.0, np.nan],
+            ["USA", "FRA", "SUI"],
+            ["R", "R", "U"],
+        ),
+    ):
+        df[f"{side}_name"] = names
+        df[f"{side}_age"] = ages
+        df[f"{side}_rank"] = ranks
+        df[f"{side}_rank_points"] = [1000.0, 500.0, 12.0]
+        df[f"{side}_seed"] = seeds
+        df[f"{side}_ioc"] = iocs
+        df[f"{side}_hand"] = hands
+    return df
+
+
+def test_wide_to_long_matches_the_row_by_row_reshape():
+    df = make_player_info()
+
+    result = player_info_wide_to_long(df)
+
+    categorical = result.select_dtypes("category").columns
+    assert set(categorical) == {
+        f"{side}_{attribute}"
+        for side in ("player", "opponent")
+        for attribute in ("name", "ioc", "hand")
+    }
+    pd.testing.assert_frame_equal(
+        result.astype({column: object for column in categorical}),
+        player_info_wide_to_long_iterrows(df),
+    )
+
+
+def test_wide_to_long_shares_categories_between_sides():
+    result = player_info_wide_to_long(make_player_info())
+
+    for attribute in ("name", "ioc", "hand"):
+        player = result[f"player_{attribute}"]
+        opponent = result[f"opponent_{attribute}"]
+        assert player.cat.categories.equals(opponent.cat.categories)
+    assert result["player_name"].cat.categories.tolist() == ["A", "C", "B", "D"]
+    np.testing.assert_array_equal(
+        result["player_name"].cat.codes,
+        result["opponent_name"].cat.codes[[1, 0, 3, 2, 5, 4]],
+    )
+
+
+def test_wide_to_long_keeps_the_player_ids():
+    df = make_player_info().assign(winner_id=[0, 1, 0], loser_id=[2, 0, 3])
+
+    result = player_info_wide_to_long(df)
+
+    assert result.columns[1:3].tolist() == ["player_id", "opponent_id"]
+    assert result["player_id"].tolist() == [0, 2, 1, 0, 0, 3]
+    assert result["opponent_id"].tolist() == [2, 0, 0, 1, 3, 0]
@@ -0,0 +1,87 @@
+import pickle
+
+from tennis.data_processing.basic_processing.player_names import (
+    PlayerNameIndex,
+    load_player_name_index,
+    normalize_name,
+    update_player_name_index,
+)
+
+# At a cutoff of 85 the bridge links to both spellings, which do not link to each other.
+SCORE_CUTOFF = 85.0
+FIRST_SPELLING = "Juan Martin Potro"
+SECOND_SPELLING = "Juan M. del Potro"
+BRIDGE = "Juan Martín del Potro"
+
+
+def test_normalize_name():
+    assert normalize_name("  Juan Martín DEL-Potro. ") == "juan martin del potro"
+
+
+def test_unpinned_groups_merge_to_the_earliest_name():
+    index = PlayerNameIndex(score_cutoff=SCORE_CUTOFF)
+    index.add_names([FIRST_SPELLING, SECOND_SPELLING])
+    assert index.get_canonical_mapping()[SECOND_SPELLING] == SECOND_SPELLING
+
+    index.add_names([BRIDGE])
+
+    assert set(index.get_canonical_mapping().values()) == {FIRST_SPELLING}
+
+
+def test_a_bridge_does_not_change_the_canonical_of_pinned_names(capsys):
+    index = PlayerNameIndex(score_cutoff=SCORE_CUTOFF)
+    index.add_names([FIRST_SPELLING, SECOND_SPELLING])
+    index.pin_names([FIRST_SPELLING, SECOND_SPELLING])
+
+    index.add_names([BRIDGE])
+
+    mapping = index.get_canonical_mapping()
+    assert mapping[FIRST_SPELLING] == FIRST_SPELLING
+    assert mapping[SECOND_SPELLING] == SECOND_SPELLING
+    assert mapping[BRIDGE] == FIRST_SPELLING
+    assert "both are pinned" in capsys.readouterr().out
+
+
+def test_a_pinned_name_becomes_the_canonical_of_its_group():
+    index = PlayerNameIndex(score_cutoff=SCORE_CUTOFF)
+    index.add_names([FIRST_SPELLING, BRIDGE])
+    index.pin_names([BRIDGE, "Not Added Yet"])
+
+    index.add_names(["Not Added Yet"])
+
+    mapping = index.get_canonical_mapping()
+    assert mapping[FIRST_SPELLING] == BRIDGE
+    assert mapping[BRIDGE] == BRIDGE
+    assert index.pinned == {BRIDGE, "Not Added Yet"}
+
+
+def test_update_pins_the_registered_names_before_adding(tmp_path):
+    path = tmp_path / "index.pkl"
+    update_player_name_index([FIRST_SPELLING, SECOND_SPELLING], path, SCORE_CUTOFF)
+
+    index = update_player_name_index(
+        [BRIDGE],
+        path,
+        SCORE_CUTOFF,
+        registered_names=[FIRST_SPELLING, SECOND_SPELLING],
+    )
+
+    assert index.get_canonical_mapping()[SECOND_SPELLING] == SECOND_SPELLING
+    assert load_player_name_index(path, SCORE_CUTOFF).pinned == {
+        FIRST_SPELLING,
+        SECOND_SPELLING,
+    }
+
+
+def test_indexes_cached_before_pinning_load_without_pinned_names():
+    index = PlayerNameIndex(score_cutoff=SCORE_CUTOFF)
+    index.add_names([FIRST_SPELLING])
+    state = dict(index.__dict__)
+    del state["pinned"]
+
+    restored = PlayerNameIndex.__new__(PlayerNameIndex)
+    restored.__setstate__(state)
+
+    assert restored.pinned == set()
+    assert pickle.loads(pickle.dumps(restored)) == restored
+    assert restored.get_canonical_mapping() == {FIRST_SPELLING: FIRST_SPELLING}
@@ -0,0 +1,186 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tennis.data_processing.basic_processing.player_outcomes import (
+    DERIVED_FEATURES,
+    add_derived_features,
+    add_transformed_variables,
+    merge_with_opponent_stats,
+)
+
+RAW_STATS = (
+    "ace",
+    "bpfaced",
+    "bpsaved",
+    "df",
+    "firstin",
+    "firstwon",
+    "secondwon",
+    "svgms",
+    "svpt",
+)
+
+
+def make_player_stats(rows: list[tuple[int, int, float, float]]) -> pd.DataFrame:
+    """Player stats with match_id, player_id, player_ace and player_df columns."""
+    return pd.DataFrame(
+        rows, columns=["match_id", "player_id", "player_ace", "player_df"]
+    )
+
+
+def test_merge_with_opponent_stats_swaps_each_pair_of_rows():
+    df = make_player_stats(
+        [
+            (2, 7, 5.0, 1.0),
+            (1, 4, 10.0, 2.0),
+            (2, 3, 8.0, 0.0),
+            (1, 9, 3.0, 4.0),
+        ]
+    )
+
+    result = merge_with_opponent_stats(df)
+
+    expected = make_player_stats(
+        [
+            (1, 4, 10.0, 2.0),
+            (1, 9, 3.0, 4.0),
+            (2, 3, 8.0, 0.0),
+            (2, 7, 5.0, 1.0),
+        ]
+    ).assign(opponent_ace=[3.0, 10.0, 5.0, 8.0], opponent_df=[4.0, 2.0, 1.0, 0.0])
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_merge_with_opponent_stats_without_exactly_two_rows():
+    df = make_player_stats(
+        [
+            (1, 4, 10.0, 2.0),
+            (1, 9, 3.0, 4.0),
+            (2, 3, 8.0, 0.0),
+            (3, 1, 1.0, 1.0),
+            (3, 2, 2.0, 2.0),
+            (3, 5, 3.0, 3.0),
+        ]
+    )
+
+    result = merge_with_opponent_stats(df)
+
+    # Only match 1 has both players, match 2 is missing its opponent row and match 3
+    # has one row too many.
+    np.testing.assert_array_equal(result["opponent_ace"][:2], [3.0, 10.0])
+    assert result.loc[2:, ["opponent_ace", "opponent_df"]].isna().all().all()
+    pd.testing.assert_frame_equal(result[df.columns], df)
+
+
+def test_merge_with_opponent_stats_aligns_columns():
+    df = make_player_stats(
+        [
+            (1, 9, 3.0, 4.0),
+            (1, 4, 10.0, 2.0),
+        ]
+    ).set_index(pd.Index([10, 20]))
+
+    result = merge_with_opponent_stats(df)
+
+    assert result.columns.tolist() == [
+        "match_id",
+        "player_id",
+        "player_ace",
+        "player_df",
+        "opponent_ace",
+        "opponent_df",
+    ]
+    pd.testing.assert_index_equal(result.index, pd.RangeIndex(2))
+    np.testing.assert_array_equal(result["player_id"], [4, 9])
+    np.testing.assert_array_equal(result["opponent_ace"], [3.0, 10.0])
+    np.testing.assert_array_equal(result["opponent_df"], [4.0, 2.0])
+
+
+def make_raw_stats(prefix: str = "player_") -> pd.DataFrame:
+    """Raw stats of four players, with zero denominators in the last two rows."""
+    return pd.DataFrame(
+        {
+            f"{prefix}ace": [5, 0, 3, 0],
+            f"{prefix}bpfaced": [4, 0, 2, 1],
+            f"{prefix}bpsaved": [3, 0, 1, 0],
+            f"{prefix}df": [2, 1, 0, 0],
+            f"{prefix}firstin": [40, 30, 10, 0],
+            f"{prefix}firstwon": [30, 20, 5, 0],
+            f"{prefix}secondwon": [10, 5, 0, 0],
+            f"{prefix}svgms": [10, 8, 0, 0],
+            f"{prefix}svpt": [65, 50, 10, 0],
+        }
+    )
+
+
+def add_transformed_variables_explicitly(df: pd.DataFrame) -> pd.DataFrame:
+    """The original add_transformed_variables, one column at a time, as the reference."""
+
+    def safe_divide(numerator, denominator):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(denominator == 0, 0, numerator / denominator)
+
+    df["player_second_serves"] = df["player_svpt"] - df["player_firstin"]
+    df["player_total_serve_points_won"] = df["player_firstwon"] + df["player_secondwon"]
+    df["player_total_serve_points_lost"] = (
+        df["player_svpt"] - df["player_total_serve_points_won"]
+    )
+    df["player_first_serve_pct"] = safe_divide(df["player_firstin"], df["player_svpt"])
+    df["player_first_serve_win_pct"] = safe_divide(
+        df["player_firstwon"], df["player_firstin"]
+    )
+    df["player_second_serve_win_pct"] = safe_divide(
+        df["player_secondwon"], df["player_second_serves"]
+    )
+    df["player_total_serve_win_pct"] = safe_divide(
+        df["player_total_serve_points_won"], df["player_svpt"]
+    )
+    df["player_df_pct"] = safe_divide(df["player_df"], df["player_svpt"])
+    df["player_bpsaved_pct"] = safe_divide(df["player_bpsaved"], df["player_bpfaced"])
+    df["player_aces_per_game"] = safe_divide(df["player_ace"], df["player_svgms"])
+    df["player_ace_pct"] = safe_divide(df["player_ace"], df["player_svpt"])
+    df["player_df_per_game"] = safe_divide(df["player_df"], df["player_svgms"])
+    df["player_serve_points_won_per_game"] = safe_divide(
+        df["player_total_serve_points_won"], df["player_svgms"]
+    )
+    df["player_serve_points_lost_per_game"] = safe_divide(
+        df["player_total_serve_points_lost"], df["player_svgms"]
+    )
+    return df
+
+
+def test_registry_inputs_are_raw_stats_or_derived_features():
+    for name, feature in DERIVED_FEATURES.items():
+        assert feature.operation in ("sum", "difference", "ratio"), name
+        for input_name in feature.inputs:
+            assert input_name in RAW_STATS or input_name in DERIVED_FEATURES, name
+
+
+def test_add_transformed_variables_matches_the_explicit_columns():
+    result = add_transformed_variables(make_raw_stats())
+
+    expected = add_transformed_variables_explicitly(make_raw_stats())
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_add_derived_features_only_adds_the_requested_features():
+    result = add_derived_features(
+        make_raw_stats("opponent_"),
+        ["second_serve_win_pct", "opponent_ace_pct"],
+        prefix="opponent_",
+        dtype=np.float32,
+    )
+
+    new_columns = result.columns.difference(make_raw_stats("opponent_").columns)
+    assert sorted(new_columns) == ["opponent_ace_pct", "opponent_second_serve_win_pct"]
+    assert (result[new_columns].dtypes == np.float32).all()
+    np.testing.assert_array_equal(
+        result["opponent_second_serve_win_pct"],
+        np.array([10 / 25, 5 / 20, 0, 0], dtype=np.float32),
+    )
+
+
+def test_add_derived_features_rejects_unknown_features():
+    with pytest.raises(ValueError, match="Unknown derived features"):
+        add_derived_features(make_raw_stats(), ["ace_pct", "aces_per_set"])
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from tennis.models.markov_model import (
+    TennisParameters,
+    get_player_1_match_winning_probability,
+    get_player_1_match_winning_probability_batch,
+)
+from tennis.models.probability_grid import (
+    DEFAULT_GRID_RESOLUTION,
+    GRID_BEST_OF,
+    INTERPOLATION_DOMAIN,
+    MAX_INTERPOLATION_ERROR,
+    build_probability_grid,
+    get_player_1_match_winning_probability_from_grid,
+    load_probability_grid,
+    save_probability_grid,
+)
+
+
+@pytest.fixture(scope="module")
+def grid() -> np.ndarray:
+    return build_probability_grid()
+
+
+@pytest.mark.parametrize("best_of", GRID_BEST_OF)
+def test_interpolation_error_is_within_the_bound_on_the_domain(grid, best_of):
+    # Cell centres, where bilinear interpolation is furthest from the grid points, across
+    # the domain and more finely around p1 ~ p2 ~ 0.5 where the error peaks.
+    half_step = 0.5 / (DEFAULT_GRID_RESOLUTION - 1)
+    coarse = np.arange(*INTERPOLATION_DOMAIN, 0.02) + half_step
+    fine = np.arange(0.46, 0.54, 0.002) + half_step
+    p1, p2 = np.hstack(
+        [
+            np.reshape(np.meshgrid(coarse, coarse, indexing="ij"), (2, -1)),
+            np.reshape(np.meshgrid(fine, fine, indexing="ij"), (2, -1)),
+        ]
+    )
+
+    result = get_player_1_match_winning_probability_from_grid(grid, p1, p2, best_of)
+
+    expected = [
+        get_player_1_match_winning_probability(TennisParameters(a, b), best_of)
+        for a, b in zip(p1, p2)
+    ]
+    assert np.abs(result - expected).max() < MAX_INTERPOLATION_ERROR
+
+
+def test_interpolation_error_exceeds_the_bound_next_to_the_corner(grid):
+    result = get_player_1_match_winning_probability_from_grid(grid, 0.0015, 0.0005, 5)
+
+    expected = get_player_1_match_winning_probability(
+        TennisParameters(0.0015, 0.0005), 5
+    )
+    assert abs(result - expected) > MAX_INTERPOLATION_ERROR
+
+
+def test_grid_points_and_edges_give_the_batch_probabilities(tmp_path):
+    path = tmp_path / "grid.npy"
+    save_probability_grid(build_probability_grid(resolution=11), path)
+    small_grid = load_probability_grid(path)
+    p1 = np.array([0.0, 0.3, 0.6, 1.0, 1.2])
+    p2 = np.array([0.5, 0.7, 0.6, 1.0, 0.4])
+    best_of = np.array([3, 5, 3, 5, 3])
+
+    result = get_player_1_match_winning_probability_from_grid(
+        small_grid, p1, p2, best_of
+    )
+
+    assert isinstance(small_grid, np.memmap)
+    assert not small_grid.flags.writeable
+    expected = get_player_1_match_winning_probability_batch(
+        np.clip(p1, 0, 1), p2, best_of
+    )
+    np.testing.assert_allclose(result, expected, atol=1e-12)
+
+
+def test_grid_rejects_an_unknown_best_of(grid):
+    with pytest.raises(ValueError, match="Best of must be one of"):
+        get_player_1_match_winning_probability_from_grid(grid, 0.6, 0.6, 4)
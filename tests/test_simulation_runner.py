@@ -0,0 +1,61 @@
+from dataclasses import fields
+
+import numpy as np
+import pytest
+
+from tennis.models.simulation_runner import run_simulations
+from tennis.models.simulator import SimulatedMatches, simulate_matches
+
+N_MATCHES = 5000
+SHARD_SIZE = 1000
+
+
+def assert_same_matches(result: SimulatedMatches, expected: SimulatedMatches) -> None:
+    for field in fields(SimulatedMatches):
+        np.testing.assert_array_equal(
+            getattr(result, field.name), getattr(expected, field.name)
+        )
+
+
+@pytest.fixture(scope="module")
+def inputs():
+    rng = np.random.default_rng(0)
+    return (
+        rng.uniform(0.4, 0.8, N_MATCHES),
+        rng.uniform(0.4, 0.8, N_MATCHES),
+        rng.choice([3, 5], N_MATCHES),
+    )
+
+
+def test_results_do_not_depend_on_the_number_of_workers(inputs):
+    expected = run_simulations(*inputs, seed=42, n_workers=1, shard_size=SHARD_SIZE)
+
+    for n_workers in (2, 3):
+        result = run_simulations(
+            *inputs, seed=42, n_workers=n_workers, shard_size=SHARD_SIZE
+        )
+        assert_same_matches(result, expected)
+
+
+def test_each_shard_is_simulated_from_its_spawned_stream(inputs):
+    result = run_simulations(*inputs, seed=42, n_workers=1, shard_size=SHARD_SIZE)
+
+    seed_sequences = np.random.SeedSequence(42).spawn(N_MATCHES // SHARD_SIZE)
+    shard = slice(2 * SHARD_SIZE, 3 * SHARD_SIZE)
+    expected = simulate_matches(
+        *(values[shard] for values in inputs), seed_sequences[2]
+    )
+    for field in fields(SimulatedMatches):
+        np.testing.assert_array_equal(
+            getattr(result, field.name)[..., shard], getattr(expected, field.name)
+        )
+
+
+def test_worker_errors_are_raised(inputs):
+    p1_serve_probs = inputs[0].copy()
+    p1_serve_probs[-1] = 1.0
+
+    with pytest.raises(ValueError, match="Tiebreaks never finish"):
+        run_simulations(
+            p1_serve_probs, 1.0, 3, seed=0, n_workers=2, shard_size=SHARD_SIZE
+        )
@@ -0,0 +1,81 @@
+from itertools import islice
+
+import numpy as np
+import pytest
+
+from tennis.models.markov_model import TennisParameters
+from tennis.models.simulation_summary import (
+    RunningMoments,
+    SimulationSummary,
+    summarise_simulations,
+)
+from tennis.models.simulator import simulate_match_batches, simulate_matches
+
+PARAMS = TennisParameters(0.65, 0.62)
+
+
+def test_running_moments_match_the_whole_array():
+    values = np.random.default_rng(0).normal(1e6, 3.0, 10_000)
+
+    moments = RunningMoments()
+    for batch in np.array_split(values, [1, 7, 2500, 2501, 9000]):
+        moments.update(batch)
+    moments.update(np.array([]))
+
+    assert moments.count == values.size
+    assert moments.mean == pytest.approx(values.mean(), rel=1e-14)
+    assert moments.variance == pytest.approx(values.var(ddof=1), rel=1e-10)
+
+
+def test_summary_of_batches_matches_the_summary_of_all_matches():
+    batches = list(islice(simulate_match_batches(PARAMS, 5, 1000, seed=0), 5))
+
+    summary = SimulationSummary()
+    for batch in batches:
+        summary.update(batch)
+
+    set_scores = np.concatenate([batch.set_scores for batch in batches], axis=-1)
+    total_games = np.concatenate([batch.total_games for batch in batches])
+    p1_sets = np.concatenate([batch.p1_sets for batch in batches])
+    assert summary.matches == 5000
+    assert summary.p1_wins == sum(int(batch.p1_wins.sum()) for batch in batches)
+    assert summary.match_score_counts[3].sum() == summary.p1_wins
+    assert summary.match_score_counts[1, 3] == np.sum(p1_sets == 1)
+    assert summary.set_score_counts[7, 6] == np.sum(
+        (set_scores[:, 0] == 7) & (set_scores[:, 1] == 6)
+    )
+    assert summary.set_score_counts.sum() == np.sum(set_scores[:, 0] >= 0)
+    np.testing.assert_array_equal(
+        summary.total_games_counts[: total_games.max() + 1], np.bincount(total_games)
+    )
+    assert summary.total_points_counts.sum() == 5000
+    assert summary.total_games_moments.mean == pytest.approx(total_games.mean())
+
+
+def test_summarise_simulations_stops_at_the_target_standard_error():
+    summary = summarise_simulations(
+        simulate_match_batches(PARAMS, 3, 5000, seed=1), target_standard_error=0.002
+    )
+
+    assert summary.p1_win_rate_standard_error <= 0.002
+    # One batch fewer would not have been precise enough.
+    p = summary.p1_win_rate
+    assert np.sqrt(p * (1 - p) / (summary.matches - 5000)) > 0.002
+    lower, upper = summary.p1_win_rate_confidence_interval()
+    assert lower < p < upper
+
+
+def test_summarise_simulations_stops_at_max_matches():
+    summary = summarise_simulations(
+        simulate_match_batches(PARAMS, 3, 300, seed=2), max_matches=1000
+    )
+
+    assert summary.matches == 1200
+
+
+def test_summarise_simulations_needs_a_stopping_rule_for_endless_batches():
+    with pytest.raises(ValueError, match="need target_standard_error or max_matches"):
+        summarise_simulations(simulate_match_batches(PARAMS, 3, 300, seed=2))
+
+    summary = summarise_simulations([simulate_matches([0.6, 0.7], 0.6, 3, seed=3)])
+    assert summary.matches == 2
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from tennis.models.markov_model import get_score_distribution_batch
+from tennis.models.simulator import simulate_matches
+
+N_MATCHES = 200_000
+# Simulated frequencies must be within this many standard errors of the probabilities.
+MAX_STANDARD_ERRORS = 5
+
+
+def assert_frequencies_match(frequencies, probabilities, n):
+    standard_errors = np.sqrt(probabilities * (1 - probabilities) / n)
+    np.testing.assert_array_less(
+        np.abs(frequencies - probabilities),
+        MAX_STANDARD_ERRORS * standard_errors + 1e-12,
+    )
+
+
+@pytest.mark.parametrize(
+    "p1, p2, best_of", [(0.65, 0.62, 5), (0.5, 0.5, 3), (0.7, 0.55, 3)]
+)
+def test_simulated_scores_match_the_markov_model(p1, p2, best_of):
+    simulated = simulate_matches(np.full(N_MATCHES, p1), p2, best_of, seed=0)
+    distribution = get_score_distribution_batch(p1, p2, best_of)
+
+    assert_frequencies_match(
+        simulated.p1_wins.mean(),
+        distribution.p1_match_winning_probability[0],
+        N_MATCHES,
+    )
+    # Player 1 serves first in the first set, as in the distribution of set scores.
+    first_sets = simulated.set_scores[0]
+    for (a, b), probability in distribution.set_scores.items():
+        frequency = np.mean((first_sets[0] == a) & (first_sets[1] == b))
+        assert_frequencies_match(frequency, probability[0], N_MATCHES)
+    for (a, b), probability in distribution.match_scores.items():
+        frequency = np.mean((simulated.p1_sets == a) & (simulated.p2_sets == b))
+        assert_frequencies_match(frequency, probability[0], N_MATCHES)
+    total_games = np.bincount(
+        simulated.total_games, minlength=distribution.total_games.shape[0]
+    )
+    assert_frequencies_match(
+        total_games / N_MATCHES, distribution.total_games[:, 0], N_MATCHES
+    )
+
+
+def test_simulated_matches_are_consistent():
+    simulated = simulate_matches(np.linspace(0.4, 0.8, 1000), 0.6, [3, 5] * 500, seed=1)
+
+    played = simulated.set_scores[:, 0] >= 0
+    np.testing.assert_array_equal(
+        played.sum(axis=0), simulated.p1_sets + simulated.p2_sets
+    )
+    np.testing.assert_array_equal(
+        np.where(played, simulated.set_scores.sum(axis=1), 0).sum(axis=0),
+        simulated.total_games,
+    )
+    np.testing.assert_array_equal(
+        simulated.p1_wins, simulated.p1_sets > simulated.p2_sets
+    )
+    assert (np.maximum(simulated.p1_sets, simulated.p2_sets) == [2, 3] * 500).all()
+
+
+def test_the_same_seed_gives_the_same_matches():
+    first = simulate_matches(np.full(100, 0.6), 0.6, 3, seed=7)
+    second = simulate_matches(np.full(100, 0.6), 0.6, 3, seed=7)
+
+    np.testing.assert_array_equal(first.set_scores, second.set_scores)
+    np.testing.assert_array_equal(first.total_points, second.total_points)
+
+
+def test_certain_tiebreak_points_are_rejected():
+    with pytest.raises(ValueError, match="Tiebreaks never finish"):
+        simulate_matches([1.0, 0.6], [1.0, 0.6], 3)
@@ -0,0 +1,101 @@
+from itertools import product
+
+import numpy as np
+import pytest
+
+from tennis.data_processing.pydantic_models.match_info import TournamentRound
+from tennis.models.tournament import (
+    build_pairwise_probability_matrix,
+    get_draw_rounds,
+    get_tournament_probabilities,
+    get_tournament_probabilities_from_matrix,
+)
+
+
+def brute_force_reach_probabilities(player_ids, pairwise_probabilities):
+    """
+    Reach probabilities of each round and of winning the draw, summed over every outcome
+    of every match of the draw.
+    """
+    draw_size = len(player_ids)
+    n_rounds = draw_size.bit_length() - 1
+    reach = np.zeros((draw_size, n_rounds + 1))
+    for outcomes in product((True, False), repeat=draw_size - 1):
+        outcomes = iter(outcomes)
+        probability = 1.0
+        rounds_played = []
+        positions = list(range(draw_size))
+        for _ in range(n_rounds):
+            rounds_played.append(positions)
+            winners = []
+            for first, second in zip(positions[::2], positions[1::2]):
+                first_wins = next(outcomes)
+                if player_ids[second] is None:
+                    win_probability = 1.0
+                elif player_ids[first] is None:
+                    win_probability = 0.0
+                else:
+                    win_probability = pairwise_probabilities[first, second]
+                probability *= win_probability if first_wins else 1 - win_probability
+                winners.append(first if first_wins else second)
+            positions = winners
+        rounds_played.append(positions)
+        for round_index, positions in enumerate(rounds_played):
+            for position in positions:
+                if player_ids[position] is not None:
+                    reach[position, round_index] += probability
+    return reach
+
+
+def random_pairwise_probabilities(draw_size, seed):
+    upper = np.triu(np.random.default_rng(seed).uniform(size=(draw_size, draw_size)), 1)
+    return upper + np.tril(1 - upper.T, -1) + np.eye(draw_size) / 2
+
+
+@pytest.mark.parametrize(
+    "player_ids",
+    [
+        [10, 11],
+        [10, 11, 12, 13, 14, 15, 16, 17],
+        [10, None, 12, 13, None, 15, 16, None],
+        [10, None, None, None, 14, 15, 16, 17],
+    ],
+)
+def test_propagation_matches_the_brute_force(player_ids):
+    pairwise_probabilities = random_pairwise_probabilities(len(player_ids), seed=0)
+
+    result = get_tournament_probabilities_from_matrix(
+        player_ids, pairwise_probabilities
+    )
+
+    expected = brute_force_reach_probabilities(player_ids, pairwise_probabilities)
+    np.testing.assert_allclose(result.reach_probabilities, expected[:, :-1], atol=1e-14)
+    np.testing.assert_allclose(result.win_probabilities, expected[:, -1], atol=1e-14)
+    assert result.win_probabilities.sum() == pytest.approx(1)
+
+
+def test_markov_draw_matches_the_brute_force():
+    player_ids = [1, 2, None, 4, 5, 6, 7, 8]
+    serve_probs = np.array([0.65, 0.6, 0.0, 0.7, 0.55, 0.62, 0.58, 0.68])
+
+    result = get_tournament_probabilities(player_ids, serve_probs, 5)
+
+    pairwise_probabilities = build_pairwise_probability_matrix(serve_probs, 5)
+    expected = brute_force_reach_probabilities(player_ids, pairwise_probabilities)
+    np.testing.assert_allclose(result.win_probabilities, expected[:, -1], atol=1e-14)
+    assert result.rounds == [TournamentRound.QF, TournamentRound.SF, TournamentRound.F]
+    # Position 3 plays its first round against a bye, so it always reaches the next.
+    assert result.reach_probabilities[3, 1] == 1
+
+
+def test_pairwise_probabilities_are_complementary():
+    matrix = build_pairwise_probability_matrix([0.6, 0.65, 0.7], 3)
+
+    np.testing.assert_allclose(matrix + matrix.T, 1, atol=1e-15)
+    assert matrix[2, 0] > matrix[1, 0] > 0.5
+
+
+@pytest.mark.parametrize("draw_size", [0, 1, 6, 256])
+def test_invalid_draw_sizes_are_rejected(draw_size):
+    with pytest.raises(ValueError, match="Draw size must be a power of 2"):
+        get_draw_rounds(draw_size)